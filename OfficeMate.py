@@ -1,76 +1,163 @@
+# 最先导入，才能统计其他模块的导入耗时
+from startup_profile import StartupProfiler, lazy_import
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser, scrolledtext
+import importlib.util
 import json
 import os
-import base64
 import io
+import gc
+import sys
 import threading
-import socket
+import queue
 import time
 from datetime import datetime
-import math
-import re
-import csv
 import sqlite3
-import hashlib
 import uuid
-import webbrowser
-from collections import defaultdict
-import statistics
-import tempfile
-import shutil
 
-try:
-    from PIL import Image, ImageTk, ImageDraw, ImageFont
-    HAS_PIL = True
-except ImportError:
-    HAS_PIL = False
+# 只在协作时使用的网络模块延迟加载
+socket = lazy_import("socket")
+ssl = lazy_import("ssl")
 
-try:
-    import numpy as np
-    HAS_NUMPY = True
-except ImportError:
-    HAS_NUMPY = False
+# Pillow 及依赖它的幻灯片渲染模块在第一次使用时才加载
+HAS_PIL = importlib.util.find_spec("PIL") is not None
+if HAS_PIL:
+    Image = lazy_import("PIL.Image")
+    ImageTk = lazy_import("PIL.ImageTk")
+    slide_thumbnails = lazy_import("slide_thumbnails")
+    slide_export = lazy_import("slide_export")
+    slide_frames = lazy_import("slide_frames")
+
+from collab_protocol import (
+    FrameDecoder, OpBatcher, ProtocolError,
+    MSG_HELLO, MSG_SNAPSHOT, MSG_OPS, MSG_ACK, MSG_PRESENCE, MSG_SUBMIT, OP_INSERT,
+    encode_frame, encode_hello, decode_snapshot, decode_ops_message, encode_submit, decode_ack,
+    encode_presence, decode_presence, apply_ops, diff_text
+)
+from atomic_file import atomic_write
+import rich_text
+import perf_monitor
+from edit_journal import EditJournal, find_journals, owner_running, read_journal, remove_journal
+from recent_files import RecentFilesService, MAX_RECENT
+from preferences_store import PreferencesStore
+from outline_index import OutlineIndex, OutlineTree, heading_tag_lines
+
+# 启动时用不到的子系统在第一次访问属性时才加载
+collab_offline = lazy_import("collab_offline")
+collab_server = lazy_import("collab_server")
+collab_sync = lazy_import("collab_sync")
+collab_presence = lazy_import("collab_presence")
+collab_tls = lazy_import("collab_tls")
+slide_scene = lazy_import("slide_scene")
+slide_deck = lazy_import("slide_deck")
+document_engine = lazy_import("document_engine")
+document_container = lazy_import("document_container")
+document_export = lazy_import("document_export")
+memory_diagnostics = lazy_import("memory_diagnostics")
+spell_checker = lazy_import("spell_checker")
+assistant_backend = lazy_import("assistant_backend")
+
+# 长时间运行的会话中各结构的上限
+MAX_DOCUMENT_HISTORY = 100  # 版本历史条数
+MAX_UNDO = 1000  # 文本撤销步数
+
+JOURNAL_RECORD_DELAY = 300  # 毫秒，输入时最多每隔这么久写一条编辑日志
+EXPORT_STEP_MS = 30  # 导出时每次占用 Tk 线程的时间，其余时间留给界面
+OUTLINE_UPDATE_DELAY = 300  # 毫秒，输入停顿后更新文档结构
+SPELL_CHECK_DELAY = 400  # 毫秒，输入或滚动停顿后检查可见区域的拼写
+SPELLING_TAG = "spell_error"
+STYLE_ISSUE_TAG = "style_issue"
 
 class OfficeMatePro:
     def __init__(self):
+        self.profiler = StartupProfiler()
         self.root = tk.Tk()
         self.root.title("OfficeMate Alpha1")
         self.root.geometry("1400x900")
         self.root.configure(bg='#2c3e50')
         
         # 应用主题
-        self.setup_theme()
+        with self.profiler.phase("setup_theme"):
+            self.setup_theme()
         
         # 初始化数据
         self.current_file = None
         self.auto_save = True
         self.auto_save_interval = 300000  # 5分钟
-        self.user_preferences = self.load_preferences()
+        with self.profiler.phase("load_preferences"):
+            self.user_preferences = self.load_preferences()
+        
+        # 最近文件的元数据缓存，文件检查在后台线程中进行
+        self.recent_files = RecentFilesService()
+        self.recent_menu_entries = []
+        self.recent_menu_generation = 0
+        
+        # 写作助手：在工作线程中调用后端，结果按文本哈希缓存（第一次使用时创建）
+        self.assistant = None
         
         # 协作功能
         self.collaboration_mode = False
         self.client_socket = None
+        self.collab_sender = None
         self.server_socket = None
-        self.connected_clients = []
+        self.collab_server = None
         self.user_id = str(uuid.uuid4())[:8]
+        self.collab_role = None
+        self.collab_inbox = queue.Queue()
+        self.collab_batcher = OpBatcher()
+        self.collab_flush_pending = False
+        self.collab_polling = False
+        self.collab_shadow = ""
+        self.collab_sync = None
+        self.collab_detached = []
+        self.collab_detached_text = ""
+        self.collab_use_tls = self.user_preferences.get('collab_tls', True)
+        self.tls_server_context = None
+        self.tls_client_context = None
+        self.tls_client_key = None  # (证书文件, 修改时间)，与之不同时重建客户端上下文
+        self.tls_session_cache = None
+        self.collab_address = None
+        self.presence_sampler = None
+        self.presence_renderer = None
+        self.presence_ticking = False
+        self.collab_oplog = None
+        self.collab_awaiting_hello_ack = False
+        self.collab_tls_settings = (True, None)
+        self.reconnect_delay = 1000
         
         # AI功能状态
         self.ai_assistant_enabled = True
         
+        # 打开 .omd 文档时尚未读取的分区：(文件路径, {分区名})
+        self.pending_sections = (None, set())
+        
+        # 正在进行的正文导出
+        self.export_writer = None
+        
         # 版本控制
         self.document_history = []
         self.current_version = 0
         
         # 创建数据库
-        self.setup_database()
+        with self.profiler.phase("setup_database"):
+            self.setup_database()
         
         # 创建界面
-        self.create_ui()
+        with self.profiler.phase("create_ui"):
+            self.create_ui()
         
         # 启动自动保存
         self.setup_auto_save()
         
+        # 编辑日志（崩溃恢复）
+        self.setup_edit_journal()
+        
+        # 内存诊断
+        self.setup_memory_diagnostics()
+        
+        # 关闭窗口与菜单退出走同一流程，偏好设置等在退出前写回
+        self.root.protocol("WM_DELETE_WINDOW", self.quit_application)
+        
     def setup_theme(self):
         """设置现代化主题"""
         self.style = ttk.Style()
@@ -100,52 +187,15 @@ class OfficeMatePro:
         self.conn = sqlite3.connect('officemate.db', check_same_thread=False)
         self.cursor = self.conn.cursor()
         
-        # 创建表
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT UNIQUE,
-                content TEXT,
-                metadata TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                type TEXT,
-                content TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.conn.commit()
+        # 创建表（与命令行工具共用同一表结构）
+        document_engine.ensure_schema(self.conn)
         
     def load_preferences(self):
-        """加载用户偏好设置"""
-        try:
-            with open('preferences.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {
-                'theme': 'dark',
-                'auto_save': True,
-                'recent_files': [],
-                'default_font': 'Arial',
-                'default_font_size': 12,
-                'window_size': [1400, 900]
-            }
-            
-    def save_preferences(self):
-        """保存用户偏好设置"""
-        try:
-            with open('preferences.json', 'w', encoding='utf-8') as f:
-                json.dump(self.user_preferences, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存偏好设置失败: {e}")
+        """加载用户偏好设置（旧版本的设置文件自动升级）"""
+        preferences = PreferencesStore()
+        if preferences.load_error:
+            messagebox.showwarning("偏好设置", f"偏好设置文件无法读取，本次使用默认设置。\n{preferences.load_error}")
+        return preferences
             
     def setup_auto_save(self):
         """设置自动保存"""
@@ -161,6 +211,58 @@ class OfficeMatePro:
                 pass
         self.setup_auto_save()
         
+    def setup_edit_journal(self):
+        """恢复上次崩溃遗留的编辑，然后为当前文档开始新的编辑日志"""
+        self.journal_record_pending = False
+        recovered = self.recover_from_journal()
+        self.edit_journal = EditJournal()
+        self.edit_journal.checkpoint(self.text_area.get('1.0', 'end-1c'), self.current_file,
+                                     saved=recovered is None)
+        if recovered:
+            # 恢复的内容写入新日志之后才删除旧日志
+            self.edit_journal.flush()
+            remove_journal(recovered)
+        self.rebuild_outline()
+            
+    def recover_from_journal(self):
+        """重放最近一个崩溃遗留的编辑日志；恢复后返回该日志路径"""
+        for path in find_journals():
+            if owner_running(path):
+                continue
+            try:
+                state = read_journal(path)
+            except OSError as e:
+                print(f"读取编辑日志失败: {e}")
+                continue
+            if state is None or not state.has_unsaved_edits:
+                remove_journal(path)
+                continue
+            name = os.path.basename(state.document_path) if state.document_path else "未命名文档"
+            when = datetime.fromtimestamp(state.time).strftime('%Y-%m-%d %H:%M:%S') if state.time else "上次运行时"
+            if not messagebox.askyesno("恢复未保存的编辑",
+                                       f"发现 {name} 在 {when} 未保存的编辑（{len(state.text)} 个字符），是否恢复？\n"
+                                       "选择“否”将丢弃这些编辑。"):
+                remove_journal(path)
+                continue
+            self.text_area.insert('1.0', state.text)
+            self.current_file = state.document_path
+            if self.current_file and document_container.is_container_path(self.current_file) and os.path.exists(self.current_file):
+                self.pending_sections = (self.current_file, {"spreadsheet", "presentation"})
+            self.root.title(f"OfficeMate Pro - {name}（已恢复，未保存）")
+            # 其余遗留日志留到下次启动时处理
+            return path
+        return None
+        
+    def schedule_journal_record(self):
+        """输入时合并为每 JOURNAL_RECORD_DELAY 毫秒最多一条日志记录"""
+        if not self.journal_record_pending:
+            self.journal_record_pending = True
+            self.root.after(JOURNAL_RECORD_DELAY, self.record_journal)
+            
+    def record_journal(self):
+        self.journal_record_pending = False
+        self.edit_journal.record(self.text_area.get('1.0', 'end-1c'))
+        
     def backup_document(self):
         """备份文档"""
         try:
@@ -207,12 +309,14 @@ class OfficeMatePro:
         # 最近文件子菜单
         self.recent_menu = tk.Menu(file_menu, tearoff=0, bg='#34495e', fg='white')
         file_menu.add_cascade(label="最近文件", menu=self.recent_menu)
+        self.recent_menu.bind('<<MenuSelect>>', self.on_recent_menu_select)
         self.update_recent_files_menu()
         
         file_menu.add_separator()
         file_menu.add_command(label="保存", command=self.save_file, accelerator="Ctrl+S")
         file_menu.add_command(label="另存为", command=self.save_as_file, accelerator="Ctrl+Shift+S")
         file_menu.add_command(label="导出", command=self.export_document)
+        file_menu.add_command(label="导出演示文稿", command=self.export_presentation_dialog)
         file_menu.add_separator()
         file_menu.add_command(label="打印", command=self.print_document, accelerator="Ctrl+P")
         file_menu.add_separator()
@@ -239,6 +343,9 @@ class OfficeMatePro:
         view_menu.add_command(label="演示文稿", command=self.show_presentation)
         view_menu.add_command(label="数据库查看器", command=self.show_database_viewer)
         view_menu.add_separator()
+        view_menu.add_command(label="放映幻灯片", command=self.start_slideshow, accelerator="F5")
+        view_menu.add_command(label="演讲者视图", command=lambda: self.start_slideshow(presenter=True))
+        view_menu.add_separator()
         view_menu.add_command(label="全屏", command=self.toggle_fullscreen, accelerator="F11")
         view_menu.add_command(label="缩放", command=self.zoom_dialog)
         
@@ -269,6 +376,8 @@ class OfficeMatePro:
         tools_menu.add_command(label="宏录制", command=self.macro_recorder)
         tools_menu.add_separator()
         tools_menu.add_command(label="选项", command=self.options_dialog)
+        tools_menu.add_command(label="性能监视", command=self.show_performance_window)
+        tools_menu.add_command(label="内存诊断", command=self.show_memory_window)
         
         # AI助手菜单
         ai_menu = tk.Menu(menubar, tearoff=0, bg='#34495e', fg='white')
@@ -298,37 +407,61 @@ class OfficeMatePro:
         self.bind_shortcuts()
         
     def update_recent_files_menu(self):
-        """更新最近文件菜单"""
-        self.recent_menu.delete(0, tk.END)
-        recent_files = self.user_preferences.get('recent_files', [])
+        """更新最近文件菜单：先用缓存的元数据立即生成，文件检查完成后再刷新"""
+        paths = self.user_preferences.get('recent_files', [])[:MAX_RECENT]
+        self.fill_recent_files_menu(self.recent_files.cached(paths))
+        
+        # 只采用最后一次请求的检查结果
+        self.recent_menu_generation += 1
+        generation = self.recent_menu_generation
+        future = self.recent_files.validate(paths)
+        
+        def check():
+            if not future.done():
+                self.root.after(100, check)
+                return
+            if generation != self.recent_menu_generation:
+                return
+            try:
+                self.fill_recent_files_menu(future.result())
+            except Exception as e:
+                print(f"检查最近文件失败: {e}")
+                
+        self.root.after(100, check)
         
-        for file_path in recent_files[-10:]:  # 只显示最近10个文件
-            if os.path.exists(file_path):
-                filename = os.path.basename(file_path)
-                self.recent_menu.add_command(
-                    label=filename,
-                    command=lambda path=file_path: self.open_recent_file(path)
-                )
+    def fill_recent_files_menu(self, entries):
+        """按记录生成菜单项，跳过已确认不存在的文件"""
+        self.recent_menu.delete(0, tk.END)
+        self.recent_menu_entries = [entry for entry in entries if entry.exists]
+        for entry in self.recent_menu_entries:
+            details = entry.describe()
+            self.recent_menu.add_command(
+                label=f"{entry.name}    {details}" if details else entry.name,
+                command=lambda path=entry.path: self.open_recent_file(path)
+            )
+        if not self.recent_menu_entries:
+            self.recent_menu.add_command(label="（无）", state='disabled')
+            
+    def on_recent_menu_select(self, event=None):
+        """在状态栏显示鼠标所指最近文件的类型和内容预览"""
+        index = self.recent_menu.index('active')
+        text = ""
+        if index is not None and index < len(self.recent_menu_entries):
+            entry = self.recent_menu_entries[index]
+            text = f"{entry.type_name}: {entry.preview}" if entry.preview else entry.type_name
+        self.hint_label.config(text=text)
         
     def open_recent_file(self, file_path):
         """打开最近文件"""
         if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    self.text_area.delete('1.0', tk.END)
-                    self.text_area.insert('1.0', content)
-                    self.current_file = file_path
-                    self.root.title(f"OfficeMate Pro - {os.path.basename(file_path)}")
-                    self.add_to_version_history(f"打开文件: {os.path.basename(file_path)}")
-            except Exception as e:
-                messagebox.showerror("错误", f"无法打开文件: {str(e)}")
+            self.load_file(file_path)
         else:
             messagebox.showwarning("文件不存在", "选择的文件不存在，已从最近文件列表中移除")
             # 从最近文件列表中移除
             if file_path in self.user_preferences['recent_files']:
-                self.user_preferences['recent_files'].remove(file_path)
-                self.save_preferences()
+                self.user_preferences['recent_files'] = [
+                    path for path in self.user_preferences['recent_files'] if path != file_path
+                ]
                 self.update_recent_files_menu()
         
     def create_main_toolbar(self):
@@ -393,6 +526,10 @@ class OfficeMatePro:
         self.cursor_label = tk.Label(self.status_bar, text="行: 1, 列: 1", bg='#2c3e50', fg='white')
         self.cursor_label.pack(side='left', padx=5)
         
+        # 提示信息（如最近文件的内容预览）
+        self.hint_label = tk.Label(self.status_bar, text="", bg='#2c3e50', fg='#bdc3c7')
+        self.hint_label.pack(side='left', padx=15)
+        
         # 协作状态
         self.collab_label = tk.Label(self.status_bar, text="离线", bg='#2c3e50', fg='red')
         self.collab_label.pack(side='right', padx=5)
@@ -410,11 +547,39 @@ class OfficeMatePro:
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill='both', expand=True, padx=5, pady=5)
         
-        # 创建各个功能模块
-        self.create_word_processor()
+        # 创建各个功能模块：文字处理立即创建，其他标签页第一次切换到时再创建
+        self.lazy_tabs = {}
+        with self.profiler.phase("tab:文字处理"):
+            self.create_word_processor()
         self.create_spreadsheet()
         self.create_presentation()
         self.create_database_viewer()
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        
+    def register_lazy_tab(self, frame, name, builder):
+        """登记延迟创建的标签页，在此之前显示占位提示"""
+        placeholder = tk.Label(frame, text=f"正在加载{name}...", fg='#7f8c8d')
+        placeholder.pack(expand=True)
+        self.lazy_tabs[str(frame)] = (name, builder, placeholder)
+        
+    def on_tab_changed(self, event=None):
+        """切换标签页时读取该页需要的文档分区，并创建尚未创建的界面"""
+        tab = self.notebook.select()
+        if tab == str(self.sheet_frame):
+            self.load_pending_section("spreadsheet")
+        elif tab == str(self.presentation_frame):
+            self.load_pending_section("presentation")
+        self.ensure_tab_built(tab)
+        
+    def ensure_tab_built(self, frame):
+        """确保标签页界面已创建（也供需要其控件的功能调用）"""
+        entry = self.lazy_tabs.pop(str(frame), None)
+        if entry is None:
+            return
+        name, builder, placeholder = entry
+        placeholder.destroy()
+        with self.profiler.phase(f"tab:{name}"):
+            builder()
         
     def create_sidebar(self):
         """创建侧边栏"""
@@ -425,8 +590,12 @@ class OfficeMatePro:
         doc_structure_label = tk.Label(self.sidebar, text="文档结构", bg='#34495e', fg='white', font=('Arial', 10, 'bold'))
         doc_structure_label.pack(pady=5)
         
-        self.doc_tree = ttk.Treeview(self.sidebar, height=15)
+        self.doc_tree = ttk.Treeview(self.sidebar, height=15, show='tree', selectmode='browse')
         self.doc_tree.pack(fill='both', expand=True, padx=5, pady=5)
+        self.doc_tree.bind('<<TreeviewSelect>>', self.jump_to_heading)
+        self.outline = OutlineIndex()
+        self.outline_tree = OutlineTree(self.doc_tree, self.outline)
+        self.outline_update_pending = False
         
         # 快速样式面板
         style_label = tk.Label(self.sidebar, text="快速样式", bg='#34495e', fg='white', font=('Arial', 10, 'bold'))
@@ -492,10 +661,10 @@ class OfficeMatePro:
             text_frame,
             wrap='word',
             font=('Arial', 12),
-            yscrollcommand=v_scrollbar.set,
+            yscrollcommand=lambda *args: self.on_text_scroll(v_scrollbar, *args),
             xscrollcommand=h_scrollbar.set,
             undo=True,
-            maxundo=-1,
+            maxundo=MAX_UNDO,
             selectbackground='#3498db'
         )
         self.text_area.pack(fill='both', expand=True)
@@ -508,6 +677,24 @@ class OfficeMatePro:
         self.text_area.bind('<KeyRelease>', self.on_text_change)
         self.text_area.bind('<Button-1>', self.update_cursor_position)
         self.text_area.bind('<KeyPress>', self.update_cursor_position)
+        # 拖动选择时光标和选区持续变化，在线状态随之采样
+        self.text_area.bind('<B1-Motion>', self.update_cursor_position)
+        self.text_area.bind('<ButtonRelease-1>', self.update_cursor_position)
+        
+        # 拼写和文风检查：后台检查，只为可见区域添加标签
+        self.spell_service = spell_checker.SpellCheckService()
+        self.spell_check_pending = False
+        self.spell_polling = False
+        self.text_area.tag_configure(SPELLING_TAG, underline=True)
+        self.text_area.tag_configure(STYLE_ISSUE_TAG, underline=True)
+        try:
+            self.text_area.tag_configure(SPELLING_TAG, underlinefg='red')
+            self.text_area.tag_configure(STYLE_ISSUE_TAG, underlinefg='#2980b9')
+        except tk.TclError:
+            pass  # 旧版本 Tk 不支持下划线颜色
+        for tag in (SPELLING_TAG, STYLE_ISSUE_TAG):
+            self.text_area.tag_lower(tag)
+            self.text_area.tag_bind(tag, '<Button-3>', self.show_spelling_menu)
         
         # 初始化格式状态
         self.current_font = "Arial"
@@ -522,8 +709,12 @@ class OfficeMatePro:
         self.sheet_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.sheet_frame, text="电子表格")
         
-        # 创建增强的电子表格
-        self.create_enhanced_spreadsheet()
+        # 表格数据立即初始化，控件在第一次打开标签页时创建
+        self.rows = 20
+        self.cols = 10
+        self.cells = []
+        self.cell_data = {}  # 存储单元格数据和公式
+        self.register_lazy_tab(self.sheet_frame, "电子表格", self.create_enhanced_spreadsheet)
         
     def create_enhanced_spreadsheet(self):
         """创建增强的电子表格"""
@@ -576,12 +767,9 @@ class OfficeMatePro:
         self.table_scrollbar.pack(side="right", fill="y")
         
         # 初始化表格
-        self.rows = 20
-        self.cols = 10
-        self.cells = []
-        self.cell_data = {}  # 存储单元格数据和公式
         self.create_table()
         
+    @perf_monitor.timed("create_table")
     def create_table(self):
         """创建表格"""
         # 清空现有表格
@@ -621,9 +809,11 @@ class OfficeMatePro:
                 cell.bind('<KeyRelease>', lambda e, row=i, col=j: self.on_cell_change(row, col))
                 row_cells.append(cell)
                 
-                # 初始化单元格数据
+                # 初始化单元格数据（重建表格时保留已有内容）
                 cell_key = f"{i},{j}"
-                self.cell_data[cell_key] = {"value": "", "formula": "", "style": {}}
+                cell_info = self.cell_data.setdefault(cell_key, {"value": "", "formula": "", "style": {}})
+                if cell_info["value"]:
+                    cell.insert(0, cell_info["value"])
             self.cells.append(row_cells)
         
         # 设置列权重
@@ -658,23 +848,11 @@ class OfficeMatePro:
                 self.cells[row][col].config(fg='red')
         
     def evaluate_formula(self, formula):
-        """评估公式"""
-        try:
-            # 基本数学运算
-            if formula.upper().startswith('SUM('):
-                # 简单的SUM函数实现
-                range_str = formula[4:-1]
-                parts = range_str.split(':')
-                if len(parts) == 2:
-                    total = 0
-                    # 这里应该解析单元格范围，简化实现
-                    return f"SUM({range_str})"
-            
-            # 基本算术运算
-            safe_dict = {'__builtins__': None}
-            return eval(formula, safe_dict)
-        except:
-            return "#ERROR!"
+        """评估公式（支持单元格引用和 SUM/AVERAGE/MAX/MIN 区域函数）"""
+        def resolve(key):
+            cell = self.cell_data.get(key)
+            return cell.get("value", "") if cell else ""
+        return document_engine.evaluate_formula(formula, resolve)
             
     def apply_formula(self, event=None):
         """应用公式"""
@@ -704,7 +882,19 @@ class OfficeMatePro:
         self.presentation_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.presentation_frame, text="演示文稿")
         
-        self.create_enhanced_presentation()
+        # 幻灯片数据立即初始化（self.slides 与文稿模型共用同一列表），界面延迟创建
+        self.slide_deck = slide_deck.SlideDeck()
+        self.slides = self.slide_deck.slides
+        self.current_slide_index = 0
+        self.slide_deck.append(self.new_slide_data())
+        
+        # 放映状态（全屏放映和演讲者视图共用画面缓存）
+        self.frame_cache = None
+        self.slideshow_window = None
+        self.presenter_window = None
+        self.slideshow_index = 0
+        
+        self.register_lazy_tab(self.presentation_frame, "演示文稿", self.create_enhanced_presentation)
         
     def create_enhanced_presentation(self):
         """创建增强的演示文稿"""
@@ -732,9 +922,31 @@ class OfficeMatePro:
         
         # 幻灯片列表
         self.slide_listbox = tk.Listbox(preview_panel, bg='#34495e', fg='white', 
-                                       selectbackground='#3498db', height=15)
+                                       selectbackground='#3498db', height=8 if HAS_PIL else 15,
+                                       selectmode=tk.EXTENDED)
         self.slide_listbox.pack(fill='both', expand=True, padx=5, pady=5)
         self.slide_listbox.bind('<<ListboxSelect>>', self.on_slide_select)
+        self.slide_listbox.bind('<Button-1>', self.on_slide_press)
+        self.slide_listbox.bind('<B1-Motion>', self.on_slide_drag)
+        self.slide_drag_index = None
+        
+        # 幻灯片缩略图（后台渲染，只为可见区域请求）
+        self.thumbnail_cache = slide_thumbnails.ThumbnailCache() if HAS_PIL else None
+        self.thumbnail_slots = {}  # 幻灯片ID -> [边框项, 图像项, 内容哈希]
+        self.thumbnail_photos = {}
+        self.thumbnail_polling = False
+        if self.thumbnail_cache:
+            thumb_frame = tk.Frame(preview_panel, bg='#2c3e50')
+            thumb_frame.pack(fill='both', expand=True, padx=5, pady=5)
+            self.thumbnail_canvas = tk.Canvas(thumb_frame, width=136, bg='#2c3e50',
+                                              highlightthickness=0, yscrollincrement=slide_thumbnails.THUMBNAIL_SLOT)
+            thumb_scroll = ttk.Scrollbar(thumb_frame, orient='vertical', command=self.scroll_thumbnails)
+            self.thumbnail_canvas.configure(yscrollcommand=thumb_scroll.set)
+            thumb_scroll.pack(side='right', fill='y')
+            self.thumbnail_canvas.pack(side='left', fill='both', expand=True)
+            self.thumbnail_canvas.bind('<Configure>', lambda e: self.refresh_thumbnails())
+            self.thumbnail_canvas.bind('<Button-1>', self.on_thumbnail_click)
+            self.thumbnail_canvas.bind('<MouseWheel>', self.on_thumbnail_wheel)
         
         # 幻灯片操作按钮
         btn_frame = tk.Frame(preview_panel, bg='#2c3e50')
@@ -743,6 +955,9 @@ class OfficeMatePro:
         add_slide_btn = ttk.Button(btn_frame, text="添加", command=self.add_slide, style='Modern.TButton')
         add_slide_btn.pack(side='left', fill='x', expand=True, padx=2)
         
+        duplicate_slide_btn = ttk.Button(btn_frame, text="复制", command=self.duplicate_slides, style='Modern.TButton')
+        duplicate_slide_btn.pack(side='left', fill='x', expand=True, padx=2)
+        
         remove_slide_btn = ttk.Button(btn_frame, text="删除", command=self.remove_slide, style='Accent.TButton')
         remove_slide_btn.pack(side='left', fill='x', expand=True, padx=2)
         
@@ -762,45 +977,254 @@ class OfficeMatePro:
         
         self.slide_canvas = tk.Canvas(canvas_frame, bg='white', width=800, height=500)
         self.slide_canvas.pack(padx=10, pady=10)
+        self.slide_renderer = slide_scene.SlideSceneRenderer(self.slide_canvas)
+        
+        # 显示已有的幻灯片，此后列表随文稿模型增量更新
+        for slide in self.slides:
+            self.slide_listbox.insert(tk.END, slide["title"])
+        self.slide_deck.listeners.append(self.on_deck_changed)
+        self.select_slide(self.current_slide_index)
+        
+    def on_deck_changed(self, event, index, arg):
+        """文稿结构变化时增量更新幻灯片列表，不重建整个列表框"""
+        listbox = self.slide_listbox
+        if event == "insert":
+            for offset in range(arg):
+                listbox.insert(index + offset, self.slides[index + offset]["title"])
+        elif event == "delete":
+            listbox.delete(index, index + arg - 1)
+        elif event == "move":
+            listbox.delete(index)
+            listbox.insert(arg, self.slides[arg]["title"])
+        elif event == "update":
+            title = self.slides[index]["title"]
+            if listbox.get(index) != title:
+                selected = listbox.selection_includes(index)
+                listbox.delete(index)
+                listbox.insert(index, title)
+                if selected:
+                    listbox.selection_set(index)
+                    
+    def select_slide(self, index):
+        """选中并显示指定位置的幻灯片"""
+        self.current_slide_index = index
+        self.slide_listbox.selection_clear(0, tk.END)
+        self.slide_listbox.selection_set(index)
+        self.slide_listbox.see(index)
+        self.draw_current_slide()
         
-        # 初始化幻灯片数据
-        self.slides = []
-        self.current_slide_index = 0
-        self.slide_layouts = []
-        self.add_slide()
+    def selected_slide_ids(self):
+        """列表框中选中的幻灯片ID，未选中时为当前幻灯片"""
+        selection = self.slide_listbox.curselection() or (self.current_slide_index,)
+        return [self.slides[index]["id"] for index in selection if index < len(self.slides)]
         
-    def add_slide(self):
-        """添加幻灯片"""
-        slide_data = {
+    def new_slide_data(self):
+        """新幻灯片的默认内容"""
+        return {
             "title": f"幻灯片 {len(self.slides) + 1}",
             "content": "在此添加内容...",
             "layout": "title_content",
             "background": "#ffffff",
             "elements": []
         }
-        self.slides.append(slide_data)
-        self.slide_layouts.append("title_content")
-        self.slide_listbox.insert(tk.END, slide_data["title"])
-        self.current_slide_index = len(self.slides) - 1
-        self.draw_current_slide()
+        
+    def add_slide(self):
+        """添加幻灯片"""
+        self.slide_deck.append(self.new_slide_data())
+        self.select_slide(len(self.slides) - 1)
     
     def remove_slide(self):
-        """删除幻灯片"""
-        if len(self.slides) > 1:
-            self.slides.pop(self.current_slide_index)
-            self.slide_layouts.pop(self.current_slide_index)
-            self.slide_listbox.delete(self.current_slide_index)
-            self.current_slide_index = min(self.current_slide_index, len(self.slides) - 1)
-            if self.current_slide_index >= 0:
-                self.slide_listbox.selection_set(self.current_slide_index)
-                self.draw_current_slide()
+        """删除选中的幻灯片（支持多选）"""
+        slide_ids = self.selected_slide_ids()
+        if len(slide_ids) >= len(self.slides):
+            messagebox.showwarning("演示文稿", "至少需要保留一张幻灯片")
+            return
+        first = self.slide_deck.index_of(slide_ids[0])
+        for slide in self.slide_deck.delete_many(slide_ids):
+            self.slide_renderer.forget(slide["id"])
+        self.select_slide(min(first, len(self.slides) - 1))
+        
+    def duplicate_slides(self):
+        """复制选中的幻灯片"""
+        copies = self.slide_deck.duplicate(self.selected_slide_ids())
+        if copies:
+            self.select_slide(self.slide_deck.index_of(copies[0]["id"]))
     
     def on_slide_select(self, event):
         """选择幻灯片"""
         selection = self.slide_listbox.curselection()
-        if selection:
+        if not selection:
+            return
+        if len(selection) == 1 or self.current_slide_index not in selection:
             self.current_slide_index = selection[0]
             self.draw_current_slide()
+            
+    def on_slide_press(self, event):
+        """记录拖动的起始行"""
+        self.slide_drag_index = self.slide_listbox.nearest(event.y)
+        
+    def on_slide_drag(self, event):
+        """拖动幻灯片调整顺序，只移动被拖动的一行"""
+        if self.slide_drag_index is None or self.slide_drag_index >= len(self.slides):
+            return "break"
+        target = self.slide_listbox.nearest(event.y)
+        if target != self.slide_drag_index:
+            self.slide_deck.move(self.slide_drag_index, target)
+            self.slide_drag_index = target
+            self.select_slide(target)
+        return "break"
+    
+    def start_slideshow(self, presenter=False):
+        """从当前幻灯片开始全屏放映，presenter 为 True 时同时打开演讲者视图"""
+        if not HAS_PIL:
+            messagebox.showerror("错误", "幻灯片放映需要安装 Pillow")
+            return
+        self.load_pending_section("presentation")
+        if self.slideshow_window or not self.slides:
+            return
+        if self.frame_cache is None:
+            self.frame_cache = slide_frames.SlideFrameCache(converter=ImageTk.PhotoImage)
+            
+        window = tk.Toplevel(self.root)
+        window.configure(bg='black')
+        window.attributes('-fullscreen', True)
+        width, height = window.winfo_screenwidth(), window.winfo_screenheight()
+        self.slideshow_scale = min(width / slide_scene.SLIDE_WIDTH, height / slide_scene.SLIDE_HEIGHT)
+        self.slideshow_canvas = tk.Canvas(window, bg='black', highlightthickness=0)
+        self.slideshow_canvas.pack(fill='both', expand=True)
+        self.slideshow_image = self.slideshow_canvas.create_image(width // 2, height // 2)
+        self.slideshow_window = window
+        
+        for key in ('<Right>', '<Down>', '<Next>', '<space>', '<Return>', '<Button-1>'):
+            window.bind(key, lambda e: self.slideshow_go(self.slideshow_index + 1))
+        for key in ('<Left>', '<Up>', '<Prior>', '<BackSpace>'):
+            window.bind(key, lambda e: self.slideshow_go(self.slideshow_index - 1))
+        window.bind('<Home>', lambda e: self.slideshow_go(0))
+        window.bind('<End>', lambda e: self.slideshow_go(len(self.slides) - 1))
+        window.bind('<Escape>', lambda e: self.end_slideshow())
+        window.protocol("WM_DELETE_WINDOW", self.end_slideshow)
+        
+        self.slideshow_started = time.monotonic()
+        if presenter:
+            self.open_presenter_view()
+        window.focus_set()
+        self.slideshow_go(self.current_slide_index)
+        self.poll_slideshow_frames()
+        
+    def open_presenter_view(self):
+        """演讲者视图：当前幻灯片、下一张和计时器"""
+        window = tk.Toplevel(self.root)
+        window.title("演讲者视图")
+        window.configure(bg='#2c3e50')
+        
+        views = tk.Frame(window, bg='#2c3e50')
+        views.pack(padx=10, pady=10)
+        current_width = int(slide_scene.SLIDE_WIDTH * slide_frames.PRESENTER_CURRENT_SCALE)
+        current_height = int(slide_scene.SLIDE_HEIGHT * slide_frames.PRESENTER_CURRENT_SCALE)
+        next_width = int(slide_scene.SLIDE_WIDTH * slide_frames.PRESENTER_NEXT_SCALE)
+        next_height = int(slide_scene.SLIDE_HEIGHT * slide_frames.PRESENTER_NEXT_SCALE)
+        
+        self.presenter_current = tk.Canvas(views, width=current_width, height=current_height,
+                                           bg='black', highlightthickness=0)
+        self.presenter_current.grid(row=0, column=0, rowspan=3, padx=5)
+        self.presenter_current_image = self.presenter_current.create_image(0, 0, anchor='nw')
+        
+        tk.Label(views, text="下一张", bg='#2c3e50', fg='white').grid(row=0, column=1, sticky='w')
+        self.presenter_next = tk.Canvas(views, width=next_width, height=next_height,
+                                        bg='black', highlightthickness=0)
+        self.presenter_next.grid(row=1, column=1, padx=5, sticky='n')
+        self.presenter_next_image = self.presenter_next.create_image(0, 0, anchor='nw')
+        
+        info = tk.Frame(views, bg='#2c3e50')
+        info.grid(row=2, column=1, sticky='s')
+        self.presenter_timer = tk.Label(info, text="00:00:00", bg='#2c3e50', fg='white',
+                                        font=('Arial', 28, 'bold'))
+        self.presenter_timer.pack()
+        self.presenter_counter = tk.Label(info, text="", bg='#2c3e50', fg='white', font=('Arial', 14))
+        self.presenter_counter.pack()
+        
+        buttons = tk.Frame(window, bg='#2c3e50')
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="上一张",
+                   command=lambda: self.slideshow_go(self.slideshow_index - 1)).pack(side='left', padx=5)
+        ttk.Button(buttons, text="下一张",
+                   command=lambda: self.slideshow_go(self.slideshow_index + 1)).pack(side='left', padx=5)
+        ttk.Button(buttons, text="结束放映", command=self.end_slideshow).pack(side='left', padx=5)
+        window.protocol("WM_DELETE_WINDOW", self.end_slideshow)
+        
+        self.presenter_window = window
+        self.update_presenter_timer()
+        
+    def slideshow_frame(self, index, scale):
+        """取得画面：优先使用预渲染的缓存"""
+        slide = self.slides[index]
+        count = len(self.slides)
+        frame = self.frame_cache.get(self.frame_cache.key(slide, index, count, scale))
+        return frame or self.frame_cache.render_now(slide, index, count, scale)
+        
+    def slideshow_go(self, index):
+        """切换到指定幻灯片：只替换图像项引用的画面"""
+        if not self.slideshow_window:
+            return
+        index = max(0, min(index, len(self.slides) - 1))
+        self.slideshow_index = index
+        self.slideshow_frame_ref = self.slideshow_frame(index, self.slideshow_scale)
+        self.slideshow_canvas.itemconfigure(self.slideshow_image, image=self.slideshow_frame_ref)
+        
+        if self.presenter_window:
+            current = self.slideshow_frame(index, slide_frames.PRESENTER_CURRENT_SCALE)
+            upcoming = None
+            if index + 1 < len(self.slides):
+                upcoming = self.slideshow_frame(index + 1, slide_frames.PRESENTER_NEXT_SCALE)
+            self.presenter_frame_refs = (current, upcoming)
+            self.presenter_current.itemconfigure(self.presenter_current_image, image=current)
+            self.presenter_next.itemconfigure(self.presenter_next_image, image=upcoming or '')
+            self.presenter_counter.config(text=f"{index + 1} / {len(self.slides)}")
+        self.prefetch_slideshow_frames()
+        
+    def prefetch_slideshow_frames(self, ahead=3, behind=1):
+        """后台预渲染后面几张和前一张，下一张优先"""
+        count = len(self.slides)
+        offsets = list(range(1, ahead + 1)) + [-offset for offset in range(1, behind + 1)]
+        for offset in offsets:
+            index = self.slideshow_index + offset
+            if not 0 <= index < count:
+                continue
+            slide = self.slides[index]
+            self.frame_cache.prefetch(slide, index, count, self.slideshow_scale)
+            if self.presenter_window:
+                self.frame_cache.prefetch(slide, index, count, slide_frames.PRESENTER_CURRENT_SCALE)
+                if index + 1 < count:
+                    self.frame_cache.prefetch(self.slides[index + 1], index + 1, count,
+                                              slide_frames.PRESENTER_NEXT_SCALE)
+                    
+    def poll_slideshow_frames(self):
+        """在 Tk 线程中接收后台渲染好的画面"""
+        if not self.slideshow_window:
+            return
+        self.frame_cache.collect()
+        self.root.after(15, self.poll_slideshow_frames)
+        
+    def update_presenter_timer(self):
+        """更新演讲计时"""
+        if not self.presenter_window:
+            return
+        elapsed = int(time.monotonic() - self.slideshow_started)
+        self.presenter_timer.config(text=f"{elapsed // 3600:02d}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d}")
+        self.root.after(1000, self.update_presenter_timer)
+        
+    def end_slideshow(self):
+        """结束放映，编辑区停在放映到的幻灯片"""
+        for window in (self.slideshow_window, self.presenter_window):
+            if window:
+                window.destroy()
+        self.slideshow_window = None
+        self.presenter_window = None
+        self.slideshow_frame_ref = None
+        self.presenter_frame_refs = None
+        self.ensure_tab_built(self.presentation_frame)
+        if self.slides:
+            self.select_slide(min(self.slideshow_index, len(self.slides) - 1))
     
     def choose_layout(self):
         """选择幻灯片布局"""
@@ -822,9 +1246,8 @@ class OfficeMatePro:
     
     def apply_layout(self, layout_type, window):
         """应用选择的布局"""
-        if 0 <= self.current_slide_index < len(self.slide_layouts):
-            self.slide_layouts[self.current_slide_index] = layout_type
-            self.slides[self.current_slide_index]["layout"] = layout_type
+        if 0 <= self.current_slide_index < len(self.slides):
+            self.slide_deck.update(self.slides[self.current_slide_index]["id"], layout=layout_type)
             self.draw_current_slide()
         window.destroy()
     
@@ -832,56 +1255,105 @@ class OfficeMatePro:
         """选择主题"""
         color = colorchooser.askcolor(title="选择背景颜色")[1]
         if color and 0 <= self.current_slide_index < len(self.slides):
-            self.slides[self.current_slide_index]["background"] = color
+            self.slide_deck.update(self.slides[self.current_slide_index]["id"], background=color)
             self.draw_current_slide()
     
+    @perf_monitor.timed("draw_current_slide")
     def draw_current_slide(self):
-        """绘制当前幻灯片"""
-        self.slide_canvas.delete("all")
-        
+        """绘制当前幻灯片（保留模式：只更新变化的画布项）"""
         if not self.slides or self.current_slide_index >= len(self.slides):
             return
             
         slide = self.slides[self.current_slide_index]
-        layout = self.slide_layouts[self.current_slide_index]
-        
-        # 绘制背景
-        self.slide_canvas.create_rectangle(0, 0, 800, 500, fill=slide["background"], outline="")
-        
-        # 根据布局绘制内容
-        if layout == "title_content":
-            # 绘制标题
-            self.slide_canvas.create_text(400, 100, text=slide["title"], 
-                                         font=("Arial", 32, "bold"), fill="#2c3e50")
-            # 绘制内容
-            self.slide_canvas.create_text(400, 300, text=slide["content"], 
-                                         font=("Arial", 18), fill="#34495e", width=600)
-        
-        elif layout == "two_columns":
-            self.slide_canvas.create_text(400, 80, text=slide["title"], 
-                                         font=("Arial", 32, "bold"), fill="#2c3e50")
-            # 左栏
-            self.slide_canvas.create_text(200, 300, text="左栏内容", 
-                                         font=("Arial", 16), fill="#34495e", width=300)
-            # 右栏
-            self.slide_canvas.create_text(600, 300, text="右栏内容", 
-                                         font=("Arial", 16), fill="#34495e", width=300)
-        
-        elif layout == "title_only":
-            self.slide_canvas.create_text(400, 250, text=slide["title"], 
-                                         font=("Arial", 36, "bold"), fill="#2c3e50")
-        
-        # 显示幻灯片编号
-        self.slide_canvas.create_text(750, 480, text=f"{self.current_slide_index + 1}/{len(self.slides)}", 
-                                     font=("Arial", 12), fill="#7f8c8d")
+        items = slide_scene.scene_items(slide, self.current_slide_index, len(self.slides))
+        self.slide_renderer.render(slide["id"], items)
+        self.refresh_thumbnails()
+        
+    def refresh_thumbnails(self):
+        """更新可见区域的缩略图，内容未变的幻灯片直接使用缓存"""
+        if not self.thumbnail_cache:
+            return
+        canvas = self.thumbnail_canvas
+        slot = slide_thumbnails.THUMBNAIL_SLOT
+        canvas.configure(scrollregion=(0, 0, 136, len(self.slides) * slot))
+        first = max(int(canvas.canvasy(0) // slot), 0)
+        last = min(int(canvas.canvasy(canvas.winfo_height()) // slot) + 1, len(self.slides))
+        
+        visible = set()
+        waiting = False
+        for index in range(first, last):
+            slide = self.slides[index]
+            slide_id = slide["id"]
+            visible.add(slide_id)
+            y = index * slot + 6
+            slot_items = self.thumbnail_slots.get(slide_id)
+            if slot_items is None:
+                border = canvas.create_rectangle(2, y - 2, 134, y + 82, outline='#2c3e50', width=2)
+                image = canvas.create_image(4, y, anchor='nw')
+                slot_items = self.thumbnail_slots[slide_id] = [border, image, None]
+            else:
+                canvas.coords(slot_items[0], 2, y - 2, 134, y + 82)
+                canvas.coords(slot_items[1], 4, y)
+            outline = '#3498db' if index == self.current_slide_index else '#2c3e50'
+            canvas.itemconfigure(slot_items[0], outline=outline)
+            
+            digest, data = self.thumbnail_cache.get(slide_id, slide)
+            if data is None:
+                waiting = True
+            elif digest != slot_items[2]:
+                photo = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+                canvas.itemconfigure(slot_items[1], image=photo)
+                self.thumbnail_photos[slide_id] = photo
+                slot_items[2] = digest
+                
+        # 滚出可见区域的缩略图释放画布项和图像
+        for slide_id in set(self.thumbnail_slots) - visible:
+            canvas.delete(*self.thumbnail_slots.pop(slide_id)[:2])
+            self.thumbnail_photos.pop(slide_id, None)
+            
+        if waiting and not self.thumbnail_polling:
+            self.thumbnail_polling = True
+            self.root.after(50, self.poll_thumbnails)
+            
+    def poll_thumbnails(self):
+        """取出后台渲染完成的缩略图"""
+        self.thumbnail_polling = False
+        finished = False
+        while True:
+            try:
+                self.thumbnail_cache.results.get_nowait()
+                finished = True
+            except queue.Empty:
+                break
+        if finished:
+            self.refresh_thumbnails()
+        elif self.thumbnail_cache.pending:
+            self.thumbnail_polling = True
+            self.root.after(50, self.poll_thumbnails)
+            
+    def scroll_thumbnails(self, *args):
+        """滚动缩略图列表"""
+        self.thumbnail_canvas.yview(*args)
+        self.refresh_thumbnails()
+        
+    def on_thumbnail_wheel(self, event):
+        """鼠标滚轮滚动缩略图"""
+        self.thumbnail_canvas.yview_scroll(-1 if event.delta > 0 else 1, 'units')
+        self.refresh_thumbnails()
+        
+    def on_thumbnail_click(self, event):
+        """点击缩略图切换幻灯片"""
+        index = int(self.thumbnail_canvas.canvasy(event.y) // slide_thumbnails.THUMBNAIL_SLOT)
+        if 0 <= index < len(self.slides):
+            self.select_slide(index)
         
     def create_database_viewer(self):
         """创建数据库查看器"""
         self.db_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.db_frame, text="数据库")
         
-        # 创建数据库管理界面
-        self.create_database_interface()
+        # 数据库管理界面在第一次打开标签页时创建
+        self.register_lazy_tab(self.db_frame, "数据库", self.create_database_interface)
         
     def create_database_interface(self):
         """创建数据库管理界面"""
@@ -947,6 +1419,7 @@ class OfficeMatePro:
             except Exception as e:
                 messagebox.showerror("错误", f"创建失败: {str(e)}")
                 
+    @perf_monitor.timed("execute_sql_query")
     def execute_sql_query(self):
         """执行SQL查询"""
         query = self.query_entry.get()
@@ -987,6 +1460,9 @@ class OfficeMatePro:
         """新建文件"""
         self.text_area.delete('1.0', tk.END)
         self.current_file = None
+        self.pending_sections = (None, set())
+        self.edit_journal.checkpoint("")
+        self.rebuild_outline()
         self.root.title("OfficeMate - 新文档")
         self.add_to_version_history("新建文档")
         
@@ -996,26 +1472,102 @@ class OfficeMatePro:
             defaultextension=".txt",
             filetypes=[
                 ("文本文档", "*.txt"),
+                ("OfficeMate 文档", "*.omd"),
                 ("JSON 文件", "*.json"),
                 ("所有文件", "*.*")
             ]
         )
         if file_path:
-            try:
+            self.load_file(file_path)
+            
+    def load_file(self, file_path):
+        """读取文档到各编辑区"""
+        try:
+            formatting = None
+            if document_container.is_container_path(file_path):
+                # 先只读取正文和格式，表格和幻灯片在第一次用到时再读取
+                document = document_container.read_container(file_path, ("content", "formatting"))
+                content, formatting = document.get("content", ""), document.get("formatting")
+                self.pending_sections = (file_path, {"spreadsheet", "presentation"})
+            else:
                 with open(file_path, 'r', encoding='utf-8') as file:
                     content = file.read()
-                    self.text_area.delete('1.0', tk.END)
-                    self.text_area.insert('1.0', content)
-                    self.current_file = file_path
-                    self.root.title(f"OfficeMate Pro - {os.path.basename(file_path)}")
-                    
-                    # 添加到最近文件列表
-                    self.add_to_recent_files(file_path)
-                    self.add_to_version_history(f"打开文件: {os.path.basename(file_path)}")
-                    
-            except Exception as e:
-                messagebox.showerror("错误", f"无法打开文件: {str(e)}")
+                self.pending_sections = (None, set())
+                document = self.parse_json_document(file_path, content)
+                if document is not None:
+                    content, formatting = str(document.get("content", "")), document.get("formatting")
+                    self.set_cell_data(document.get("spreadsheet_data") or {})
+                    self.set_slides(document.get("presentation_data") or [])
+            self.text_area.delete('1.0', tk.END)
+            self.text_area.insert('1.0', content)
+            rich_text.apply_formatting(self.text_area, formatting, content)
+            self.rebuild_outline()
+            self.current_file = file_path
+            self.edit_journal.checkpoint(content, file_path)
+            self.root.title(f"OfficeMate Pro - {os.path.basename(file_path)}")
+            
+            # 当前显示的是表格或演示文稿时立即读取
+            self.on_tab_changed()
+            
+            # 添加到最近文件列表
+            self.add_to_recent_files(file_path)
+            self.add_to_version_history(f"打开文件: {os.path.basename(file_path)}")
                 
+        except Exception as e:
+            messagebox.showerror("错误", f"无法打开文件: {str(e)}")
+                
+    def parse_json_document(self, file_path, raw):
+        """OfficeMate 保存的 JSON 文档返回文档字典，其他文件返回 None（按纯文本打开）"""
+        if not file_path.lower().endswith('.json'):
+            return None
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return None
+        if isinstance(data, dict) and 'content' in data and 'metadata' in data:
+            return data
+        return None
+        
+    def load_pending_section(self, name):
+        """读取打开 .omd 文档时跳过的分区"""
+        path, names = self.pending_sections
+        if name not in names:
+            return
+        names.discard(name)
+        try:
+            data = document_container.read_section(path, name)
+        except (OSError, ValueError, document_container.ContainerError) as e:
+            messagebox.showerror("错误", f"无法读取文档中的{'表格' if name == 'spreadsheet' else '幻灯片'}: {str(e)}")
+            return
+        if name == "spreadsheet":
+            self.set_cell_data(data or {})
+        else:
+            self.set_slides(data or [])
+            
+    def load_pending_sections(self):
+        """读取所有尚未读取的分区（保存前需要完整的文档）"""
+        for name in list(self.pending_sections[1]):
+            self.load_pending_section(name)
+            
+    def set_cell_data(self, cell_data):
+        """替换表格数据，必要时扩大表格以容纳所有单元格"""
+        self.cell_data.clear()
+        self.cell_data.update(cell_data)
+        for key in cell_data:
+            row, col = (int(part) for part in key.split(','))
+            self.rows = max(self.rows, row + 1)
+            self.cols = max(self.cols, col + 1)
+        if self.cells:
+            self.create_table()
+            
+    def set_slides(self, slides):
+        """替换全部幻灯片"""
+        self.slide_deck.delete_many([slide["id"] for slide in self.slides])
+        self.slide_deck.insert(0, slides or [self.new_slide_data()])
+        self.current_slide_index = 0
+        if str(self.presentation_frame) not in self.lazy_tabs:
+            self.select_slide(0)
+        
     def save_file(self):
         """保存文件"""
         if self.current_file:
@@ -1029,6 +1581,7 @@ class OfficeMatePro:
             defaultextension=".txt",
             filetypes=[
                 ("文本文档", "*.txt"),
+                ("OfficeMate 文档", "*.omd"),
                 ("JSON 文件", "*.json"),
                 ("所有文件", "*.*")
             ]
@@ -1041,25 +1594,16 @@ class OfficeMatePro:
     def save_document(self, auto_save=False):
         """保存文档"""
         try:
-            content = self.text_area.get('1.0', 'end-1c')
-            
-            if self.current_file.endswith('.json'):
-                document_data = {
-                    'metadata': {
-                        'version': '2.0',
-                        'created_at': datetime.now().isoformat(),
-                        'modified_at': datetime.now().isoformat(),
-                        'author': self.user_id
-                    },
-                    'content': content,
-                    'spreadsheet_data': self.cell_data,
-                    'presentation_data': self.slides
-                }
-                with open(self.current_file, 'w', encoding='utf-8') as f:
-                    json.dump(document_data, f, ensure_ascii=False, indent=2)
-            else:
-                with open(self.current_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
+            # 只统计写盘部分，不包括提示框
+            self.load_pending_sections()
+            with perf_monitor.measure("save_document"):
+                content = self.text_area.get('1.0', 'end-1c')
+                formatting = rich_text.dump_formatting(self.text_area)
+                document_data = document_engine.build_document(content, self.cell_data, self.slides, self.user_id,
+                                                               formatting)
+                document_engine.write_document(self.current_file, document_data)
+            # 文件已完整写入，日志从保存的内容重新开始
+            self.edit_journal.checkpoint(content, self.current_file)
                     
             if not auto_save:
                 messagebox.showinfo("成功", "文档已保存")
@@ -1068,66 +1612,100 @@ class OfficeMatePro:
         except Exception as e:
             messagebox.showerror("错误", f"保存失败: {str(e)}")
             
+    def export_presentation_dialog(self):
+        """导出演示文稿为 PDF 或逐页 PNG（后台多进程渲染）"""
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        
+        if not HAS_PIL:
+            messagebox.showerror("错误", "导出演示文稿需要安装 Pillow")
+            return
+        self.load_pending_section("presentation")
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[
+                ("PDF 文件", "*.pdf"),
+                ("PNG 图片", "*.png")
+            ]
+        )
+        if not file_path:
+            return
+        fmt = 'png' if file_path.lower().endswith('.png') else 'pdf'
+        out_path = os.path.splitext(file_path)[0] if fmt == 'png' else file_path
+        # 导出期间继续编辑不影响导出内容
+        slides = json.loads(json.dumps(self.slides, default=str))
+        
+        def run():
+            with ProcessPoolExecutor() as executor:
+                return slide_export.export_presentation(slides, out_path, fmt, executor=executor)
+                
+        worker = ThreadPoolExecutor(max_workers=1)
+        future = worker.submit(run)
+        worker.shutdown(wait=False)
+        
+        def check():
+            if not future.done():
+                self.root.after(100, check)
+                return
+            try:
+                count = future.result()
+                messagebox.showinfo("成功", f"已导出 {count} 张幻灯片")
+            except Exception as e:
+                messagebox.showerror("错误", f"导出失败: {str(e)}")
+                
+        self.root.after(100, check)
+            
     def export_document(self):
-        """导出文档"""
+        """导出正文（保留文本标签的格式），分步执行，导出期间界面保持响应"""
+        if self.export_writer:
+            messagebox.showinfo("导出", "正在导出，请稍候")
+            return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".html",
             filetypes=[
                 ("HTML 文件", "*.html"),
+                ("Markdown 文件", "*.md"),
+                ("PDF 文件", "*.pdf"),
                 ("文本文件", "*.txt"),
                 ("所有文件", "*.*")
             ]
         )
-        if file_path:
-            try:
-                content = self.text_area.get('1.0', 'end-1c')
-                
-                if file_path.endswith('.html'):
-                    html_content = f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <meta charset="UTF-8">
-                        <title>OfficeMate Pro 文档</title>
-                        <style>
-                            body {{ 
-                                font-family: Arial, sans-serif; 
-                                margin: 40px;
-                                line-height: 1.6;
-                                color: #333;
-                            }}
-                            .content {{ 
-                                white-space: pre-wrap;
-                                background: #f8f9fa;
-                                padding: 20px;
-                                border-radius: 5px;
-                                border: 1px solid #ddd;
-                            }}
-                            .header {{
-                                text-align: center;
-                                margin-bottom: 30px;
-                                color: #2c3e50;
-                            }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="header">
-                            <h1>OfficeMate Pro 文档</h1>
-                            <p>导出时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        </div>
-                        <div class="content">{content}</div>
-                    </body>
-                    </html>
-                    """
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(html_content)
-                else:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                        
-                messagebox.showinfo("成功", "文档导出完成")
-            except Exception as e:
-                messagebox.showerror("错误", f"导出失败: {str(e)}")
+        if not file_path:
+            return
+        title = os.path.basename(self.current_file) if self.current_file else "OfficeMate Pro 文档"
+        try:
+            self.export_writer = document_export.open_writer(file_path, title=title)
+        except Exception as e:
+            messagebox.showerror("错误", f"导出失败: {str(e)}")
+            return
+        # 导出按行号分块读取，期间不允许编辑，远程变更也暂缓应用
+        self.text_area.config(state='disabled')
+        self.hint_label.config(text="正在导出...")
+        self.export_step(document_export.paragraphs_from_widget(self.text_area))
+        
+    def export_step(self, paragraphs):
+        """写出一批段落，用时达到 EXPORT_STEP_MS 后让出 Tk 线程"""
+        writer = self.export_writer
+        deadline = time.perf_counter() + EXPORT_STEP_MS / 1000
+        try:
+            for block, runs in paragraphs:
+                writer.write_paragraph(block, runs)
+                if time.perf_counter() >= deadline:
+                    self.hint_label.config(text=f"正在导出... 已写出 {writer.paragraphs} 段")
+                    self.root.after(1, self.export_step, paragraphs)
+                    return
+            writer.close()
+        except Exception as e:
+            writer.abort()
+            self.finish_export()
+            messagebox.showerror("错误", f"导出失败: {str(e)}")
+            return
+        self.finish_export()
+        messagebox.showinfo("成功", f"文档导出完成（{writer.paragraphs} 段）")
+        
+    def finish_export(self):
+        self.export_writer = None
+        self.text_area.config(state='normal')
+        self.hint_label.config(text="")
 
     # ===== AI 功能实现 =====
     
@@ -1181,20 +1759,40 @@ class OfficeMatePro:
         
         self.setup_grammar_checker(grammar_frame)
         
+    def get_assistant(self):
+        """写作助手服务，第一次使用时才加载后端"""
+        if self.assistant is None:
+            backend = assistant_backend.create_backend(self.user_preferences)
+            self.assistant = assistant_backend.AssistantService(backend)
+        return self.assistant
+        
+    def run_assistant(self, futures, on_done):
+        """等待助手的 Future 全部完成后在 Tk 线程中调用 on_done(结果列表)；失败时结果为异常"""
+        def check():
+            if not all(future.done() for future in futures):
+                self.root.after(100, check)
+                return
+            results = [future.exception() or future.result() for future in futures]
+            on_done(results)
+            
+        self.root.after(50, check)
+        
+    def set_widget_text(self, widget, text):
+        """窗口可能在助手返回前已关闭"""
+        if widget.winfo_exists():
+            widget.delete('1.0', tk.END)
+            widget.insert('1.0', text)
+            
     def generate_ai_content(self, prompt, writing_type, result_widget):
-        """生成AI内容"""
-        # 模拟AI生成内容
-        responses = {
-            "正式": f"基于您的要求，我为您准备了以下正式文档内容：\n\n{prompt}\n\n此文档经过精心组织，语言规范，符合专业写作标准。内容结构清晰，逻辑严密，适合商务和官方场合使用。",
-            "创意": f"✨ 创意写作时间！ ✨\n\n{prompt}\n\n让我们用想象力创造精彩的内容！这段文字充满了生动的比喻和丰富的意象，让读者仿佛身临其境。",
-            "商务": f"📊 商务文档生成：\n\n{prompt}\n\n此内容适合商务场合使用，语言专业但不失亲和力。重点突出，建议明确，能够有效传达商业意图。",
-            "技术": f"🔧 技术文档：\n\n{prompt}\n\n技术描述准确，术语使用规范。包含详细的操作步骤和技术参数，适合开发人员和技术人员参考。",
-            "学术": f"🎓 学术写作：\n\n{prompt}\n\n语言严谨，引用规范，逻辑清晰。符合学术写作标准，适合论文和研究报告使用。"
-        }
+        """生成AI内容（在后台调用助手后端）"""
+        self.set_widget_text(result_widget, "正在生成...")
+        future = self.get_assistant().submit("generate", prompt, style=writing_type)
         
-        result = responses.get(writing_type, "请选择有效的写作类型")
-        result_widget.delete('1.0', tk.END)
-        result_widget.insert('1.0', result)
+        def done(results):
+            result = results[0]
+            self.set_widget_text(result_widget, f"❌ {result}" if isinstance(result, Exception) else result)
+            
+        self.run_assistant([future], done)
         
     def setup_grammar_checker(self, parent):
         """设置语法检查器"""
@@ -1216,28 +1814,35 @@ class OfficeMatePro:
         result_text.pack(fill='both', expand=True)
         
     def check_grammar(self, text, result_widget):
-        """检查语法"""
-        # 简单的语法检查模拟
-        issues = []
-        
-        if len(text.split()) < 10:
-            issues.append("⚠️ 文本过短，建议补充更多内容")
-            
-        if '。' not in text and '.' not in text:
-            issues.append("❌ 缺少句号，请检查句子完整性")
-            
-        if text.count('，') < text.count('。') * 0.5:
-            issues.append("💡 建议增加逗号使用，使句子结构更清晰")
-            
-        if not any(char.isdigit() for char in text):
-            issues.append("📊 可以考虑添加具体数据支持观点")
-            
-        if len(issues) == 0:
-            issues.append("✅ 文本语法检查通过！")
-            
-        result = "\n".join(issues)
+        """检查语法（拼写和文风，在后台检查）"""
         result_widget.delete('1.0', tk.END)
-        result_widget.insert('1.0', result)
+        result_widget.insert('1.0', "正在检查...")
+        future = self.spell_service.check_text(text.rstrip('\n'))
+        
+        def check():
+            if not future.done():
+                self.root.after(100, check)
+                return
+            try:
+                issues = future.result()
+            except Exception as e:
+                issues = None
+                result = f"❌ 检查失败: {e}"
+            if issues is not None:
+                result = "\n".join(self.format_spelling_issue(line, issue) for line, issue in issues) \
+                    or "✅ 文本语法检查通过！"
+            if result_widget.winfo_exists():
+                result_widget.delete('1.0', tk.END)
+                result_widget.insert('1.0', result)
+                
+        self.root.after(100, check)
+        
+    def format_spelling_issue(self, line, issue):
+        mark = "❌" if issue.kind == spell_checker.SPELLING else "💡"
+        text = f"{mark} 第 {line} 行: {issue.message}"
+        if issue.suggestions:
+            text += f"，建议: {'、'.join(issue.suggestions)}"
+        return text
         
     def ai_grammar_check(self):
         """AI语法检查"""
@@ -1251,22 +1856,42 @@ class OfficeMatePro:
         """AI内容优化"""
         selected_text = self.get_selected_text()
         if selected_text:
-            # 在实际应用中，这里会调用AI API进行内容优化
-            optimized = f"优化建议：\n\n{selected_text}\n\n💡 建议：\n- 调整句子结构使其更流畅\n- 使用更精确的词汇\n- 增加具体例子支持观点"
-            self.show_ai_result("内容优化", optimized)
+            text_widget = self.show_ai_result("内容优化", "正在分析...")
+            future = self.get_assistant().submit("optimize", selected_text)
+            
+            def done(results):
+                suggestions = results[0]
+                if isinstance(suggestions, Exception):
+                    tips = f"❌ {suggestions}"
+                else:
+                    tips = "\n".join(f"- {tip}" for tip in suggestions) or "- 未发现明显问题"
+                self.set_widget_text(text_widget, f"优化建议：\n\n{selected_text}\n\n💡 建议：\n{tips}")
+                
+            self.run_assistant([future], done)
         else:
             messagebox.showinfo("提示", "请先选择要优化的文本")
             
     def ai_text_summarize(self):
         """AI文本摘要"""
-        selected_text = self.get_selected_text()
-        if selected_text and len(selected_text.split()) > 50:
-            # 模拟文本摘要
-            words = selected_text.split()
-            summary = " ".join(words[:30]) + "...\n\n📋 摘要要点：\n• 主要讨论了相关内容\n• 提出了重要观点\n• 建议进一步研究"
-            self.show_ai_result("文本摘要", summary)
-        else:
-            messagebox.showinfo("提示", "请选择至少50词的文本进行摘要")
+        # 没有选中文本时对全文摘要
+        text = self.get_selected_text() or self.text_area.get('1.0', 'end-1c')
+        if not assistant_backend.has_sentences(text):
+            messagebox.showinfo("提示", "请选择至少两句话的文本进行摘要")
+            return
+        text_widget = self.show_ai_result("文本摘要", "正在生成摘要...")
+        # 两个请求合并为一批交给后端
+        futures = [self.get_assistant().submit("summarize", text), self.get_assistant().submit("keywords", text)]
+        
+        def done(results):
+            summary, keywords = results
+            if isinstance(summary, Exception) or isinstance(keywords, Exception):
+                error = summary if isinstance(summary, Exception) else keywords
+                self.set_widget_text(text_widget, f"❌ {error}")
+                return
+            self.set_widget_text(text_widget, "📋 摘要：\n" + "\n".join(f"• {sentence}" for sentence in summary) +
+                                 "\n\n🔑 关键词：" + "、".join(keywords))
+            
+        self.run_assistant(futures, done)
             
     def get_selected_text(self):
         """获取选中的文本"""
@@ -1285,11 +1910,12 @@ class OfficeMatePro:
         text_widget.pack(fill='both', expand=True, padx=10, pady=10)
         text_widget.insert('1.0', content)
         
-        # 插入按钮
+        # 插入按钮（内容可能在助手返回后更新）
         insert_btn = ttk.Button(result_window, text="插入到文档", 
-                              command=lambda: self.insert_ai_content(content, result_window),
+                              command=lambda: self.insert_ai_content(text_widget.get('1.0', 'end-1c'), result_window),
                               style='Success.TButton')
         insert_btn.pack(pady=10)
+        return text_widget
         
     def insert_ai_content(self, content, window):
         """插入AI生成的内容"""
@@ -1345,10 +1971,15 @@ class OfficeMatePro:
             if self.current_underline:
                 font_spec.append("underline")
                 
-            # 创建标签
-            tag_name = f"format_{len(self.document_history)}"
+            # 相同格式共用一个标签，标签数不随操作次数增长
+            tag_name = "format_" + "_".join(str(part) for part in font_spec).replace(" ", "-")
             self.text_area.tag_configure(tag_name, font=font_spec)
+            # 复用的标签保留最初的优先级：先去掉选区内其他格式标签，再提到最高，新格式才能生效
+            for tag in self.text_area.tag_names():
+                if tag.startswith("format_") and tag != tag_name:
+                    self.text_area.tag_remove(tag, start, end)
             self.text_area.tag_add(tag_name, start, end)
+            self.text_area.tag_raise(tag_name)
             
         except tk.TclError:
             # 没有选中文本
@@ -1360,34 +1991,45 @@ class OfficeMatePro:
         """启动协作服务器"""
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind(('localhost', 12345))
             self.server_socket.listen(5)
             
-            server_thread = threading.Thread(target=self.run_collaboration_server)
+            if self.collab_use_tls:
+                cert_file, key_file = collab_tls.ensure_certificate()
+                self.tls_server_context = collab_tls.create_server_context(cert_file, key_file)
+            else:
+                self.tls_server_context = None
+            
+            # 服务器以当前文档为初始快照
+            content = self.text_area.get('1.0', 'end-1c')
+            self.collab_server = collab_server.CollaborationServer(content, self.user_id, self.collab_inbox,
+                                                                   self.tls_server_context)
+            self.collab_sync = collab_sync.SyncState(last_seq=0)
+            self.presence_sampler = collab_presence.PresenceSampler()
+            self.collab_shadow = content
+            self.collab_role = 'server'
+            
+            server_thread = threading.Thread(target=self.collab_server.serve, args=(self.server_socket,))
             server_thread.daemon = True
             server_thread.start()
             
             self.collaboration_mode = True
+            if not self.collab_polling:
+                self.poll_collaboration_inbox()
+            if not self.presence_ticking:
+                self.presence_tick()
             self.collab_label.config(text="服务器运行中", fg='green')
-            messagebox.showinfo("协作", "协作服务器已启动在 localhost:12345")
+            mode = "TLS加密" if self.tls_server_context else "未加密"
+            messagebox.showinfo("协作", f"协作服务器已启动在 localhost:12345 ({mode})")
         except Exception as e:
             messagebox.showerror("错误", f"无法启动服务器: {str(e)}")
             
-    def run_collaboration_server(self):
-        """运行协作服务器"""
-        while True:
-            try:
-                client_socket, address = self.server_socket.accept()
-                self.connected_clients.append(client_socket)
-                print(f"客户端连接: {address}")
-            except:
-                break
-                
     def connect_to_server_dialog(self):
         """连接到服务器对话框"""
         connect_window = tk.Toplevel(self.root)
         connect_window.title("连接到服务器")
-        connect_window.geometry("400x300")
+        connect_window.geometry("400x380")
         
         tk.Label(connect_window, text="服务器地址:").pack(pady=5)
         address_entry = tk.Entry(connect_window, width=20)
@@ -1399,34 +2041,370 @@ class OfficeMatePro:
         port_entry.pack(pady=5)
         port_entry.insert(0, "12345")
         
+        tls_var = tk.BooleanVar(value=self.collab_use_tls)
+        tk.Checkbutton(connect_window, text="TLS加密", variable=tls_var).pack(pady=5)
+        
+        tk.Label(connect_window, text="服务器证书:").pack(pady=5)
+        cert_entry = tk.Entry(connect_window, width=30)
+        cert_entry.pack(pady=5)
+        default_cert = collab_tls.COLLAB_CERT_FILE
+        cert_entry.insert(0, default_cert if os.path.exists(default_cert) else collab_tls.FALLBACK_CERT_FILE)
+        
         connect_btn = ttk.Button(connect_window, text="连接", 
                                command=lambda: self.connect_to_server(
                                    address_entry.get(), 
                                    port_entry.get(), 
-                                   connect_window
+                                   connect_window,
+                                   use_tls=tls_var.get(),
+                                   cert_file=cert_entry.get()
                                ))
         connect_btn.pack(pady=10)
         
-    def connect_to_server(self, address, port, window):
+    def connect_to_server(self, address, port, window, use_tls=True, cert_file=None):
         """连接到服务器"""
         try:
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.connect((address, int(port)))
+            port = int(port)
+            # 每个服务器一个离线操作日志，沿用上次的客户端ID
+            if self.collab_oplog:
+                self.collab_oplog.close()
+            self.collab_oplog = collab_offline.OfflineOpLog(session_key=f"{address}:{port}")
+            self.user_id = self.collab_oplog.client_id(self.user_id)
+            self.collab_sync = collab_sync.SyncState(self.collab_oplog)
+            self.presence_sampler = collab_presence.PresenceSampler()
+            local_text = self.collab_sync.local_text()
+            if local_text is not None:
+                # 从上次断开时保存的同步点继续：握手时服务器只补发之后的增量
+                self.replace_collaboration_text(local_text)
+            self.collab_tls_settings = (use_tls, cert_file or None)
+            self.collab_address = (address, port)
+            
+            sock = self.open_collaboration_socket()
+            self.collab_role = 'client'
             self.collaboration_mode = True
-            self.collab_label.config(text=f"已连接: {address}", fg='green')
+            self.start_client_session(sock)
+            
+            if not self.collab_polling:
+                self.poll_collaboration_inbox()
+            if not self.presence_ticking:
+                self.presence_tick()
             window.destroy()
             messagebox.showinfo("成功", f"已连接到服务器 {address}:{port}")
         except Exception as e:
             messagebox.showerror("错误", f"连接失败: {str(e)}")
             
+    def open_collaboration_socket(self):
+        """建立到服务器的（TLS）连接，可在后台线程调用"""
+        address, port = self.collab_address
+        use_tls, cert_file = self.collab_tls_settings
+        sock = socket.create_connection((address, port), timeout=10)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if use_tls:
+            context_key = (cert_file, os.stat(cert_file).st_mtime_ns if cert_file else None)
+            if self.tls_client_context is None or context_key != self.tls_client_key:
+                # 换了证书文件或文件被更新：重建上下文，旧上下文的会话不能再复用
+                self.tls_client_context = collab_tls.create_client_context(cert_file)
+                self.tls_client_key = context_key
+                self.tls_session_cache = collab_tls.TLSSessionCache()
+            # 复用缓存的会话，重连时跳过完整握手
+            sock = self.tls_session_cache.wrap(self.tls_client_context, sock, address, port)
+        return sock
+        
+    def start_client_session(self, sock):
+        """握手（Tk线程）；未确认的本地批次在握手确认后提交"""
+        self.client_socket = sock
+        self.collab_sender = collab_server.FrameSender(sock)
+        self.collab_awaiting_hello_ack = True
+        self.collab_sender.send(encode_frame(MSG_HELLO, encode_hello(self.user_id, self.collab_sync.last_seq)))
+        
+        receiver = threading.Thread(target=self.receive_collaboration_frames, args=(sock,))
+        receiver.daemon = True
+        receiver.start()
+        self.reconnect_delay = 1000
+        self.collab_label.config(text=f"已连接: {self.collab_address[0]}", fg='green')
+            
+    def receive_collaboration_frames(self, sock):
+        """接收服务器消息（客户端，后台线程）"""
+        decoder = FrameDecoder()
+        session_saved = False
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                if not session_saved and isinstance(sock, ssl.SSLSocket):
+                    # TLS1.3 的会话票据在握手后随首批数据到达
+                    self.tls_session_cache.store(*self.collab_address, sock)
+                    session_saved = True
+                for msg_type, payload in decoder.feed(data):
+                    if msg_type == MSG_SNAPSHOT:
+                        self.collab_inbox.put((MSG_SNAPSHOT, decode_snapshot(payload)))
+                    elif msg_type == MSG_OPS:
+                        self.collab_inbox.put((MSG_OPS, decode_ops_message(payload)))
+                    elif msg_type == MSG_ACK:
+                        self.collab_inbox.put((MSG_ACK, decode_ack(payload)))
+                    elif msg_type == MSG_PRESENCE:
+                        self.collab_inbox.put((MSG_PRESENCE, decode_presence(payload)))
+        except (OSError, ProtocolError) as e:
+            print(f"协作连接中断: {e}")
+        self.collab_inbox.put(('disconnected', sock))
+            
+    def poll_collaboration_inbox(self):
+        """在Tk线程中应用后台线程收到的远程变更"""
+        self.collab_polling = False
+        # 导出期间正文只读且正被分块读取，远程变更留在队列中，导出完成后按顺序应用
+        while self.export_writer is None:
+            try:
+                msg_type, data = self.collab_inbox.get_nowait()
+            except queue.Empty:
+                break
+            if msg_type == MSG_SNAPSHOT:
+                self.handle_snapshot(*data)
+            elif msg_type == MSG_OPS:
+                self.handle_remote_ops(*data)
+            elif msg_type == MSG_ACK:
+                self.handle_collaboration_ack(*data)
+            elif msg_type == MSG_PRESENCE:
+                self.render_presence(data)
+            elif msg_type == 'disconnected':
+                self.handle_connection_lost(data)
+            elif msg_type == 'reconnected':
+                self.start_client_session(data)
+            elif msg_type == 'reconnect_failed':
+                self.schedule_reconnect()
+                
+        if self.collaboration_mode:
+            self.collab_polling = True
+            self.root.after(30, self.poll_collaboration_inbox)
+            
+    def handle_snapshot(self, seq, text):
+        """快照替换本地文本；基于旧文本的本地批次在握手确认后处理"""
+        self.collect_local_edits()
+        detached = self.collab_sync.reset(seq, text)
+        if detached and not self.collab_detached:
+            # 保留替换前的本地文本，其中的编辑若无法合并还能找回
+            self.collab_detached_text = self.text_area.get('1.0', 'end-1c')
+        self.collab_detached += detached
+        self.replace_collaboration_text(text)
+        
+    def replace_collaboration_text(self, text):
+        """用同步得到的文本替换正文"""
+        self.text_area.delete('1.0', tk.END)
+        self.text_area.insert('1.0', text)
+        self.schedule_outline_update()
+        self.collab_shadow = text
+        
+    def save_collaboration_state(self):
+        """保存同步点（断线、断开和退出时），重启后从这里继续
+
+        快照前的批次尚未处理时不保存：它们不在同步点之上，等握手确认后再处理。
+        """
+        if self.collab_role != 'client' or self.collab_detached:
+            return
+        self.collect_local_edits()
+        try:
+            self.collab_sync.save()
+        except sqlite3.Error as e:
+            print(f"保存协作同步点失败: {e}")
+        
+    def handle_remote_ops(self, seq_start, author, client_ref, ops):
+        """把已提交的远程操作变换到本地未确认的编辑之后再应用"""
+        self.collect_local_edits()
+        ops = self.collab_sync.receive(seq_start, author, client_ref, ops, self.user_id)
+        if ops:
+            self.apply_remote_ops(ops)
+            
+    def handle_collaboration_ack(self, seq, client_ref):
+        """服务器确认：删除已提交的批次，提交下一批"""
+        self.collab_sync.acknowledge(seq, client_ref)
+        if self.collab_awaiting_hello_ack:
+            self.collab_awaiting_hello_ack = False
+            self.drop_detached_batches(client_ref)
+        self.submit_local_edits()
+        self.update_offline_label()
+        
+    def drop_detached_batches(self, committed_ref):
+        """处理收到快照前未提交的本地批次：它们基于旧的文本，无法合并"""
+        if not self.collab_detached:
+            return
+        lost = [ref for ref, _ in self.collab_detached if ref > committed_ref]
+        self.collab_oplog.ack(self.collab_detached[-1][0])
+        self.collab_detached = []
+        local_text, self.collab_detached_text = self.collab_detached_text, ""
+        if not lost:
+            return
+        backup_path = f"collab_conflict_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        try:
+            atomic_write(backup_path, local_text)
+        except OSError as e:
+            messagebox.showerror("协作", f"{len(lost)} 个未同步的编辑批次无法合并，本地文本备份失败: {e}")
+            return
+        messagebox.showwarning("协作", f"服务器已无法补发离线期间缺失的操作，{len(lost)} 个未同步的编辑批次无法合并。\n"
+                                     f"同步前的本地文本已保存到 {os.path.abspath(backup_path)}")
+        
+    def handle_connection_lost(self, sock):
+        """连接意外断开：进入离线编辑，稍后自动重连"""
+        if sock is not self.client_socket or not self.collaboration_mode:
+            return
+        self.collab_sender.close()
+        self.collab_sender = None
+        self.client_socket = None
+        self.collab_sync.disconnected()
+        self.save_collaboration_state()
+        self.update_offline_label()
+        self.schedule_reconnect()
+        
+    def schedule_reconnect(self):
+        """按指数退避安排重连"""
+        if not self.collaboration_mode or self.collab_role != 'client':
+            return
+        self.root.after(self.reconnect_delay, self.try_reconnect)
+        self.reconnect_delay = min(self.reconnect_delay * 2, 30000)
+        
+    def try_reconnect(self):
+        """在后台线程中尝试重连，避免阻塞界面"""
+        if not self.collaboration_mode or self.client_socket:
+            return
+        
+        def worker():
+            try:
+                self.collab_inbox.put(('reconnected', self.open_collaboration_socket()))
+            except OSError as e:
+                print(f"重连失败: {e}")
+                self.collab_inbox.put(('reconnect_failed', None))
+                
+        threading.Thread(target=worker, daemon=True).start()
+        
+    def update_offline_label(self):
+        """在状态栏显示离线状态和待同步批次数"""
+        if self.collab_role != 'client':
+            return
+        pending = len(self.collab_sync.pending)
+        if self.client_socket:
+            text = f"已连接: {self.collab_address[0]}"
+            if pending:
+                text += f" (待同步 {pending})"
+            self.collab_label.config(text=text, fg='green')
+        else:
+            self.collab_label.config(text=f"离线编辑中 (待同步 {pending})", fg='orange')
+            
+    def apply_remote_ops(self, ops):
+        """将远程操作应用到文本区域"""
+        for kind, pos, data in ops:
+            if kind == OP_INSERT:
+                self.text_area.insert(f"1.0+{pos}c", data)
+            else:
+                self.text_area.delete(f"1.0+{pos}c", f"1.0+{pos + data}c")
+        self.collab_shadow = apply_ops(self.collab_shadow, ops)
+        self.schedule_outline_update()
+        
+    def record_local_edit(self):
+        """记录本地编辑，合并后批量发送"""
+        content = self.text_area.get('1.0', 'end-1c')
+        ops = diff_text(self.collab_shadow, content)
+        if not ops:
+            return
+        self.collab_shadow = content
+        now = time.monotonic()
+        for op in ops:
+            self.collab_batcher.add(op, now)
+        if not self.collab_flush_pending:
+            self.collab_flush_pending = True
+            self.root.after(int(self.collab_batcher.window * 1000), self.flush_local_edits)
+            
+    def collect_local_edits(self):
+        """把尚未发送的本地编辑记为一个批次（应用远程操作前调用）"""
+        self.record_local_edit()
+        ops = self.collab_batcher.flush()
+        if ops:
+            self.collab_sync.add_local(ops)
+            
+    def flush_local_edits(self):
+        """把合并后的本地编辑记为一个批次并提交"""
+        self.collab_flush_pending = False
+        if not self.collaboration_mode:
+            return
+        ops = self.collab_batcher.flush()
+        if ops:
+            # 客户端先写入离线日志，服务器确认后删除；离线时只记录
+            self.collab_sync.add_local(ops)
+        self.submit_local_edits()
+        self.update_offline_label()
+        
+    def submit_local_edits(self):
+        """没有在途批次时提交未确认的本地编辑（合并为一个批次）"""
+        if self.collab_role == 'server':
+            batch = self.collab_sync.take_submit()
+            if batch:
+                try:
+                    self.collab_server.submit_local(*batch)
+                except ProtocolError as e:
+                    print(f"提交编辑失败: {e}")
+        elif self.collab_sender and not self.collab_awaiting_hello_ack:
+            batch = self.collab_sync.take_submit()
+            if batch:
+                self.collab_sender.send(encode_frame(MSG_SUBMIT, encode_submit(*batch)))
+            
+    def sample_presence(self):
+        """采样本地光标和选区（只记录，由 presence_tick 限频发送）"""
+        cursor = self.text_offset(tk.INSERT)
+        if self.text_area.tag_ranges('sel'):
+            self.presence_sampler.update(cursor, self.text_offset('sel.first'), self.text_offset('sel.last'))
+        else:
+            self.presence_sampler.update(cursor)
+            
+    def text_offset(self, index):
+        """文本索引转换为字符偏移"""
+        count = self.text_area.count('1.0', index, 'chars')
+        return count[0] if count else 0
+        
+    def presence_tick(self):
+        """周期性发送/广播在线状态"""
+        self.presence_ticking = False
+        if not self.collaboration_mode:
+            return
+        state = self.presence_sampler.take(time.monotonic())
+        if self.collab_role == 'server':
+            entries = self.collab_server.presence_tick(state)
+            if entries:
+                self.render_presence(entries)
+        elif state is not None and self.collab_sender:
+            payload = encode_presence([(self.user_id, state)])
+            self.collab_sender.send(encode_frame(MSG_PRESENCE, payload))
+        self.presence_ticking = True
+        self.root.after(int(collab_presence.PRESENCE_INTERVAL * 1000), self.presence_tick)
+        
+    def render_presence(self, entries):
+        """显示远程用户光标"""
+        if self.presence_renderer is None:
+            self.presence_renderer = collab_presence.RemoteCursorRenderer(self.text_area, self.user_id)
+        self.presence_renderer.apply(entries)
+        
     def disconnect_from_server(self):
         """断开服务器连接"""
+        if self.collab_role == 'client' and self.collab_oplog:
+            # 未发送的编辑写入离线日志，下次连接时从同步点补发
+            self.flush_local_edits()
+            self.save_collaboration_state()
+        self.collaboration_mode = False
         if self.client_socket:
-            self.client_socket.close()
+            if isinstance(self.client_socket, ssl.SSLSocket) and self.collab_address:
+                self.tls_session_cache.store(*self.collab_address, self.client_socket)
+            self.collab_sender.close()
+            self.collab_sender = None
+            self.client_socket = None
         if self.server_socket:
             self.server_socket.close()
+            self.server_socket = None
+        if self.collab_server:
+            self.collab_server.close()
+            self.collab_server = None
+        self.presence_sampler = None
+        if self.presence_renderer:
+            self.presence_renderer.clear()
+            self.presence_renderer = None
             
-        self.collaboration_mode = False
+        self.collab_role = None
         self.collab_label.config(text="离线", fg='red')
         messagebox.showinfo("协作", "已断开连接")
         
@@ -1467,10 +2445,163 @@ class OfficeMatePro:
 
     # ===== 实用工具功能 =====
     
+    @perf_monitor.timed("on_text_change")
     def on_text_change(self, event=None):
         """文本变化处理"""
         self.update_word_count()
         self.update_cursor_position()
+        self.schedule_journal_record()
+        self.schedule_outline_update()
+        self.schedule_spell_check()
+        if self.collaboration_mode:
+            self.record_local_edit()
+        
+    # ===== 文档结构 =====
+    
+    def heading_tag_lines(self, first_line, last_line):
+        return heading_tag_lines(self.text_area, first_line, last_line)
+        
+    def rebuild_outline(self):
+        """重新扫描全文（打开、新建文档后）"""
+        self.outline_update_pending = False
+        last_line = int(self.text_area.index('end-1c').split('.')[0])
+        self.outline.rebuild(self.text_area.get('1.0', 'end-1c'), self.heading_tag_lines(1, last_line))
+        self.outline_tree.reset()
+        
+    def schedule_outline_update(self):
+        """输入时合并为每 OUTLINE_UPDATE_DELAY 毫秒最多更新一次"""
+        if not self.outline_update_pending:
+            self.outline_update_pending = True
+            self.root.after(OUTLINE_UPDATE_DELAY, self.update_outline)
+            
+    @perf_monitor.timed("update_outline")
+    def update_outline(self):
+        """只重新识别变化的行"""
+        self.outline_update_pending = False
+        if self.outline.update(self.text_area.get('1.0', 'end-1c'), self.heading_tag_lines):
+            self.outline_tree.refresh()
+            
+    def refresh_outline_lines(self, first, last):
+        """样式变化后重新识别 first..last 行"""
+        self.update_outline()
+        lines = self.text_area.get(f"{first}.0", f"{last}.end").split('\n')
+        self.outline.refresh_lines(first, lines, self.heading_tag_lines(first, last))
+        self.outline_tree.refresh()
+        
+    def jump_to_heading(self, event=None):
+        """跳转到文档结构中选中的标题"""
+        selection = self.doc_tree.selection()
+        if not selection:
+            return
+        if self.outline_update_pending:
+            self.update_outline()
+        line = self.outline.line_of(selection[0])
+        if line is None:
+            return
+        self.text_area.mark_set(tk.INSERT, f"{line}.0")
+        self.text_area.see(f"{line}.0")
+        self.text_area.focus_set()
+        self.update_cursor_position()
+        
+    # ===== 拼写检查 =====
+    
+    def on_text_scroll(self, scrollbar, *args):
+        scrollbar.set(*args)
+        self.schedule_spell_check()
+        
+    def schedule_spell_check(self):
+        if not self.spell_check_pending:
+            self.spell_check_pending = True
+            self.root.after(SPELL_CHECK_DELAY, self.check_visible_spelling)
+            
+    def check_visible_spelling(self):
+        """检查可见区域的段落：已缓存的立即标记，其余交给后台线程"""
+        self.spell_check_pending = False
+        first = int(self.text_area.index('@0,0').split('.')[0])
+        last = int(self.text_area.index(f'@0,{self.text_area.winfo_height()}').split('.')[0])
+        lines = self.text_area.get(f"{first}.0", f"{last}.end").split('\n')
+        if self.spell_service.request(lines) and not self.spell_polling:
+            self.spell_polling = True
+            self.root.after(100, self.poll_spell_results)
+        self.render_spelling(first, lines)
+        
+    def render_spelling(self, first, lines):
+        """只在可见区域添加标签，之前可见区域的标签一并移除"""
+        self.text_area.tag_remove(SPELLING_TAG, '1.0', 'end')
+        self.text_area.tag_remove(STYLE_ISSUE_TAG, '1.0', 'end')
+        for number, line in enumerate(lines, first):
+            for issue in self.spell_service.lookup(line) or ():
+                tag = SPELLING_TAG if issue.kind == spell_checker.SPELLING else STYLE_ISSUE_TAG
+                self.text_area.tag_add(tag, f"{number}.{issue.start}", f"{number}.{issue.end}")
+                
+    def poll_spell_results(self):
+        """后台检查完成一批段落后重新标记可见区域"""
+        self.spell_polling = False
+        finished = False
+        while True:
+            try:
+                self.spell_service.results.get_nowait()
+                finished = True
+            except queue.Empty:
+                break
+        if finished:
+            self.check_visible_spelling()
+        elif self.spell_service.busy:
+            self.spell_polling = True
+            self.root.after(100, self.poll_spell_results)
+            
+    def show_spelling_menu(self, event):
+        """右键单击标记的文字时显示建议"""
+        line, col = (int(part) for part in self.text_area.index(f"@{event.x},{event.y}").split('.'))
+        text = self.text_area.get(f"{line}.0", f"{line}.end")
+        issue = next((issue for issue in self.spell_service.lookup(text) or ()
+                      if issue.start <= col < issue.end), None)
+        if issue is None:
+            return
+        word = text[issue.start:issue.end]
+        if issue.suggestions is not None:
+            self.popup_spelling_menu(event, line, issue, word, issue.suggestions)
+            return
+        # 编辑距离搜索在后台进行
+        future = self.spell_service.suggest(word)
+        
+        def check():
+            if not future.done():
+                self.root.after(50, check)
+                return
+            try:
+                self.popup_spelling_menu(event, line, issue, word, future.result())
+            except Exception as e:
+                print(f"计算拼写建议失败: {e}")
+                
+        self.root.after(50, check)
+        
+    def popup_spelling_menu(self, event, line, issue, word, suggestions):
+        menu = tk.Menu(self.root, tearoff=0)
+        menu.add_command(label=issue.message, state='disabled')
+        menu.add_separator()
+        for suggestion in suggestions:
+            menu.add_command(label=suggestion,
+                             command=lambda s=suggestion: self.replace_spelling(line, issue, word, s))
+        if not suggestions:
+            menu.add_command(label="（没有建议）", state='disabled')
+        if issue.kind == spell_checker.SPELLING:
+            menu.add_separator()
+            menu.add_command(label="添加到词典", command=lambda: self.add_to_dictionary(word))
+        menu.tk_popup(event.x_root, event.y_root)
+        
+    def replace_spelling(self, line, issue, word, replacement):
+        start, end = f"{line}.{issue.start}", f"{line}.{issue.end}"
+        # 菜单打开期间文字可能已变化
+        if self.text_area.get(start, end) != word:
+            return
+        self.text_area.delete(start, end)
+        self.text_area.insert(start, replacement)
+        self.on_text_change()
+        
+    def add_to_dictionary(self, word):
+        self.spell_service.add_word(word)
+        self.check_visible_spelling()
         
     def update_word_count(self):
         """更新字数统计"""
@@ -1486,6 +2617,8 @@ class OfficeMatePro:
             cursor_pos = self.text_area.index(tk.INSERT)
             line, col = cursor_pos.split('.')
             self.cursor_label.config(text=f"行: {line}, 列: {int(col)+1}")
+            if self.collaboration_mode:
+                self.sample_presence()
         except:
             pass
             
@@ -1553,6 +2686,7 @@ class OfficeMatePro:
             if selected == find_text:
                 self.text_area.delete('sel.first', 'sel.last')
                 self.text_area.insert('sel.first', replace_text)
+                self.schedule_outline_update()
                 
     def replace_all_text(self, find_text, replace_text):
         """替换所有文本"""
@@ -1561,6 +2695,7 @@ class OfficeMatePro:
             new_content = content.replace(find_text, replace_text)
             self.text_area.delete('1.0', tk.END)
             self.text_area.insert('1.0', new_content)
+            self.schedule_outline_update()
             
     def show_word_count(self):
         """显示详细字数统计"""
@@ -1619,6 +2754,166 @@ class OfficeMatePro:
             
         tree.pack(fill='both', expand=True, padx=10, pady=10)
         
+    def show_performance_window(self):
+        """性能监视窗口：各处理函数的耗时分布和主循环卡顿次数"""
+        if getattr(self, 'perf_window', None) and self.perf_window.winfo_exists():
+            self.perf_window.lift()
+            return
+        monitor = perf_monitor.monitor
+        self.perf_window = window = tk.Toplevel(self.root)
+        window.title("性能监视")
+        window.geometry("760x420")
+        window.protocol("WM_DELETE_WINDOW", lambda: self.close_tracked_window('perf_window'))
+        
+        # 工具栏
+        toolbar = tk.Frame(window)
+        toolbar.pack(fill='x', padx=10, pady=5)
+        
+        enabled_var = tk.BooleanVar(value=monitor.enabled)
+        tk.Checkbutton(toolbar, text="记录耗时", variable=enabled_var,
+                       command=lambda: monitor.set_enabled(enabled_var.get())).pack(side='left', padx=5)
+        ttk.Button(toolbar, text="重置", command=monitor.reset).pack(side='left', padx=5)
+        ttk.Button(toolbar, text="导出 JSON", command=self.export_performance_report).pack(side='left', padx=5)
+        stall_label = tk.Label(toolbar, anchor='e')
+        stall_label.pack(side='right', padx=5)
+        
+        columns = ('处理函数', '次数', '平均(ms)', 'p50', 'p95', 'p99', '最大(ms)')
+        tree = ttk.Treeview(window, columns=columns, show='headings')
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=200 if column == '处理函数' else 80, anchor='w' if column == '处理函数' else 'e')
+        tree.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            snapshot = monitor.snapshot()
+            tree.delete(*tree.get_children())
+            for name, stats in snapshot["handlers"].items():
+                tree.insert('', 'end', values=(
+                    name, stats["count"], stats["mean_ms"], stats["p50_ms"],
+                    stats["p95_ms"], stats["p99_ms"], stats["max_ms"]
+                ))
+            stall_label.config(text=f"主循环卡顿(>{snapshot['stall_threshold_ms']}ms): {snapshot['stalls']} 次，"
+                                    f"最长 {snapshot['worst_stall_ms']} ms")
+            window.after(1000, refresh)
+            
+        refresh()
+        
+    def export_performance_report(self):
+        """把性能统计导出为 JSON，便于附在问题报告中"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile=f"officemate_perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("JSON 文件", "*.json")]
+        )
+        if file_path:
+            try:
+                perf_monitor.monitor.dump_json(file_path)
+                messagebox.showinfo("成功", f"性能报告已导出到 {file_path}")
+            except Exception as e:
+                messagebox.showerror("错误", f"导出失败: {str(e)}")
+        
+    def close_tracked_window(self, attribute):
+        """关闭保存在属性中的窗口并释放引用，避免已销毁的窗口及其回调一直留在内存中"""
+        window = getattr(self, attribute, None)
+        setattr(self, attribute, None)
+        if window is not None and window.winfo_exists():
+            window.destroy()
+        
+    def setup_memory_diagnostics(self):
+        """登记各结构的大小探针并开始定期快照"""
+        self.memory_monitor = memory_diagnostics.MemoryMonitor()
+        self.memory_window = None
+        probes = {
+            "版本历史": lambda: len(self.document_history),
+            "文本格式标签": lambda: sum(1 for tag in self.text_area.tag_names() if tag.startswith("format_")),
+            "文本标签总数": lambda: len(self.text_area.tag_names()),
+            "协作连接": lambda: self.collab_server.connection_count() if self.collab_server else 0,
+            "协作用户": lambda: self.collab_server.user_count() if self.collab_server else 0,
+            "打开的窗口": lambda: sum(1 for widget in self.root.winfo_children() if isinstance(widget, tk.Toplevel)),
+            "幻灯片": lambda: len(self.slides),
+            "缩略图缓存": lambda: len(self.thumbnail_cache.memory) if getattr(self, 'thumbnail_cache', None) else 0,
+            "放映画面缓存": lambda: len(self.frame_cache.frames) if self.frame_cache else 0,
+            "协作增量日志": lambda: len(self.collab_server.delta_log.retained) if self.collab_server else 0,
+        }
+        for name, probe in probes.items():
+            self.memory_monitor.register_probe(name, probe)
+        # 需要遍历对象的探针复用快照中的同一次 gc.get_objects()
+        self.memory_monitor.register_probe("已关闭仍被引用的窗口", self.count_leaked_windows, objects=True)
+        if os.environ.get("OFFICEMATE_TRACE_MEMORY") or "--trace-memory" in sys.argv[1:]:
+            self.memory_monitor.start_tracing()
+        self.root.after(memory_diagnostics.MEMORY_SNAPSHOT_INTERVAL, self.memory_tick)
+        
+    def count_leaked_windows(self, objects):
+        """统计 objects 中已销毁但仍被 Python 对象引用的窗口"""
+        leaked = 0
+        for obj in objects:
+            if isinstance(obj, tk.Toplevel):
+                try:
+                    if not obj.winfo_exists():
+                        leaked += 1
+                except tk.TclError:
+                    leaked += 1
+        return leaked
+        
+    def memory_tick(self):
+        """定期清理无界结构并记录内存快照"""
+        self.release_unused_memory()
+        self.memory_monitor.take_snapshot()
+        self.root.after(memory_diagnostics.MEMORY_SNAPSHOT_INTERVAL, self.memory_tick)
+        
+    def release_unused_memory(self):
+        """删除不再使用的格式标签（关闭的协作连接由其处理线程移除）"""
+        for tag in self.text_area.tag_names():
+            if tag.startswith("format_") and not self.text_area.tag_ranges(tag):
+                self.text_area.tag_delete(tag)
+        
+    def show_memory_window(self):
+        """内存诊断报告窗口"""
+        if self.memory_window and self.memory_window.winfo_exists():
+            self.memory_window.lift()
+            return
+        monitor = self.memory_monitor
+        self.memory_window = window = tk.Toplevel(self.root)
+        window.title("内存诊断")
+        window.geometry("640x560")
+        window.protocol("WM_DELETE_WINDOW", lambda: self.close_tracked_window('memory_window'))
+        
+        toolbar = tk.Frame(window)
+        toolbar.pack(fill='x', padx=10, pady=5)
+        report_text = scrolledtext.ScrolledText(window, font=('Courier New', 10))
+        report_text.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        def show_report():
+            report_text.delete('1.0', tk.END)
+            report_text.insert('1.0', monitor.report())
+            
+        def snapshot():
+            monitor.take_snapshot()
+            show_report()
+            
+        def cleanup():
+            self.release_unused_memory()
+            collected = gc.collect()
+            snapshot()
+            report_text.insert('1.0', f"已清理，gc 回收 {collected} 个对象\n\n")
+            
+        tracing_var = tk.BooleanVar(value=monitor.tracing)
+        
+        def toggle_tracing():
+            if tracing_var.get():
+                monitor.start_tracing()
+            else:
+                monitor.stop_tracing()
+            snapshot()
+            
+        ttk.Button(toolbar, text="立即快照", command=snapshot).pack(side='left', padx=5)
+        ttk.Button(toolbar, text="清理", command=cleanup).pack(side='left', padx=5)
+        tk.Checkbutton(toolbar, text="跟踪内存分配 (tracemalloc)", variable=tracing_var,
+                       command=toggle_tracing).pack(side='left', padx=5)
+        snapshot()
+        
     def refresh_version_history(self):
         """刷新版本历史"""
         # 在实际应用中，这里会重新加载版本历史
@@ -1633,16 +2928,15 @@ class OfficeMatePro:
             'content': self.text_area.get('1.0', 'end-1c')[:1000]  # 只保存部分内容
         }
         self.document_history.append(version_data)
+        # 只保留最近的版本
+        del self.document_history[:-MAX_DOCUMENT_HISTORY]
         self.current_version += 1
         
     def add_to_recent_files(self, file_path):
         """添加到最近文件列表"""
-        if file_path in self.user_preferences['recent_files']:
-            self.user_preferences['recent_files'].remove(file_path)
-        self.user_preferences['recent_files'].insert(0, file_path)
-        # 只保留最近10个文件
-        self.user_preferences['recent_files'] = self.user_preferences['recent_files'][:10]
-        self.save_preferences()
+        recent = [path for path in self.user_preferences['recent_files'] if path != file_path]
+        # 只保留最近10个文件；整体赋值后由偏好设置存储合并写盘
+        self.user_preferences['recent_files'] = [file_path] + recent[:MAX_RECENT - 1]
         self.update_recent_files_menu()
 
     # ===== 对话框和工具方法 =====
@@ -1866,8 +3160,10 @@ class OfficeMatePro:
         color = colorchooser.askcolor(title="选择文字颜色")[1]
         if color:
             try:
-                self.text_area.tag_configure("color", foreground=color)
-                self.text_area.tag_add("color", "sel.first", "sel.last")
+                # 每种颜色一个标签，不同颜色的文字互不影响
+                tag_name = f"color_{color}"
+                self.text_area.tag_configure(tag_name, foreground=color)
+                self.text_area.tag_add(tag_name, "sel.first", "sel.last")
             except:
                 pass
 
@@ -1925,6 +3221,10 @@ class OfficeMatePro:
             except:
                 # 如果没有选中文本，在当前位置插入样式文本
                 self.text_area.insert(tk.INSERT, f"\n{style_name}\n")
+                self.schedule_outline_update()
+            else:
+                first, last = (int(self.text_area.index(index).split('.')[0]) for index in ("sel.first", "sel.last"))
+                self.refresh_outline_lines(first, last)
                 
     def theme_dialog(self):
         """主题对话框"""
@@ -1964,28 +3264,30 @@ class OfficeMatePro:
         window.destroy()
         
     def spell_check(self):
-        """拼写检查"""
-        # 简单的拼写检查模拟
-        content = self.text_area.get('1.0', 'end-1c')
-        words = content.split()
-        
-        # 常见易错词
-        common_errors = {
-            "的得地": "注意'的、得、地'的使用",
-            "在再": "注意'在、再'的使用", 
-            "做作": "注意'做、作'的使用",
-            "象像": "注意'象、像'的使用"
-        }
-        
-        issues = []
-        for error, suggestion in common_errors.items():
-            if any(char in content for char in error):
-                issues.append(suggestion)
+        """拼写检查（全文，在后台检查，已检查过的段落直接使用缓存）"""
+        future = self.spell_service.check_text(self.text_area.get('1.0', 'end-1c'))
+        self.hint_label.config(text="正在检查拼写...")
+        
+        def check():
+            if not future.done():
+                self.root.after(100, check)
+                return
+            self.hint_label.config(text="")
+            try:
+                issues = future.result()
+            except Exception as e:
+                messagebox.showerror("拼写检查", f"检查失败: {e}")
+                return
+            note = "" if self.spell_service.has_dictionary else \
+                "\n\n未找到词典，只检查了文风。将词表放入 dictionaries 目录后可检查拼写。"
+            if issues:
+                shown = "\n".join(self.format_spelling_issue(line, issue) for line, issue in issues[:20])
+                more = f"\n... 共 {len(issues)} 处" if len(issues) > 20 else ""
+                messagebox.showwarning("拼写检查", f"发现可能的问题:\n\n{shown}{more}{note}")
+            else:
+                messagebox.showinfo("拼写检查", "拼写检查通过！" + note)
                 
-        if issues:
-            messagebox.showwarning("拼写检查", "发现可能的拼写问题:\n\n" + "\n".join(issues))
-        else:
-            messagebox.showinfo("拼写检查", "拼写检查通过！")
+        self.root.after(100, check)
             
     def template_manager(self):
         """模板管理"""
@@ -2031,6 +3333,7 @@ class OfficeMatePro:
         if template_name in templates:
             self.text_area.delete('1.0', tk.END)
             self.text_area.insert('1.0', templates[template_name])
+            self.rebuild_outline()
             window.destroy()
             
     def macro_recorder(self):
@@ -2202,6 +3505,7 @@ F1 - 显示帮助"""
         self.root.bind('<Control-p>', lambda e: self.print_document())
         self.root.bind('<Control-q>', lambda e: self.quit_application())
         self.root.bind('<F11>', lambda e: self.toggle_fullscreen())
+        self.root.bind('<F5>', lambda e: self.start_slideshow())
         self.root.bind('<Control-z>', lambda e: self.undo())
         self.root.bind('<Control-y>', lambda e: self.redo())
         self.root.bind('<Control-x>', lambda e: self.cut())
@@ -2262,7 +3566,15 @@ F1 - 显示帮助"""
     def quit_application(self):
         """退出应用"""
         if messagebox.askokcancel("退出", "确定要退出 OfficeMate 吗？"):
-            self.save_preferences()
+            if self.collaboration_mode:
+                self.save_collaboration_state()
+            self.user_preferences.close()
+            self.recent_files.close()
+            self.spell_service.close()
+            if self.assistant:
+                self.assistant.close()
+            # 确认退出即放弃未保存的编辑，不再需要恢复
+            self.edit_journal.close()
             if hasattr(self, 'conn') and self.conn:
                 self.conn.close()
             self.root.quit()
@@ -2275,8 +3587,19 @@ F1 - 显示帮助"""
         except:
             pass
             
+        # 已排队的重绘都是空闲任务，排在它们之后即为首次绘制完成
+        self.root.after_idle(self.on_first_paint)
+        perf_monitor.monitor.watch_mainloop(self.root)
         self.root.mainloop()
+        
+    def on_first_paint(self):
+        """记录首次绘制时间并输出启动统计"""
+        self.profiler.mark("first_paint")
+        self.profiler.emit()
 
 if __name__ == "__main__":
+    import multiprocessing
+    # 打包后的程序启动导出子进程时需要
+    multiprocessing.freeze_support()
     app = OfficeMatePro()
     app.run()
\ No newline at end of file
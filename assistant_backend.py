@@ -0,0 +1,480 @@
+"""
+OfficeMate 写作助手后端
+
+助手的各项功能（摘要、关键词、内容优化、写作）通过后端接口完成:
+
+- LocalBackend  完全在本地运行：TextRank 抽取式摘要（句子间相似度按 TF-IDF
+                向量计算）、TF-IDF 关键词、基于规则的写作建议
+- HttpBackend   把请求批量 POST 到 HTTP 服务（远程模型的替身或真正的模型服务）
+
+AssistantService 在工作线程中调用后端，界面线程只拿到 Future：
+- 结果按 (任务, 参数, 文本哈希) 缓存，相同的文本不会重复分析
+- 正在进行中的相同请求共用一个 Future
+- 短时间内提交的多个请求合并为一批交给后端（HttpBackend 一次请求发送整批）
+
+本地替身服务: python assistant_backend.py serve [--port 8765]
+它用 LocalBackend 处理 HttpBackend 发来的请求，可用于测试远程后端的配置。
+
+请求格式（HTTP）:
+    POST /v1/batch  {"requests": [{"task": "summarize", "text": "...", "options": {...}}]}
+    返回           {"results": [{"result": ...} 或 {"error": "..."}]}
+"""
+import hashlib
+import json
+import math
+import queue
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+CACHE_SIZE = 256
+BATCH_WINDOW = 0.05  # 秒，第一个请求到达后等待这么久收集同一批请求
+MAX_BATCH = 16
+HTTP_TIMEOUT = 30
+DEFAULT_PORT = 8765
+
+SUMMARY_SENTENCES = 3
+KEYWORD_COUNT = 8
+MAX_RANKED_SENTENCES = 400  # 超过时先按 TF-IDF 得分预选，TextRank 的耗时与句子数的平方成正比
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+MAX_PHRASE_CHARS = 6  # 中文关键词的最大长度
+LONG_SENTENCE_CHARS = 80
+SENTENCE_CHECK_CHARS = 4096  # has_sentences 只检查开头这么多字符
+
+_SENTENCE_END = re.compile(r"(?<=[。！？!?])|(?<=[.!?])\s+|\n+")
+_TERM = re.compile(r"[A-Za-z][A-Za-z'-]+|\d+(?:\.\d+)?|[㐀-䶿一-鿿]+")
+_CJK = re.compile(r"[㐀-䶿一-鿿]")
+
+STOP_WORDS = frozenset("""
+a an the and or but if of to in on at by for with from as is are was were be been being it its this that
+these those he she they we you i his her their our your not no so than then there here also can could will
+would should may might do does did have has had into about over under more most such which who whom what
+我们 你们 他们 这个 那个 这些 那些 一个 没有 自己 因为 所以 但是 如果 可以 以及 进行 已经 还是 就是 而且 什么 这样
+""".split())
+_CJK_STOP_CHARS = frozenset("的了是在和与及或而也都就又并等这那其之个们为对以于被把")
+
+
+# ===== 文本处理 =====
+
+
+def split_sentences(text):
+    """按中英文句末标点和换行切分句子，返回去掉首尾空白的非空句子"""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence and sentence.strip()]
+
+
+def has_sentences(text, count=2, limit=SENTENCE_CHECK_CHARS):
+    """text 是否至少有 count 句（只切分开头 limit 个字符，大文档上也是常数时间）"""
+    return len(split_sentences(text[:limit])) >= count
+
+
+def terms(text):
+    """英文单词（小写、去掉停用词）和中文二元组（不需要分词词典）"""
+    found = []
+    for token in _TERM.findall(text):
+        if _CJK.match(token):
+            for index in range(len(token) - 1):
+                pair = token[index:index + 2]
+                if pair[0] not in _CJK_STOP_CHARS and pair[1] not in _CJK_STOP_CHARS and pair not in STOP_WORDS:
+                    found.append(pair)
+        else:
+            token = token.lower()
+            if len(token) > 2 and token not in STOP_WORDS and not token[0].isdigit():
+                found.append(token)
+    return found
+
+
+def phrases(text, pair_frequency):
+    """关键词候选：英文单词，以及由多次出现的中文二元组连成的短语（“人工”+“工智”+“智能” -> “人工智能”）"""
+    found = []
+    for token in _TERM.findall(text):
+        if not _CJK.match(token):
+            token = token.lower()
+            if len(token) > 2 and token not in STOP_WORDS and not token[0].isdigit():
+                found.append(token)
+            continue
+        start = end = None
+        for index in range(len(token) + 1):
+            pair = token[index:index + 2]
+            if len(pair) == 2 and pair_frequency[pair] > 1:
+                if start is None:
+                    start = index
+                end = index + 2
+            elif start is not None:
+                phrase = token[start:end]
+                if len(phrase) <= MAX_PHRASE_CHARS:
+                    found.append(phrase)
+                else:
+                    found += [token[position:position + 2] for position in range(start, end - 1)]
+                start = None
+    return found
+
+
+def tfidf_vectors(sentences):
+    """每个句子的 TF-IDF 向量（词 -> 权重），IDF 以句子为文档计算"""
+    counts = [Counter(terms(sentence)) for sentence in sentences]
+    document_frequency = Counter()
+    for count in counts:
+        document_frequency.update(count.keys())
+    total = len(sentences)
+    idf = {term: math.log((1 + total) / (1 + frequency)) + 1 for term, frequency in document_frequency.items()}
+    vectors = []
+    for count in counts:
+        vector = {term: (1 + math.log(value)) * idf[term] for term, value in count.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+    return vectors, idf
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+def textrank(vectors, damping=TEXTRANK_DAMPING, iterations=TEXTRANK_ITERATIONS):
+    """句子图上的 PageRank，边权为 TF-IDF 余弦相似度"""
+    count = len(vectors)
+    if count == 0:
+        return []
+    # 倒排索引：只计算至少有一个共同词的句子对
+    postings = {}
+    for index, vector in enumerate(vectors):
+        for term in vector:
+            postings.setdefault(term, []).append(index)
+    edges = [dict() for _ in range(count)]
+    for index, vector in enumerate(vectors):
+        neighbours = set()
+        for term in vector:
+            neighbours.update(postings[term])
+        neighbours.discard(index)
+        for other in neighbours:
+            if other > index:
+                weight = _cosine(vector, vectors[other])
+                if weight > 0:
+                    edges[index][other] = edges[other][index] = weight
+    out_weight = [sum(edge.values()) for edge in edges]
+    scores = [1.0 / count] * count
+    for _ in range(iterations):
+        scores = [(1 - damping) / count + damping * sum(scores[other] * weight / out_weight[other]
+                                                        for other, weight in edges[index].items())
+                  for index in range(count)]
+    return scores
+
+
+def summarize(text, sentences=SUMMARY_SENTENCES):
+    """抽取式摘要：TextRank 得分最高的几个句子，按原文顺序"""
+    candidates = split_sentences(text)
+    if len(candidates) <= sentences:
+        return candidates
+    vectors, _ = tfidf_vectors(candidates)
+    indices = list(range(len(candidates)))
+    if len(indices) > MAX_RANKED_SENTENCES:
+        # 长文档先按句子的 TF-IDF 权重之和预选
+        strength = [sum(vector.values()) for vector in vectors]
+        indices = sorted(sorted(indices, key=lambda index: -strength[index])[:MAX_RANKED_SENTENCES])
+    scores = textrank([vectors[index] for index in indices])
+    ranked = sorted(range(len(indices)), key=lambda position: -scores[position])[:sentences]
+    return [candidates[indices[position]] for position in sorted(ranked)]
+
+
+def keywords(text, count=KEYWORD_COUNT):
+    """TF-IDF 关键词：全文词频乘以句子级 IDF，偏向在多处出现但不是处处出现的词"""
+    candidates = split_sentences(text)
+    if not candidates:
+        return []
+    pair_frequency = Counter(terms(text))
+    document_frequency = Counter()
+    frequency = Counter()
+    for sentence in candidates:
+        found = Counter(phrases(sentence, pair_frequency))
+        document_frequency.update(found.keys())
+        frequency.update(found)
+    total = len(candidates)
+    scores = {term: (1 + math.log(value)) * (math.log((1 + total) / (1 + document_frequency[term])) + 1)
+              for term, value in frequency.items()}
+    if len(candidates) > 1:
+        # 只出现一次的词不作为关键词（除非文本只有一句）
+        scores = {term: score for term, score in scores.items() if frequency[term] > 1} or scores
+    ranked = sorted(scores, key=lambda term: (-scores[term], term))
+    return ranked[:count]
+
+
+def writing_suggestions(text):
+    """基于规则的写作建议：过长的句子、重复出现的词、过长的段落"""
+    suggestions = []
+    for sentence in split_sentences(text):
+        if len(sentence) > LONG_SENTENCE_CHARS:
+            suggestions.append(f"句子较长（{len(sentence)} 字），建议拆分：{sentence[:20]}…")
+    frequency = Counter(terms(text))
+    total = sum(frequency.values()) or 1
+    for term, value in frequency.most_common(3):
+        if value >= 4 and value / total > 0.05:
+            suggestions.append(f"“{term}” 出现了 {value} 次，可以换用近义词")
+    for paragraph in text.split("\n"):
+        if len(paragraph) > LONG_SENTENCE_CHARS * 6:
+            suggestions.append(f"段落较长（{len(paragraph)} 字），建议分段：{paragraph[:20]}…")
+    return suggestions
+
+
+# ===== 后端 =====
+
+
+class AssistantError(Exception):
+    """后端处理请求失败"""
+
+
+class AssistantBackend:
+    """后端接口：process_batch 接收 [(任务, 文本, 参数)]，返回同样长度的结果列表
+
+    单个请求失败时对应位置返回 AssistantError 实例，不影响同一批中的其他请求。
+    """
+
+    name = ""
+
+    def process_batch(self, requests):
+        results = []
+        for task, text, options in requests:
+            try:
+                results.append(self.process(task, text, options))
+            except (AssistantError, ValueError, KeyError, TypeError) as e:
+                results.append(AssistantError(f"{task}: {e}"))
+        return results
+
+    def process(self, task, text, options):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalBackend(AssistantBackend):
+    """本地实现，不访问网络"""
+
+    name = "local"
+
+    GENERATE_TEMPLATES = {
+        "正式": "基于您的要求，我为您准备了以下正式文档内容：\n\n{prompt}\n\n此文档经过精心组织，语言规范，符合专业写作标准。内容结构清晰，逻辑严密，适合商务和官方场合使用。",
+        "创意": "✨ 创意写作时间！ ✨\n\n{prompt}\n\n让我们用想象力创造精彩的内容！这段文字充满了生动的比喻和丰富的意象，让读者仿佛身临其境。",
+        "商务": "📊 商务文档生成：\n\n{prompt}\n\n此内容适合商务场合使用，语言专业但不失亲和力。重点突出，建议明确，能够有效传达商业意图。",
+        "技术": "🔧 技术文档：\n\n{prompt}\n\n技术描述准确，术语使用规范。包含详细的操作步骤和技术参数，适合开发人员和技术人员参考。",
+        "学术": "🎓 学术写作：\n\n{prompt}\n\n语言严谨，引用规范，逻辑清晰。符合学术写作标准，适合论文和研究报告使用。",
+    }
+
+    def process(self, task, text, options):
+        if task == "summarize":
+            return summarize(text, options.get("sentences", SUMMARY_SENTENCES))
+        if task == "keywords":
+            return keywords(text, options.get("count", KEYWORD_COUNT))
+        if task == "optimize":
+            return writing_suggestions(text)
+        if task == "generate":
+            # 本地后端不生成新内容：按写作类型套用模板，并列出提示中的要点
+            template = self.GENERATE_TEMPLATES.get(options.get("style"))
+            if template is None:
+                raise AssistantError("请选择有效的写作类型")
+            points = keywords(text, 5)
+            result = template.format(prompt=text.strip())
+            if points:
+                result += "\n\n要点：" + "、".join(points)
+            return result
+        raise AssistantError(f"未知任务: {task}")
+
+
+class HttpBackend(AssistantBackend):
+    """把整批请求 POST 到 url（见模块说明中的请求格式）"""
+
+    name = "http"
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def process_batch(self, requests):
+        import urllib.request  # 只有远程后端需要，不拖慢程序启动
+
+        body = json.dumps({"requests": [{"task": task, "text": text, "options": options}
+                                        for task, text, options in requests]},
+                          ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+            results = payload["results"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            error = AssistantError(f"助手服务不可用: {e}")
+            return [error] * len(requests)
+        if not isinstance(results, list) or len(results) != len(requests):
+            return [AssistantError("助手服务返回的结果数量不符")] * len(requests)
+        return [AssistantError(item["error"]) if "error" in item else item.get("result") for item in results]
+
+
+def create_backend(preferences):
+    """按偏好设置创建后端：assistant_backend 为 "local" 或 "http"（使用 assistant_url）"""
+    if preferences.get("assistant_backend") == "http" and preferences.get("assistant_url"):
+        return HttpBackend(preferences.get("assistant_url"))
+    return LocalBackend()
+
+
+# ===== 服务 =====
+
+
+def request_key(task, text, options):
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return f"{task}:{json.dumps(options, sort_keys=True, ensure_ascii=False)}:{digest}"
+
+
+class AssistantService:
+    """在工作线程中批量调用后端，结果按文本哈希缓存
+
+    submit 在 Tk 线程中调用，立即返回 concurrent.futures.Future；界面用
+    root.after 轮询 Future，不会阻塞。
+    """
+
+    def __init__(self, backend=None, cache_size=CACHE_SIZE, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.backend = backend or LocalBackend()
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.cache = OrderedDict()  # 请求键 -> 结果
+        self.in_flight = {}  # 请求键 -> Future
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._worker, name="assistant", daemon=True)
+        self.thread.start()
+
+    def submit(self, task, text, **options):
+        key = request_key(task, text, options)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                future = Future()
+                future.set_result(self.cache[key])
+                return future
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            future = self.in_flight[key] = Future()
+        self.queue.put((key, task, text, options, future))
+        return future
+
+    def set_backend(self, backend):
+        """切换后端（之后的请求生效），缓存的结果作废"""
+        old = self.backend
+        self.backend = backend
+        with self.lock:
+            self.cache.clear()
+        old.close()
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        if batch[0] is None:
+            return batch
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            requests = [item for item in batch if item is not None]
+            if requests:
+                self._run(requests)
+            if len(requests) != len(batch):
+                return
+
+    def _run(self, requests):
+        backend = self.backend
+        try:
+            results = backend.process_batch([(task, text, options) for _, task, text, options, _ in requests])
+        except Exception as e:
+            # 后端的意外错误交给各个请求的调用方处理，工作线程继续运行
+            results = [AssistantError(str(e))] * len(requests)
+        for (key, _, _, _, future), result in zip(requests, results):
+            with self.lock:
+                self.in_flight.pop(key, None)
+                if not isinstance(result, Exception) and backend is self.backend:
+                    self.cache[key] = result
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=2)
+        self.backend.close()
+
+
+# ===== 本地替身服务 =====
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT):
+    # 只有替身服务用到 http.server，不在导入模块时加载
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StubHandler(BaseHTTPRequestHandler):
+        backend = LocalBackend()
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                requests = [(item["task"], item["text"], item.get("options") or {}) for item in payload["requests"]]
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"请求格式错误: {e}"})
+                return
+            results = self.backend.process_batch(requests)
+            self._reply(200, {"results": [{"error": str(result)} if isinstance(result, Exception) else {"result": result}
+                                          for result in results]})
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    print(f"助手替身服务: http://{host}:{server.server_port}/v1/batch")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OfficeMate 写作助手后端")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="启动本地替身服务")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+OfficeMate 原子写文件
+
+先写入同目录下的临时文件并 fsync，再用 os.replace 替换目标文件。写入过程中程序
+崩溃或断电时，目标文件要么是旧内容，要么是完整的新内容，不会出现写了一半的文件。
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def _read_umask():
+    # os.umask 只能先设置再恢复，不是线程安全的，因此只在导入时读取一次
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+NEW_FILE_MODE = 0o666 & ~_read_umask()  # 与 open 新建文件的权限相同（mkstemp 固定为 0600）
+
+
+def fsync_directory(directory):
+    """把目录项（重命名）落盘；Windows 不支持打开目录，直接跳过"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path, mode='w', encoding=None):
+    """用法与 open 相同（只支持写入）；with 块正常结束后才替换目标文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            # 保留原文件的权限；新文件使用与 open 相同的默认权限
+            file_mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            file_mode = NEW_FILE_MODE
+        try:
+            os.chmod(temp_path, file_mode)
+        except OSError:
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    fsync_directory(directory)
+
+
+def atomic_write(path, data, encoding='utf-8'):
+    """原子地写入字符串或字节串"""
+    if isinstance(data, str):
+        with atomic_open(path, 'w', encoding=encoding) as f:
+            f.write(data)
+    else:
+        with atomic_open(path, 'wb') as f:
+            f.write(data)
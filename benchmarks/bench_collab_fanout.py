@@ -0,0 +1,100 @@
+"""
+协作服务器扇出基准测试
+
+在本进程内用 socketpair 模拟 N 个本地客户端，服务器用 CollaborationServer.broadcast
+把编辑操作帧转发给除发送者以外的所有客户端（只放入各连接的发送队列，由发送线程
+发送）。测量每帧的扇出耗时（调用方被占用的时间）、总吞吐量，以及最后一个客户端
+收齐所有帧的端到端时间。
+
+用法: python benchmarks/bench_collab_fanout.py [--clients 10 50 200] [--frames 2000]
+"""
+import argparse
+import queue
+import socket
+import threading
+import time
+
+from common import summarize, emit
+
+from collab_protocol import FrameDecoder, MSG_OPS, encode_frame, encode_ops_message, insert_op  # noqa: E402
+from collab_server import CollaborationServer, FrameSender  # noqa: E402
+
+
+def drain(sock, expected, done):
+    """客户端接收线程：收齐 expected 帧后记录完成时间"""
+    decoder = FrameDecoder()
+    received = 0
+    while received < expected:
+        try:
+            data = sock.recv(1 << 16)
+        except OSError:
+            break
+        if not data:
+            break
+        received += len(decoder.feed(data))
+    done.append(time.perf_counter())
+
+
+def run(clients, frames):
+    pairs = [socket.socketpair() for _ in range(clients)]
+    for server_side, _ in pairs:
+        server_side.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+    done = []
+    readers = [threading.Thread(target=drain, args=(client, frames, done), daemon=True)
+               for _, client in pairs[1:]]
+    for reader in readers:
+        reader.start()
+
+    server = CollaborationServer("", "bench", queue.Queue())
+    senders = [FrameSender(server_side) for server_side, _ in pairs]
+    for index, sender in enumerate(senders):
+        server.clients[sender] = f"client{index}"
+    editor = senders[0]  # 第一个客户端是编辑者，不会收到自己的操作
+    payloads = [encode_frame(MSG_OPS, encode_ops_message(seq, "bench", [insert_op(seq, "x")]))
+                for seq in range(frames)]
+
+    samples = []
+    start = time.perf_counter()
+    for frame in payloads:
+        frame_start = time.perf_counter()
+        with server.lock:
+            server.broadcast(frame, exclude=editor)
+        samples.append(time.perf_counter() - frame_start)
+    sent = time.perf_counter()
+    for reader in readers:
+        reader.join(timeout=30)
+    finished = max(done) if done else time.perf_counter()
+
+    server.close()
+    for _, client in pairs:
+        client.close()
+
+    wire_bytes = sum(len(frame) for frame in payloads) * (clients - 1)
+    return {
+        "clients": clients,
+        "frames": frames,
+        "broadcast": summarize(samples),
+        "send_s": round(sent - start, 4),
+        "end_to_end_s": round(finished - start, 4),
+        "fanout_frames_per_s": round(frames * (clients - 1) / (finished - start)),
+        "wire_mb": round(wire_bytes / 1024 / 1024, 2),
+        "complete_clients": len(done),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协作服务器扇出基准测试")
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "collab_fanout",
+        "runs": [run(clients, args.frames) for clients in args.clients],
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
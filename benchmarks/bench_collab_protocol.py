@@ -0,0 +1,164 @@
+"""
+协作协议基准测试
+
+测量:
+- 每次按键的传输字节数（全文 JSON / 单操作二进制帧 / 合并后的二进制帧）
+- 10 MB 文档的加入耗时（快照 + 增量尾部，经本地 socketpair 传输并在客户端重建）
+
+用法: python benchmarks/bench_collab_protocol.py [--size-mb 10] [--output result.json]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collab_protocol import (  # noqa: E402
+    DeltaLog, FrameDecoder, OpBatcher, MSG_OPS, MSG_SNAPSHOT,
+    encode_frame, encode_ops_message, decode_ops_message, decode_snapshot,
+    apply_ops, insert_op, delete_op
+)
+
+
+def make_document(size_bytes):
+    """生成指定大小的中英文混合文档"""
+    rng = random.Random(42)
+    words = ["协作", "文档", "OfficeMate", "编辑", "同步", "performance", "表格", "演示", "数据"]
+    parts = []
+    total = 0
+    while total < size_bytes:
+        line = " ".join(rng.choice(words) for _ in range(12)) + "\n"
+        parts.append(line)
+        total += len(line.encode('utf-8'))
+    return "".join(parts)
+
+
+def simulate_typing(doc, keystrokes):
+    """模拟在文档中间连续输入（夹杂退格），返回每个按键产生的操作"""
+    rng = random.Random(7)
+    pos = len(doc) // 2
+    keystroke_ops = []
+    for _ in range(keystrokes):
+        if rng.random() < 0.1 and pos > 0:
+            pos -= 1
+            keystroke_ops.append([delete_op(pos, 1)])
+        else:
+            keystroke_ops.append([insert_op(pos, rng.choice("abcdefg 协作文档"))])
+            pos += 1
+    return keystroke_ops
+
+
+def bench_bytes_per_keystroke(doc, keystrokes=500, interval=0.02):
+    all_ops = simulate_typing(doc, keystrokes)
+
+    # 基线：每次按键发送完整文本的 JSON
+    json_bytes = len(json.dumps({"type": "full", "content": doc}, ensure_ascii=False).encode('utf-8'))
+
+    # 每个按键单独成帧
+    single_bytes = sum(len(encode_frame(MSG_OPS, encode_ops_message(0, "bench", ops)))
+                       for ops in all_ops)
+
+    results = {
+        "json_full_text": json_bytes,
+        "binary_single": single_bytes / keystrokes,
+    }
+    # 合并窗口内的按键（按 interval 秒一次的速度输入）
+    for window in (0.05, 0.2):
+        batcher = OpBatcher(window=window)
+        batched_bytes = 0
+        frames = 0
+        now = 0.0
+        for ops in all_ops:
+            for op in ops:
+                batcher.add(op, now)
+            now += interval
+            if batcher.due(now):
+                batched_bytes += len(encode_frame(MSG_OPS, encode_ops_message(0, "bench", batcher.flush())))
+                frames += 1
+        if batcher.pending:
+            batched_bytes += len(encode_frame(MSG_OPS, encode_ops_message(0, "bench", batcher.flush())))
+            frames += 1
+        results[f"binary_batched_{int(window * 1000)}ms"] = batched_bytes / keystrokes
+        results[f"frames_batched_{int(window * 1000)}ms"] = frames
+    return results
+
+
+def bench_join(doc, tail_ops=500):
+    log = DeltaLog(doc, checkpoint_interval=tail_ops * 2)
+    rng = random.Random(3)
+    for _ in range(tail_ops):
+        log.append([insert_op(rng.randrange(len(log.buffer)), "x")])
+
+    start = time.perf_counter()
+    frames = log.join_frames()
+    encode_first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames = log.join_frames()
+    encode_cached = time.perf_counter() - start
+
+    server, client = socket.socketpair()
+    received = {}
+
+    def receive():
+        decoder = FrameDecoder()
+        text = None
+        while True:
+            data = client.recv(1 << 20)
+            if not data:
+                break
+            for msg_type, payload in decoder.feed(data):
+                if msg_type == MSG_SNAPSHOT:
+                    _, text = decode_snapshot(payload)
+                elif msg_type == MSG_OPS:
+                    _, _, _, ops = decode_ops_message(payload)
+                    text = apply_ops(text, ops)
+        received["text"] = text
+        received["end"] = time.perf_counter()
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    start = time.perf_counter()
+    for frame in frames:
+        server.sendall(frame)
+    server.close()
+    thread.join()
+    client.close()
+
+    assert received["text"] == log.text
+    return {
+        "document_bytes": len(doc.encode('utf-8')),
+        "wire_bytes": sum(len(f) for f in frames),
+        "tail_ops": tail_ops,
+        "encode_first_s": encode_first,
+        "encode_cached_s": encode_cached,
+        "transfer_and_rebuild_s": received["end"] - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协作协议基准测试")
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    doc = make_document(int(args.size_mb * 1024 * 1024))
+    results = {
+        "benchmark": "collab_protocol",
+        "bytes_per_keystroke": bench_bytes_per_keystroke(doc),
+        "join": bench_join(doc),
+    }
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+协作同步收敛检查：多个客户端并发编辑、离线编辑后重连
+
+服务器使用 CollaborationServer（真实的 TCP 连接、增量日志和变换），客户端按主程序的
+方式使用 SyncState 和 OfflineOpLog：本地编辑立即生效，批次带着所基于的序号提交，
+收到的远程操作先与未确认的批次相互变换再应用。离线的客户端有一部分模拟程序重启：
+重新打开日志，从断开时保存的同步点恢复文本后重连。每一轮结束后检查服务器、服务器本机
+的编辑者和所有客户端的文本完全一致，并且离线期间的编辑都保留了下来。
+
+用法：
+    python benchmarks/bench_collab_sync.py --clients 2 --rounds 50
+"""
+import argparse
+import os
+import queue
+import random
+import select
+import socket
+import tempfile
+import threading
+import time
+
+from common import emit
+
+from collab_protocol import (  # noqa: E402
+    FrameDecoder, MSG_HELLO, MSG_SNAPSHOT, MSG_OPS, MSG_ACK, MSG_SUBMIT,
+    apply_ops, encode_frame, encode_hello, encode_submit,
+    decode_snapshot, decode_ops_message, decode_ack, insert_op, delete_op, OP_INSERT
+)
+from collab_offline import OfflineOpLog  # noqa: E402
+from collab_server import CollaborationServer  # noqa: E402
+from collab_sync import SyncState  # noqa: E402
+
+
+FILLER = "初始文档\n"
+
+
+def random_ops(rng, text, marker):
+    """在随机位置插入带标记的文本，偶尔删除一小段初始文字（不删除任何标记）"""
+    if rng.random() < 0.3:
+        positions = [pos for pos, char in enumerate(text) if char in FILLER]
+        if positions:
+            pos = rng.choice(positions)
+            length = 1
+            while length < 5 and pos + length < len(text) and text[pos + length] in FILLER:
+                length += 1
+            return [delete_op(pos, length)]
+    # 只在标记之间插入，不把别人的标记拆开
+    pos = rng.randint(0, len(text))
+    while pos < len(text) and text[pos] not in FILLER and text[pos] != "<":
+        pos += 1
+    return [insert_op(pos, marker)]
+
+
+class Host:
+    """服务器本机的编辑者：编辑经由 submit_local 提交，确认和远程操作从 inbox 返回"""
+
+    def __init__(self, text):
+        self.inbox = queue.Queue()
+        self.server = CollaborationServer(text, "host", self.inbox)
+        self.sync = SyncState(last_seq=0)
+        self.text = text
+
+    def edit(self, ops):
+        self.text = apply_ops(self.text, ops)
+        self.sync.add_local(ops)
+        self.submit()
+
+    def submit(self):
+        item = self.sync.take_submit()
+        if item:
+            self.server.submit_local(*item)
+
+    def pump(self):
+        while True:
+            try:
+                msg_type, payload = self.inbox.get_nowait()
+            except queue.Empty:
+                return
+            if msg_type == MSG_OPS:
+                ops = self.sync.receive(*payload, "host")
+                self.text = apply_ops(self.text, ops)
+            elif msg_type == MSG_ACK:
+                self.sync.acknowledge(*payload)
+                self.submit()
+
+
+class Client:
+    """协作客户端：离线时编辑只写入日志，重连后补发"""
+
+    def __init__(self, address, client_id, db_path):
+        self.address = address
+        self.client_id = client_id
+        self.db_path = db_path
+        self.sync = SyncState(OfflineOpLog(db_path, session_key=client_id))
+        self.text = ""
+        self.sock = None
+        self.decoder = None
+        self.awaiting_hello_ack = False
+
+    def connect(self):
+        self.sock = socket.create_connection(self.address)
+        self.decoder = FrameDecoder()
+        self.awaiting_hello_ack = True
+        self.sock.sendall(encode_frame(MSG_HELLO, encode_hello(self.client_id, self.sync.last_seq)))
+
+    def disconnect(self):
+        self.sock.close()
+        self.sock = None
+        self.sync.disconnected()
+        self.sync.save()
+
+    def restart(self):
+        """模拟程序重启（离线时）：重新打开日志，从同步点恢复本地文本"""
+        self.sync.save()
+        self.sync.store.close()
+        self.sync = SyncState(OfflineOpLog(self.db_path, session_key=self.client_id))
+        assert self.sync.last_seq is not None, f"{self.client_id} 重启后没有同步点"
+        self.text = self.sync.local_text()
+
+    def edit(self, ops):
+        self.text = apply_ops(self.text, ops)
+        self.sync.add_local(ops)
+        self.submit()
+
+    def submit(self):
+        if not self.sock or self.awaiting_hello_ack:
+            return
+        item = self.sync.take_submit()
+        if item:
+            self.sock.sendall(encode_frame(MSG_SUBMIT, encode_submit(*item)))
+
+    def pump(self, timeout):
+        """处理已到达的帧，timeout 内没有数据时返回 False"""
+        if not self.sock:
+            return False
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return False
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError(f"{self.client_id} 的连接被服务器断开")
+        for msg_type, payload in self.decoder.feed(data):
+            if msg_type == MSG_SNAPSHOT:
+                seq, self.text = decode_snapshot(payload)
+                detached = self.sync.reset(seq, self.text)
+                if detached:
+                    raise AssertionError(f"{self.client_id} 收到快照，{len(detached)} 个批次无法合并")
+            elif msg_type == MSG_OPS:
+                ops = self.sync.receive(*decode_ops_message(payload), self.client_id)
+                self.text = apply_ops(self.text, ops)
+            elif msg_type == MSG_ACK:
+                self.sync.acknowledge(*decode_ack(payload))
+                self.awaiting_hello_ack = False
+                self.submit()
+        return True
+
+
+def settle(host, clients, quiet=0.05):
+    """处理消息直到所有连接都安静下来"""
+    while True:
+        host.pump()
+        busy = [client.pump(quiet) for client in clients]
+        host.pump()
+        if not any(busy) and host.inbox.empty():
+            return
+
+
+def check_converged(host, clients, markers):
+    server_text = host.server.delta_log.text
+    assert host.text == server_text, "服务器本机文本与增量日志不一致"
+    for client in clients:
+        assert client.text == server_text, f"{client.client_id} 的文本与服务器不一致"
+        assert not client.sync.pending, f"{client.client_id} 仍有未确认的批次"
+    missing = [marker for marker in markers if marker not in server_text]
+    assert not missing, f"编辑丢失: {missing[:5]}"
+
+
+def run(client_count, rounds, offline_edits, seed):
+    rng = random.Random(seed)
+    host = Host(FILLER * 200)
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(("127.0.0.1", 0))
+    server_socket.listen(client_count)
+    threading.Thread(target=host.server.serve, args=(server_socket,), daemon=True).start()
+    address = server_socket.getsockname()
+
+    workdir = tempfile.mkdtemp(prefix="collab_sync_")
+    clients = [Client(address, f"client{i}", os.path.join(workdir, "oplog.db")) for i in range(client_count)]
+    for client in clients:
+        client.connect()
+    settle(host, clients)
+
+    start = time.perf_counter()
+    markers = []
+    counter = 0
+    restarts = 0
+
+    def marked_edit(editor, name):
+        nonlocal counter
+        counter += 1
+        marker = f"<{name}{counter}>"
+        ops = random_ops(rng, editor.text, marker)
+        if ops[0][0] == OP_INSERT:
+            markers.append(marker)
+        editor.edit(ops)
+
+    for _ in range(rounds):
+        # 部分客户端离线
+        offline = [client for client in clients if rng.random() < 0.5]
+        for client in offline:
+            client.disconnect()
+        # 所有人并发编辑：在线的编辑立即提交，离线的只写入日志
+        for _ in range(offline_edits):
+            marked_edit(host, "h")
+            for client in clients:
+                marked_edit(client, client.client_id)
+        # 在线的客户端先同步一部分，再让离线的客户端按随机顺序重连（部分先重启）
+        for client in clients:
+            client.pump(0)
+        host.pump()
+        for client in offline:
+            if rng.random() < 0.5:
+                client.restart()
+                restarts += 1
+        rng.shuffle(offline)
+        for client in offline:
+            client.connect()
+        settle(host, clients)
+        check_converged(host, clients, markers)
+
+    elapsed = time.perf_counter() - start
+    result = {
+        "clients": client_count,
+        "rounds": rounds,
+        "edits": counter,
+        "restarts": restarts,
+        "seq": host.server.delta_log.seq,
+        "document_chars": len(host.server.delta_log.text),
+        "elapsed_s": round(elapsed, 3),
+        "converged": True,
+    }
+    host.server.close()
+    server_socket.close()
+    for client in clients:
+        if client.sock:
+            client.sock.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协作同步收敛检查")
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--offline-edits", type=int, default=5, help="每轮每个用户的编辑次数")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "collab_sync",
+        "runs": [run(args.clients, args.rounds, args.offline_edits, args.seed)],
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
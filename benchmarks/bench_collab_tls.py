@@ -0,0 +1,156 @@
+"""
+协作 TLS 传输基准测试
+
+测量:
+- 连接建立耗时：明文 TCP / TLS 完整握手 / TLS 会话恢复（模拟重连风暴）
+- 吞吐量：明文与 TLS 传输同样大小数据
+
+用法: python benchmarks/bench_collab_tls.py [--connections 200] [--mb 64] [--cert c.pem --key k.pem]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collab_tls import (  # noqa: E402
+    TLSSessionCache, ensure_certificate, create_server_context, create_client_context
+)
+
+CHUNK = 64 * 1024
+
+
+def start_server(context, mode):
+    """启动本地测试服务器，mode 为 'ping'（握手后回一个字节）或 'sink'（读完声明长度的数据）"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(128)
+
+    def handle(conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            if context:
+                conn = context.wrap_socket(conn, server_side=True)
+            if mode == 'ping':
+                conn.sendall(b'!')
+                conn.recv(1)
+            else:
+                expected = int.from_bytes(conn.recv(8), 'big')
+                total = 0
+                while total < expected:
+                    data = conn.recv(CHUNK)
+                    if not data:
+                        break
+                    total += len(data)
+                conn.sendall(b'!')
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener, listener.getsockname()[1]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1000,
+    }
+
+
+def bench_connect(port, connections, client_context=None, cache=None):
+    samples = []
+    reused = 0
+    for _ in range(connections):
+        start = time.perf_counter()
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if client_context:
+            if cache:
+                sock = cache.wrap(client_context, sock, '127.0.0.1', port)
+            else:
+                sock = client_context.wrap_socket(sock, server_hostname='127.0.0.1')
+        sock.recv(1)
+        samples.append(time.perf_counter() - start)
+        if client_context:
+            reused += sock.session_reused
+            if cache:
+                cache.store('127.0.0.1', port, sock)
+        sock.sendall(b'.')
+        sock.close()
+    result = summarize(samples)
+    if client_context:
+        result["resumed"] = reused
+    return result
+
+
+def bench_throughput(port, megabytes, client_context=None):
+    payload = os.urandom(CHUNK)
+    sock = socket.create_connection(('127.0.0.1', port))
+    if client_context:
+        sock = client_context.wrap_socket(sock, server_hostname='127.0.0.1')
+    chunks = megabytes * 1024 * 1024 // CHUNK
+    start = time.perf_counter()
+    sock.sendall((chunks * CHUNK).to_bytes(8, 'big'))
+    for _ in range(chunks):
+        sock.sendall(payload)
+    sock.recv(1)
+    elapsed = time.perf_counter() - start
+    sock.close()
+    return {"mb_per_s": megabytes / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协作 TLS 传输基准测试")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--mb", type=int, default=64)
+    parser.add_argument("--cert")
+    parser.add_argument("--key")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    if args.cert and args.key:
+        cert_file, key_file = args.cert, args.key
+    else:
+        cert_file, key_file = ensure_certificate()
+    server_context = create_server_context(cert_file, key_file)
+    client_context = create_client_context(cert_file)
+
+    _, plain_ping = start_server(None, 'ping')
+    _, tls_ping = start_server(server_context, 'ping')
+    _, plain_sink = start_server(None, 'sink')
+    _, tls_sink = start_server(server_context, 'sink')
+
+    results = {
+        "benchmark": "collab_tls",
+        "connections": args.connections,
+        "connect_plaintext": bench_connect(plain_ping, args.connections),
+        "connect_tls_full": bench_connect(tls_ping, args.connections, client_context),
+        "connect_tls_resumed": bench_connect(tls_ping, args.connections, client_context, TLSSessionCache()),
+        "throughput_plaintext": bench_throughput(plain_sink, args.mb),
+        "throughput_tls": bench_throughput(tls_sink, args.mb, client_context),
+    }
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+文档引擎基准测试（无需图形界面）
+
+测量:
+- 电子表格公式重算：依赖链和区域求和，不同表格大小
+- 保存文档：JSON 完整文档 / 纯文本，以及 HTML / Markdown / PDF 导出，不同正文大小
+- SQL 查询：大表上执行查询、取回结果并格式化为结果面板的文本
+- 文档格式：缩进 JSON 与紧凑容器格式（.omd）的保存、完整读取、只读正文的耗时和文件大小
+- 编辑日志：输入时每条记录在 Tk 线程中的耗时，以及崩溃后重放整个日志的耗时
+- 文档结构：全文扫描标题的耗时，以及输入后增量更新大纲的耗时
+
+用法: python benchmarks/bench_document.py [--sizes-kb 100 1024 5120] [--sheet-rows 100 1000 5000]
+                                          [--rows 10000 100000] [--output result.json]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from common import make_document, summarize, timed, emit
+
+import document_container  # noqa: E402
+import document_engine as engine  # noqa: E402
+import document_export  # noqa: E402
+import edit_journal  # noqa: E402
+from outline_index import OutlineIndex  # noqa: E402
+
+
+def make_sheet(rows, cols=10):
+    """每行前 cols-1 列为数值，最后一列对本行求和；第 0 列每 100 行组成一条依赖链"""
+    cell_data = {}
+    last = chr(65 + cols - 2)
+    for row in range(1, rows + 1):
+        for col in range(cols - 1):
+            cell_data[f"{row},{col}"] = {"value": str(row * col % 97), "formula": "", "style": {}}
+        cell_data[f"{row},{cols - 1}"] = {"value": "", "formula": f"SUM(A{row}:{last}{row})", "style": {}}
+        if row % 100 != 1:
+            cell_data[f"{row},0"]["formula"] = f"A{row - 1}+1"
+    return cell_data
+
+
+def bench_recalc(row_counts, repeat=3):
+    results = {}
+    for rows in row_counts:
+        cell_data = make_sheet(rows)
+        formulas = sum(1 for cell in cell_data.values() if cell["formula"])
+        samples = timed(lambda: engine.recalc_cells(cell_data), repeat)
+        results[f"{rows}_rows"] = dict(summarize(samples), formulas=formulas)
+    return results
+
+
+def bench_save(sizes_kb, repeat=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_kb in sizes_kb:
+            content = make_document(size_kb * 1024)
+            document = engine.build_document(content, make_sheet(100), [
+                {"title": f"幻灯片 {i + 1}", "content": "内容", "layout": "title_content",
+                 "background": "#ffffff", "elements": []} for i in range(20)
+            ])
+            entry = {}
+            for extension in ("json", "txt"):
+                path = os.path.join(tmp, f"doc.{extension}")
+                samples = timed(lambda: engine.write_document(path, document), repeat)
+                entry[extension] = dict(summarize(samples), bytes=os.path.getsize(path))
+
+            for fmt in ("html", "md", "pdf"):
+                path = os.path.join(tmp, f"doc.{fmt}")
+                samples = timed(lambda: document_export.export_paragraphs(
+                    document_export.paragraphs_from_text(content), path, fmt), repeat)
+                entry[fmt] = dict(summarize(samples), bytes=os.path.getsize(path))
+            results[f"{size_kb}KB"] = entry
+    return results
+
+
+def bench_sql(row_counts, repeat=3):
+    """与 execute_sql_query 相同的取数和格式化过程（不含 Tk 文本框插入）"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        for rows in row_counts:
+            conn.execute("DROP TABLE IF EXISTS items")
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, category TEXT, price REAL)")
+            conn.executemany("INSERT INTO items (name, category, price) VALUES (?, ?, ?)",
+                             ((f"item{i}", f"cat{i % 50}", i * 0.5) for i in range(rows)))
+            conn.commit()
+            entry = {}
+            queries = {
+                "select_all": "SELECT * FROM items",
+                "filtered": "SELECT * FROM items WHERE category = 'cat7'",
+                "aggregate": "SELECT category, COUNT(*), AVG(price) FROM items GROUP BY category",
+            }
+            for name, query in queries.items():
+                def run():
+                    cursor = conn.execute(query)
+                    rows_out = cursor.fetchall()
+                    columns = [description[0] for description in cursor.description]
+                    lines = [" | ".join(columns)]
+                    lines.extend(" | ".join(str(cell) for cell in row) for row in rows_out)
+                    return lines
+
+                entry[name] = dict(summarize(timed(run, repeat)), result_rows=len(run()) - 1)
+            results[f"{rows}_rows"] = entry
+        conn.close()
+    return results
+
+
+def make_app_sheet(rows=200, cols=26, fill=0.1):
+    """与主程序相同：每个单元格都有条目，只有少部分有内容"""
+    cell_data = {}
+    step = max(int(1 / fill), 1)
+    for row in range(1, rows):
+        for col in range(1, cols):
+            cell = {"value": "", "formula": "", "style": {}}
+            if (row * cols + col) % step == 0:
+                cell["value"] = str(row * col)
+                if col % 3 == 0:
+                    cell["style"] = {"bold": True, "color": "#c0392b"}
+            cell_data[f"{row},{col}"] = cell
+    return cell_data
+
+
+def bench_format(sizes_kb, repeat=3):
+    codecs = ["zlib"] + (["zstd"] if document_container.HAS_ZSTD else [])
+    slides = [{"id": f"s{i}", "title": f"幻灯片 {i + 1}", "content": "内容 " * 40, "layout": "title_content",
+               "background": "#ffffff", "elements": []} for i in range(50)]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_kb in sizes_kb:
+            document = engine.build_document(make_document(size_kb * 1024), make_app_sheet(), slides)
+            entry = {}
+
+            path = os.path.join(tmp, "doc.json")
+            entry["json_indent"] = {
+                "save": summarize(timed(lambda: engine.write_document(path, document), repeat)),
+                "load": summarize(timed(lambda: engine.load_document(path), repeat)),
+                "bytes": os.path.getsize(path),
+            }
+            path = os.path.join(tmp, "doc.omd")
+            for codec in codecs:
+                entry[f"omd_{codec}"] = {
+                    "save": summarize(timed(lambda: document_container.write_container(path, document, codec), repeat)),
+                    "load": summarize(timed(lambda: document_container.read_container(path), repeat)),
+                    "load_content_only": summarize(timed(
+                        lambda: document_container.read_section(path, "content"), repeat)),
+                    "bytes": os.path.getsize(path),
+                }
+            results[f"{size_kb}KB"] = entry
+    return results
+
+
+def bench_journal(sizes_kb, records=200):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_kb in sizes_kb:
+            text = make_document(size_kb * 1024)
+            journal = edit_journal.EditJournal(tmp)
+            journal.checkpoint(text, "doc.txt")
+            middle = len(text) // 2
+            samples = []
+            # 在文档中间连续输入，每条记录对应一次合并后的输入
+            for index in range(records):
+                text = text[:middle + index] + "a" + text[middle + index:]
+                samples.extend(timed(lambda: journal.record(text)))
+            journal.flush(timeout=30)
+            replay = timed(lambda: edit_journal.read_journal(journal.path), 3)
+            state = edit_journal.read_journal(journal.path)
+            results[f"{size_kb}KB"] = {
+                "record": summarize(samples),
+                "replay": summarize(replay),
+                "replayed_records": state.ops,
+                "journal_bytes": os.path.getsize(journal.path),
+                "recovered": state.text == text,
+            }
+            journal.close()
+    return results
+
+
+def make_outlined_document(size_bytes, section_lines=25):
+    """每 section_lines 行插入一个编号标题（每 10 节为一章）"""
+    lines = make_document(size_bytes).split("\n")
+    out = []
+    for index in range(0, len(lines), section_lines):
+        section = index // section_lines
+        chapter = section // 10 + 1
+        out.append(f"{chapter}. 第{chapter}章" if section % 10 == 0 else f"{chapter}.{section % 10} 小节")
+        out.extend(lines[index:index + section_lines])
+    return "\n".join(out)
+
+
+def bench_outline(sizes_kb, edits=200):
+    results = {}
+    for size_kb in sizes_kb:
+        text = make_outlined_document(size_kb * 1024)
+        index = OutlineIndex()
+        rebuild = timed(lambda: index.rebuild(text), 3)
+        middle = len(text) // 2
+        samples = []
+        # 在文档中间输入，每隔 20 次输入换行并插入一个新标题
+        for edit in range(edits):
+            insert = "\n9.9 新小节\n" if edit % 20 == 0 else "a"
+            text = text[:middle] + insert + text[middle:]
+            middle += len(insert)
+            samples.extend(timed(lambda: (index.update(text), index.children())))
+        results[f"{size_kb}KB"] = {
+            "rebuild": summarize(rebuild),
+            "update": summarize(samples),
+            "headings": len(index.headings),
+            "lines": text.count("\n") + 1,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档引擎基准测试")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[100, 1024, 5120])
+    parser.add_argument("--sheet-rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "document",
+        "recalc": bench_recalc(args.sheet_rows, args.repeat),
+        "save_document": bench_save(args.sizes_kb, args.repeat),
+        "sql_query": bench_sql(args.rows, args.repeat),
+        "document_format": bench_format(args.sizes_kb, args.repeat),
+        "edit_journal": bench_journal(args.sizes_kb),
+        "outline": bench_outline(args.sizes_kb),
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+编辑器界面基准测试（需要 Tk 显示，Linux 服务器上用 xvfb-run 运行）
+
+测量:
+- 文字处理区每次按键的延迟与文档大小的关系（插入字符 + 按键处理函数 + 空闲重绘）
+- find_text / replace_all_text 在大文档上的耗时
+- create_table 在不同表格大小下的耗时，以及单元格编辑（普通值和公式）的耗时
+- execute_sql_query 在大表上的耗时（含结果面板的文本插入）
+
+程序在临时目录中运行，不会改动当前目录下的数据库和设置。
+
+用法: xvfb-run -a python benchmarks/bench_editor.py [--sizes-kb 10 100 1024 5120] [--output result.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from common import make_document, summarize, timed, emit
+
+import tkinter as tk  # noqa: E402
+
+KEYSTROKES = 200
+
+
+def create_app():
+    from OfficeMate import OfficeMatePro
+
+    app = OfficeMatePro()
+    app.root.update()
+    return app
+
+
+def load_text(app, content):
+    app.text_area.delete('1.0', tk.END)
+    app.text_area.insert('1.0', content)
+    # 光标放在文档中间，模拟在正文中编辑
+    middle = int(app.text_area.index('end-1c').split('.')[0]) // 2 or 1
+    app.text_area.mark_set(tk.INSERT, f"{middle}.0")
+    app.text_area.see(tk.INSERT)
+    app.root.update()
+
+
+def bench_typing(app, sizes_kb, keystrokes=KEYSTROKES):
+    results = {}
+    for size_kb in sizes_kb:
+        load_text(app, make_document(size_kb * 1024))
+
+        def keystroke():
+            # 与真实按键相同的处理顺序：KeyPress -> 插入 -> KeyRelease -> 重绘
+            app.update_cursor_position()
+            app.text_area.insert(tk.INSERT, "a")
+            app.on_text_change()
+            app.root.update_idletasks()
+
+        results[f"{size_kb}KB"] = summarize(timed(keystroke, keystrokes))
+    return results
+
+
+def bench_find_replace(app, sizes_kb, repeat=3):
+    results = {}
+    for size_kb in sizes_kb:
+        content = make_document(size_kb * 1024)
+        load_text(app, content)
+        entry = {"find_text": summarize(timed(lambda: app.find_text("OfficeMate"), repeat))}
+        entry["matches"] = len(app.text_area.tag_ranges('highlight')) // 2
+
+        def replace_round_trip():
+            app.replace_all_text("OfficeMate", "OM")
+            app.replace_all_text("OM", "OfficeMate")
+            app.root.update_idletasks()
+
+        samples = timed(replace_round_trip, repeat)
+        entry["replace_all_text"] = summarize([sample / 2 for sample in samples])
+        results[f"{size_kb}KB"] = entry
+    return results
+
+
+def bench_spreadsheet(app, grids, edits=200):
+    app.ensure_tab_built(app.sheet_frame)
+    results = {}
+    for rows, cols in grids:
+        app.rows, app.cols = rows, cols
+        app.cell_data.clear()
+
+        def build():
+            app.create_table()
+            app.root.update_idletasks()
+
+        entry = {"create_table": summarize(timed(build, 3))}
+
+        def edit_cells(values):
+            samples = []
+            for index in range(edits):
+                row = 1 + index % (rows - 1)
+                col = 1 + index % (cols - 2)
+                cell = app.cells[row][col]
+                cell.delete(0, tk.END)
+                cell.insert(0, values(row, col))
+                samples.extend(timed(lambda: app.on_cell_change(row, col)))
+            return summarize(samples)
+
+        entry["edit_value"] = edit_cells(lambda row, col: str(row * col))
+        last = chr(64 + cols - 1)
+        entry["edit_formula"] = edit_cells(lambda row, col: f"=SUM(A{row}:{last}{row})")
+        results[f"{rows}x{cols}"] = entry
+    return results
+
+
+def bench_sql(app, row_counts, repeat=3):
+    app.ensure_tab_built(app.db_frame)
+    conn = app.conn
+    results = {}
+    for rows in row_counts:
+        conn.execute("DROP TABLE IF EXISTS bench_items")
+        conn.execute("CREATE TABLE bench_items (id INTEGER PRIMARY KEY, name TEXT, category TEXT, price REAL)")
+        conn.executemany("INSERT INTO bench_items (name, category, price) VALUES (?, ?, ?)",
+                         ((f"item{i}", f"cat{i % 50}", i * 0.5) for i in range(rows)))
+        conn.commit()
+        entry = {}
+        for name, query in (("select_all", "SELECT * FROM bench_items"),
+                            ("aggregate", "SELECT category, COUNT(*) FROM bench_items GROUP BY category")):
+            app.query_entry.delete(0, tk.END)
+            app.query_entry.insert(0, query)
+
+            def run():
+                app.execute_sql_query()
+                app.root.update_idletasks()
+
+            entry[name] = summarize(timed(run, repeat))
+        results[f"{rows}_rows"] = entry
+    conn.execute("DROP TABLE IF EXISTS bench_items")
+    conn.commit()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编辑器界面基准测试")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[10, 100, 1024, 5120])
+    parser.add_argument("--grids", nargs="+", default=["20x10", "100x26", "500x26"],
+                        help="表格大小，格式为 行x列（列数不超过 26）")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        parser.error("没有可用的显示，请使用 xvfb-run -a python benchmarks/bench_editor.py")
+    grids = [tuple(int(part) for part in grid.lower().split("x")) for grid in args.grids]
+    output = os.path.abspath(args.output) if args.output else None
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            app = create_app()
+            results = {
+                "benchmark": "editor",
+                "typing": bench_typing(app, args.sizes_kb),
+                "find_replace": bench_find_replace(app, args.sizes_kb),
+                "spreadsheet": bench_spreadsheet(app, grids),
+                "sql_query": bench_sql(app, args.rows),
+            }
+            app.conn.close()
+            app.root.destroy()
+        finally:
+            os.chdir(cwd)
+    emit(results, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+协作在线状态扇出基准测试
+
+在本进程内模拟 N 个客户端（socketpair 连接），服务器端使用主程序的
+CollaborationServer：每个连接由 handle_client 线程接收握手和在线状态上报，
+presence_tick 按 PRESENCE_INTERVAL 汇总并经各连接的发送线程广播。每个客户端以
+60Hz 移动光标，由 PresenceSampler 限频后上报。对比朴素广播（每次光标移动都发给
+其他所有人）的消息数，并检查服务器发送的消息数随 N 线性增长。
+
+用法: python benchmarks/bench_presence.py [--clients 25 50 100 200] [--seconds 2]
+"""
+import argparse
+import queue
+import random
+import socket
+import threading
+import time
+
+from common import summarize, emit
+
+from collab_protocol import (  # noqa: E402
+    FrameDecoder, MSG_HELLO, MSG_ACK, MSG_PRESENCE, encode_frame, encode_hello, encode_presence
+)
+from collab_presence import PresenceSampler, PRESENCE_INTERVAL  # noqa: E402
+from collab_server import CollaborationServer  # noqa: E402
+
+MOVE_RATE = 60  # 每个客户端每秒的光标移动次数
+
+
+def drain(sock, counter, lock, ready):
+    """客户端接收线程：统计握手确认之后收到的在线状态帧"""
+    decoder = FrameDecoder()
+    joined = False
+    while True:
+        try:
+            data = sock.recv(65536)
+        except OSError:
+            break
+        if not data:
+            break
+        frames = decoder.feed(data)
+        presence = 0
+        for msg_type, _ in frames:
+            if msg_type == MSG_ACK and not joined:
+                joined = True
+                ready.release()
+            elif msg_type == MSG_PRESENCE and joined:
+                presence += 1
+        with lock:
+            counter["bytes"] += len(data)
+            counter["frames"] += presence
+
+
+def run(clients, seconds):
+    rng = random.Random(clients)
+    server = CollaborationServer("", "host", queue.Queue())
+    pairs = [socket.socketpair() for _ in range(clients)]
+    for server_end, _ in pairs:
+        threading.Thread(target=server.handle_client, args=(server_end,), daemon=True).start()
+
+    counter = {"bytes": 0, "frames": 0}
+    lock = threading.Lock()
+    ready = threading.Semaphore(0)
+    readers = [threading.Thread(target=drain, args=(client, counter, lock, ready), daemon=True)
+               for _, client in pairs]
+    for reader in readers:
+        reader.start()
+
+    user_ids = [f"user{i:04d}" for i in range(clients)]
+    for user_id, (_, client) in zip(user_ids, pairs):
+        client.sendall(encode_frame(MSG_HELLO, encode_hello(user_id)))
+    for _ in range(clients):
+        ready.acquire()
+    # 握手时的全量在线状态帧不计入统计
+    with lock:
+        counter["bytes"] = 0
+        counter["frames"] = 0
+
+    samplers = [PresenceSampler() for _ in range(clients)]
+    cursors = [rng.randrange(10000) for _ in range(clients)]
+    ticks = int(seconds / PRESENCE_INTERVAL)
+    moves_per_tick = int(MOVE_RATE * PRESENCE_INTERVAL)
+    client_frames = 0
+    broadcast_ticks = 0
+    tick_times = []
+    next_tick = time.monotonic()
+    for _ in range(ticks):
+        now = time.monotonic()
+        # 客户端：高频移动光标，采样器限频后上报
+        for i, sampler in enumerate(samplers):
+            for _ in range(moves_per_tick):
+                cursors[i] += rng.choice((-1, 1))
+                sampler.update(max(cursors[i], 0))
+            state = sampler.take(now)
+            if state is not None:
+                pairs[i][1].sendall(encode_frame(MSG_PRESENCE, encode_presence([(user_ids[i], state)])))
+                client_frames += 1
+
+        # 服务器：每周期编码一次，同一份字节放入所有连接的发送队列
+        next_tick += PRESENCE_INTERVAL
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+        start = time.perf_counter()
+        if server.presence_tick():
+            broadcast_ticks += 1
+        tick_times.append(time.perf_counter() - start)
+
+    # 等发送线程把队列中的帧发完
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with lock:
+            if counter["frames"] >= broadcast_ticks * clients:
+                break
+        time.sleep(0.01)
+
+    server.close()
+    for reader in readers:
+        reader.join(timeout=5)
+    for _, client in pairs:
+        client.close()
+
+    return {
+        "clients": clients,
+        "client_frames_per_s": client_frames / seconds,
+        "server_frames_per_s": broadcast_ticks * clients / seconds,
+        "naive_frames_per_s": clients * (clients - 1) * MOVE_RATE,
+        "received_frames": counter["frames"],
+        "received_bytes_per_s": counter["bytes"] / seconds,
+        "server_tick": summarize(tick_times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协作在线状态扇出基准测试")
+    parser.add_argument("--clients", type=int, nargs="+", default=[25, 50, 100, 200])
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    runs = [run(n, args.seconds) for n in args.clients]
+
+    # 服务器发送的消息数应与客户端数成正比（每客户端每周期至多一帧）
+    ticks_per_s = 1 / PRESENCE_INTERVAL
+    for result in runs:
+        assert result["server_frames_per_s"] <= result["clients"] * ticks_per_s + 1e-9
+        assert result["received_frames"] == result["server_frames_per_s"] * args.seconds
+
+    emit({"benchmark": "collab_presence", "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
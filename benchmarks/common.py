@@ -0,0 +1,63 @@
+"""
+基准测试共用的工具函数：生成测试文档、统计耗时、输出 JSON 结果
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+WORDS = ["协作", "文档", "OfficeMate", "编辑", "同步", "performance", "表格", "演示", "数据", "benchmark"]
+
+
+def make_document(size_bytes, seed=42):
+    """生成指定大小（UTF-8 字节数）的中英文混合文档"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        line = " ".join(rng.choice(WORDS) for _ in range(12)) + "\n"
+        parts.append(line)
+        total += len(line.encode('utf-8'))
+    return "".join(parts)
+
+
+def summarize(samples):
+    """耗时样本（秒）的统计，单位毫秒"""
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def pick(fraction):
+        return round(ordered[min(int(fraction * count), count - 1)] * 1000, 3)
+
+    return {
+        "count": count,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pick(0.5),
+        "p95_ms": pick(0.95),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(func, repeat=1):
+    """调用 func repeat 次，返回每次的耗时（秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def emit(results, output=None):
+    """打印结果，并按需写入 JSON 文件"""
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
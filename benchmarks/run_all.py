@@ -0,0 +1,143 @@
+"""
+运行全部基准测试，把结果合并写入 benchmarks/results/，并可与之前的结果对比
+
+每个基准测试在独立的子进程中运行。没有显示时，需要 Tk 的编辑器测试会通过
+xvfb-run 运行；没有 xvfb-run 时跳过并在结果中注明。
+
+用法:
+    python benchmarks/run_all.py [--only document collab_fanout] [--quick]
+    python benchmarks/run_all.py --compare results/旧.json results/新.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+
+# 名称 -> (脚本, 是否需要 Tk, 快速模式参数)
+BENCHMARKS = {
+    "document": ("bench_document.py", False, ["--sizes-kb", "100", "1024", "--sheet-rows", "100", "1000",
+                                              "--rows", "10000"]),
+    "editor": ("bench_editor.py", True, ["--sizes-kb", "10", "100", "1024", "--grids", "20x10", "100x26",
+                                         "--rows", "10000"]),
+    "collab_fanout": ("bench_collab_fanout.py", False, ["--clients", "10", "50", "--frames", "500"]),
+    "collab_protocol": ("bench_collab_protocol.py", False, ["--size-mb", "1"]),
+    "collab_sync": ("bench_collab_sync.py", False, ["--clients", "2", "--rounds", "10"]),
+    "collab_tls": ("bench_collab_tls.py", False, ["--connections", "50", "--mb", "8"]),
+    "presence": ("bench_presence.py", False, ["--clients", "50", "200", "--seconds", "1"]),
+}
+
+# 对比时关注的指标（耗时越小越好）
+COMPARE_KEYS = ("p50_ms", "mean_ms", "p95_ms", "end_to_end_s", "transfer_and_rebuild_s")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(name, quick):
+    script, needs_tk, quick_args = BENCHMARKS[name]
+    command = [sys.executable, os.path.join(HERE, script)] + (quick_args if quick else [])
+    if needs_tk and sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        xvfb = shutil.which("xvfb-run")
+        if not xvfb:
+            return {"skipped": "没有显示，也没有找到 xvfb-run"}
+        command = [xvfb, "-a"] + command
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "result.json")
+        started = time.perf_counter()
+        completed = subprocess.run(command + ["--output", output], capture_output=True, text=True)
+        if completed.returncode != 0 or not os.path.exists(output):
+            return {"error": completed.stderr.strip().splitlines()[-1:] or [f"退出码 {completed.returncode}"]}
+        with open(output, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    result["wall_s"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def flatten(data, prefix=""):
+    """把嵌套结果展开为 路径 -> 数值，只保留参与对比的指标"""
+    items = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            items.update(flatten(value, f"{prefix}/{key}" if prefix else str(key)))
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            items.update(flatten(value, f"{prefix}[{index}]"))
+    elif isinstance(data, (int, float)) and prefix.rsplit("/", 1)[-1] in COMPARE_KEYS:
+        items[prefix] = data
+    return items
+
+
+def compare(base_path, new_path, threshold=0.1):
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = flatten(json.load(f)["results"])
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = flatten(json.load(f)["results"])
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        old_value, new_value = base[key], new[key]
+        if not old_value:
+            continue
+        change = (new_value - old_value) / old_value
+        marker = ""
+        if change > threshold:
+            marker = "  <-- 变慢"
+            regressions += 1
+        elif change < -threshold:
+            marker = "  变快"
+        print(f"{key}: {old_value} -> {new_value} ({change:+.0%}){marker}")
+    print(f"\n共 {len(base.keys() & new.keys())} 项指标，{regressions} 项变慢超过 {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行 OfficeMate 基准测试")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="只运行指定的基准测试")
+    parser.add_argument("--quick", action="store_true", help="使用较小的数据规模")
+    parser.add_argument("--output", help="结果文件路径，默认写入 benchmarks/results/")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="对比两次运行的结果")
+    parser.add_argument("--threshold", type=float, default=0.1, help="对比时视为变化的比例")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare, threshold=args.threshold)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": args.quick,
+        "results": {},
+    }
+    for name in args.only or BENCHMARKS:
+        print(f"运行 {name} ...", file=sys.stderr)
+        report["results"][name] = run_benchmark(name, args.quick)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+OfficeMate 协作客户端离线操作日志
+
+客户端发送的每个编辑批次先写入本地 SQLite，收到服务器确认后再删除。
+断线期间编辑继续写入日志；重连后只发送未确认的批次，服务器则从增量日志
+补发客户端缺失的操作，而不是重新传输整个文档。
+
+断线和退出时还保存同步点：最后确认的序号、该序号时的文本（zlib 压缩），
+并把未确认的批次改写为变换到该序号之后的版本。程序重启后从同步点继续，
+不需要快照。同步点在服务器文本前进后失效，之后的批次等收到快照再处理。
+"""
+import sqlite3
+import threading
+import zlib
+
+from collab_protocol import encode_ops, decode_ops
+
+OPLOG_DB_FILE = "collab_oplog.db"
+
+
+class OfflineOpLog:
+    """按服务器地址保存的持久化操作日志"""
+
+    def __init__(self, db_path=OPLOG_DB_FILE, session_key="default"):
+        self.session_key = session_key
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS pending_ops (
+                ref INTEGER PRIMARY KEY AUTOINCREMENT,
+                session TEXT,
+                payload BLOB
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                session TEXT PRIMARY KEY,
+                client_id TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_points (
+                session TEXT PRIMARY KEY,
+                seq INTEGER,
+                base BLOB
+            )
+        ''')
+        self.conn.commit()
+
+    def client_id(self, default):
+        """该会话使用的客户端ID（重启后沿用，便于服务器去重）"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT client_id FROM sync_state WHERE session = ?", (self.session_key,)
+            ).fetchone()
+            if row:
+                return row[0]
+            self.conn.execute(
+                "INSERT INTO sync_state (session, client_id) VALUES (?, ?)",
+                (self.session_key, default)
+            )
+            self.conn.commit()
+            return default
+
+    def append(self, ops):
+        """记录一个编辑批次，返回本地编号"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO pending_ops (session, payload) VALUES (?, ?)",
+                (self.session_key, encode_ops(ops))
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def pending(self):
+        """所有未确认的批次 [(本地编号, 操作列表)]，按顺序"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT ref, payload FROM pending_ops WHERE session = ? ORDER BY ref",
+                (self.session_key,)
+            ).fetchall()
+        return [(ref, decode_ops(payload)[0]) for ref, payload in rows]
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM pending_ops WHERE session = ?", (self.session_key,)
+            ).fetchone()[0]
+
+    def ack(self, client_ref):
+        """服务器已应用到 client_ref 为止的批次，删除它们"""
+        if client_ref <= 0:
+            return
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM pending_ops WHERE session = ? AND ref <= ?",
+                (self.session_key, client_ref)
+            )
+            self.conn.commit()
+
+    def sync_point(self):
+        """上次保存的同步点 (序号, 文本)，没有或已失效时返回 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT seq, base FROM sync_points WHERE session = ?", (self.session_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], zlib.decompress(row[1]).decode('utf-8')
+
+    def save_sync_point(self, seq, text, batches):
+        """保存同步点，并把未确认的批次改写为基于 seq 的版本（同一事务）
+
+        batches 为 [(本地编号, 操作列表)]，需包含日志中该会话的全部未确认批次。
+        """
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE pending_ops SET payload = ? WHERE session = ? AND ref = ?",
+                    [(encode_ops(ops), self.session_key, ref) for ref, ops in batches]
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_points (session, seq, base) VALUES (?, ?, ?)",
+                    (self.session_key, seq, zlib.compress(text.encode('utf-8'), 1))
+                )
+
+    def invalidate_sync_point(self):
+        """服务器文本已前进、批次已变换，日志中的同步点不再对应当前状态"""
+        with self.lock:
+            self.conn.execute("DELETE FROM sync_points WHERE session = ?", (self.session_key,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,137 @@
+"""
+OfficeMate 协作在线状态（远程光标/选区）
+
+- PresenceSampler: 客户端按上限频率采样本地光标和选区
+- PresenceHub: 服务器汇总所有用户状态，每个周期只编码一帧，
+  把同一份字节发给每个客户端，消息数随客户端数线性增长
+- RemoteCursorRenderer: 用 Text 标签显示远程光标，只更新变化的用户
+"""
+import hashlib
+
+from collab_protocol import MSG_PRESENCE, encode_frame, encode_presence
+
+PRESENCE_INTERVAL = 0.1  # 秒，采样与广播的最小间隔
+
+CURSOR_COLORS = ["#e74c3c", "#9b59b6", "#e67e22", "#16a085", "#2980b9", "#d35400", "#8e44ad", "#27ae60"]
+
+
+def user_color(user_id):
+    """为用户分配稳定的颜色"""
+    digest = hashlib.md5(user_id.encode('utf-8')).digest()
+    return CURSOR_COLORS[digest[0] % len(CURSOR_COLORS)]
+
+
+def lighten(color, ratio=0.75):
+    """将 #rrggbb 颜色向白色混合，用作选区背景"""
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    r, g, b = (int(c + (255 - c) * ratio) for c in (r, g, b))
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+class PresenceSampler:
+    """客户端光标采样，限制发送频率，未变化时不发送"""
+
+    def __init__(self, interval=PRESENCE_INTERVAL):
+        self.interval = interval
+        self.state = None
+        self.sent_state = None
+        self.last_sent = float('-inf')
+
+    def update(self, cursor, sel_start=None, sel_end=None):
+        """记录最新的光标和选区（可高频调用）"""
+        if sel_start is None:
+            sel_start = sel_end = cursor
+        self.state = (cursor, sel_start, sel_end)
+
+    def take(self, now):
+        """到达发送间隔且状态有变化时返回状态，否则返回 None"""
+        if self.state is None or self.state == self.sent_state:
+            return None
+        if now - self.last_sent < self.interval:
+            return None
+        self.sent_state = self.state
+        self.last_sent = now
+        return self.state
+
+
+class PresenceHub:
+    """服务器端在线状态汇总"""
+
+    def __init__(self):
+        self.states = {}
+        self.changed = set()
+
+    def update(self, user_id, state):
+        """更新用户状态（只保留最新一次，天然限流）"""
+        if self.states.get(user_id) != state:
+            self.states[user_id] = state
+            self.changed.add(user_id)
+
+    def remove(self, user_id):
+        if self.states.pop(user_id, None) is not None:
+            self.changed.add(user_id)
+
+    def tick(self):
+        """汇总本周期的变化，返回 (变化列表, 帧)；无变化时返回 (None, None)
+
+        只编码一次，调用方把同一份字节发送给所有客户端。
+        """
+        if not self.changed:
+            return None, None
+        entries = [(user_id, self.states.get(user_id)) for user_id in self.changed]
+        self.changed = set()
+        return entries, encode_frame(MSG_PRESENCE, encode_presence(entries))
+
+    def full_frame(self):
+        """新客户端加入时发送的完整状态"""
+        return encode_frame(MSG_PRESENCE, encode_presence(list(self.states.items())))
+
+
+class RemoteCursorRenderer:
+    """在 Text 控件上用标签显示远程用户的光标和选区
+
+    每个用户占用两个标签，状态变化时只移动该用户的标签范围，不重绘文本。
+    """
+
+    def __init__(self, text_widget, self_id):
+        self.text = text_widget
+        self.self_id = self_id
+        self.rendered = {}
+
+    def _tags(self, user_id):
+        return f"presence_cursor_{user_id}", f"presence_sel_{user_id}"
+
+    def apply(self, entries):
+        """应用增量状态 [(用户ID, 状态或None)]"""
+        for user_id, state in entries:
+            if user_id == self.self_id:
+                continue
+            old_state = self.rendered.get(user_id)
+            if state == old_state:
+                continue
+            cursor_tag, sel_tag = self._tags(user_id)
+            if state is None:
+                self.text.tag_delete(cursor_tag, sel_tag)
+                self.rendered.pop(user_id, None)
+                continue
+
+            if old_state is None:
+                color = user_color(user_id)
+                self.text.tag_configure(cursor_tag, underline=True, foreground=color)
+                self.text.tag_configure(sel_tag, background=lighten(color))
+                self.text.tag_lower(sel_tag)
+            else:
+                self.text.tag_remove(cursor_tag, '1.0', 'end')
+                self.text.tag_remove(sel_tag, '1.0', 'end')
+
+            cursor, sel_start, sel_end = state
+            self.text.tag_add(cursor_tag, f"1.0+{cursor}c")
+            if sel_end > sel_start:
+                self.text.tag_add(sel_tag, f"1.0+{sel_start}c", f"1.0+{sel_end}c")
+            self.rendered[user_id] = state
+
+    def clear(self):
+        """移除所有远程光标"""
+        for user_id in list(self.rendered):
+            self.text.tag_delete(*self._tags(user_id))
+        self.rendered.clear()
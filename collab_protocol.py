@@ -0,0 +1,687 @@
+"""
+OfficeMate 协作二进制协议
+
+帧格式:
+    MAGIC(2) | VERSION(1) | FLAGS(1) | TYPE(1) | varint(负载长度) | 负载
+
+- 负载超过压缩阈值时使用 zlib 压缩（可选 lz4，需双方均已安装）
+- 编辑操作使用 varint 编码的位置/长度，文本使用 UTF-8
+- 多个细碎编辑在发送前由 OpBatcher 合并为一帧
+- 新加入的客户端先收到快照，再收到快照之后的增量尾部
+- 客户端提交的批次带有它所基于的服务器序号，服务器把它变换到最新版本后再应用
+  （transform_ops），并发编辑的各方最终得到相同的文本
+"""
+import bisect
+import itertools
+import zlib
+from collections import deque
+
+try:
+    import lz4.frame as lz4_frame
+    HAS_LZ4 = True
+except ImportError:
+    HAS_LZ4 = False
+
+MAGIC = b'OM'
+PROTOCOL_VERSION = 2
+HEADER_SIZE = 5  # MAGIC + VERSION + FLAGS + TYPE
+
+# 帧标志位
+FLAG_ZLIB = 0x01
+FLAG_LZ4 = 0x02
+
+# 消息类型
+MSG_HELLO = 1
+MSG_SNAPSHOT = 2
+MSG_OPS = 3
+MSG_ACK = 4
+MSG_PRESENCE = 5
+MSG_SUBMIT = 6  # 客户端提交的编辑批次（服务器广播的是 MSG_OPS）
+
+# 操作类型
+OP_INSERT = 0
+OP_DELETE = 1
+
+COMPRESS_THRESHOLD = 512  # 字节
+TEXT_CHUNK_SIZE = 16 * 1024  # TextBuffer 每块的字符数
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """协议错误"""
+
+
+# ===== varint 编码 =====
+
+def encode_varint(value):
+    """将非负整数编码为 varint"""
+    if value < 0:
+        raise ProtocolError(f"varint 不支持负数: {value}")
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(buf, pos=0):
+    """从 buf[pos:] 解码 varint，返回 (值, 新位置)"""
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ProtocolError("varint 数据不完整")
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            raise ProtocolError("varint 过长")
+
+
+def encode_string(text):
+    """编码长度前缀的 UTF-8 字符串"""
+    data = text.encode('utf-8')
+    return encode_varint(len(data)) + data
+
+
+def decode_string(buf, pos):
+    """解码长度前缀的 UTF-8 字符串"""
+    length, pos = decode_varint(buf, pos)
+    end = pos + length
+    if end > len(buf):
+        raise ProtocolError("字符串数据不完整")
+    return bytes(buf[pos:end]).decode('utf-8'), end
+
+
+# ===== 编辑操作 =====
+
+def insert_op(pos, text):
+    """创建插入操作"""
+    return (OP_INSERT, pos, text)
+
+
+def delete_op(pos, length):
+    """创建删除操作"""
+    return (OP_DELETE, pos, length)
+
+
+def encode_ops(ops):
+    """编码操作列表"""
+    out = bytearray(encode_varint(len(ops)))
+    for kind, pos, data in ops:
+        out.append(kind)
+        out += encode_varint(pos)
+        if kind == OP_INSERT:
+            out += encode_string(data)
+        else:
+            out += encode_varint(data)
+    return bytes(out)
+
+
+def decode_ops(buf, pos=0):
+    """解码操作列表，返回 (操作列表, 新位置)"""
+    count, pos = decode_varint(buf, pos)
+    ops = []
+    for _ in range(count):
+        if pos >= len(buf):
+            raise ProtocolError("操作数据不完整")
+        kind = buf[pos]
+        pos += 1
+        op_pos, pos = decode_varint(buf, pos)
+        if kind == OP_INSERT:
+            text, pos = decode_string(buf, pos)
+            ops.append((OP_INSERT, op_pos, text))
+        elif kind == OP_DELETE:
+            length, pos = decode_varint(buf, pos)
+            ops.append((OP_DELETE, op_pos, length))
+        else:
+            raise ProtocolError(f"未知操作类型: {kind}")
+    return ops, pos
+
+
+def _check_op(kind, pos, data, length):
+    end = pos if kind == OP_INSERT else pos + data
+    if pos < 0 or end > length:
+        raise ProtocolError(f"操作位置超出文本范围: {pos}")
+
+
+class TextBuffer:
+    """分块保存的文本
+
+    每次插入/删除只复制所在的块（以及更新块起点列表），与文档大小无关；
+    需要完整字符串时才拼接，结果缓存到下一次修改。
+    """
+
+    def __init__(self, text="", chunk_size=TEXT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or [""]
+        self.starts = []
+        self._update_starts(0)
+        self._text = text
+
+    def __len__(self):
+        return self.length
+
+    def _update_starts(self, first):
+        """重新计算 first 之后各块的起点（first 之前的块没有变化）"""
+        # 删掉末尾的块时 first 可能越过最后一块，从最后一块重新计算
+        first = min(first, len(self.chunks) - 1)
+        start = self.starts[first] if first < len(self.starts) else 0
+        del self.starts[first:]
+        self.starts.extend(itertools.accumulate((len(chunk) for chunk in self.chunks[first:-1]), initial=start))
+        self.length = self.starts[-1] + len(self.chunks[-1])
+
+    def _locate(self, pos):
+        return bisect.bisect_right(self.starts, pos) - 1
+
+    def _replace(self, first, last, text):
+        """用 text 替换 chunks[first:last + 1]，过长时切分，过短时与后一块合并"""
+        if len(text) < self.chunk_size // 4 and last + 1 < len(self.chunks):
+            last += 1
+            text += self.chunks[last]
+        if len(text) > 2 * self.chunk_size:
+            pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        else:
+            pieces = [text] if text or len(self.chunks) == last - first + 1 else []
+        self.chunks[first:last + 1] = pieces
+        self._update_starts(first)
+        self._text = None
+
+    def insert(self, pos, text):
+        _check_op(OP_INSERT, pos, text, self.length)
+        if not text:
+            return
+        index = self._locate(pos)
+        chunk, offset = self.chunks[index], pos - self.starts[index]
+        self._replace(index, index, chunk[:offset] + text + chunk[offset:])
+
+    def delete(self, pos, length):
+        _check_op(OP_DELETE, pos, length, self.length)
+        if not length:
+            return
+        first, last = self._locate(pos), self._locate(pos + length)
+        head = self.chunks[first][:pos - self.starts[first]]
+        tail = self.chunks[last][pos + length - self.starts[last]:]
+        self._replace(first, last, head + tail)
+
+    def apply(self, ops):
+        for kind, pos, data in ops:
+            if kind == OP_INSERT:
+                self.insert(pos, data)
+            else:
+                self.delete(pos, data)
+
+    def text(self):
+        if self._text is None:
+            self._text = "".join(self.chunks)
+        return self._text
+
+
+def apply_ops(text, ops):
+    """将操作依次应用到字符串上
+
+    多个操作时先分块再拼接一次，总耗时与 文档大小 + 操作数 成正比，而不是二者之积。
+    """
+    if len(ops) > 2:
+        buffer = TextBuffer(text)
+        buffer.apply(ops)
+        return buffer.text()
+    for kind, pos, data in ops:
+        _check_op(kind, pos, data, len(text))
+        if kind == OP_INSERT:
+            text = text[:pos] + data + text[pos:]
+        else:
+            text = text[:pos] + text[pos + data:]
+    return text
+
+
+# ===== 操作变换 =====
+
+def _transform_pair(a, b, a_first):
+    """a、b 为作用于同一文本的并发操作，返回 (a', b')：a' 在 b 之后应用，b' 在 a 之后应用
+
+    两个插入位置相同时 a_first 决定 a 的文字在前。删除范围内的并发插入保留下来，
+    删除因此分成两段；两个删除重叠的部分只删除一次。
+    """
+    a_kind, a_pos, a_data = a
+    b_kind, b_pos, b_data = b
+    if a_kind == OP_INSERT and b_kind == OP_INSERT:
+        if a_pos < b_pos or (a_pos == b_pos and a_first):
+            return [a], [insert_op(b_pos + len(a_data), b_data)]
+        return [insert_op(a_pos + len(b_data), a_data)], [b]
+    if a_kind == OP_DELETE and b_kind == OP_DELETE:
+        def shift(pos, start, length):
+            # 删除 [start, start + length) 之后 pos 的新位置
+            return pos if pos <= start else max(start, pos - length)
+        a_start, a_end = shift(a_pos, b_pos, b_data), shift(a_pos + a_data, b_pos, b_data)
+        b_start, b_end = shift(b_pos, a_pos, a_data), shift(b_pos + b_data, a_pos, a_data)
+        a_ops = [delete_op(a_start, a_end - a_start)] if a_end > a_start else []
+        b_ops = [delete_op(b_start, b_end - b_start)] if b_end > b_start else []
+        return a_ops, b_ops
+    if a_kind == OP_INSERT:
+        b_ops, a_ops = _transform_insert_delete(a, b)
+        return a_ops, b_ops
+    return _transform_insert_delete(b, a)
+
+
+def _transform_insert_delete(insert, delete):
+    """返回 (delete', insert')"""
+    _, ins_pos, text = insert
+    _, del_pos, length = delete
+    if ins_pos <= del_pos:
+        return [delete_op(del_pos + len(text), length)], [insert]
+    if ins_pos >= del_pos + length:
+        return [delete], [insert_op(ins_pos - length, text)]
+    before = ins_pos - del_pos
+    return ([delete_op(del_pos, before), delete_op(del_pos + len(text), length - before)],
+            [insert_op(del_pos, text)])
+
+
+def _transform_against_op(ops, b, ops_first):
+    b_ops = [b]
+    result = []
+    for op in ops:
+        if len(b_ops) == 1:
+            op_ops, b_ops = _transform_pair(op, b_ops[0], ops_first)
+        else:
+            op_ops, b_ops = _transform_op(op, b_ops, ops_first)
+        result.extend(op_ops)
+    return result, b_ops
+
+
+def _transform_op(a, ops, a_first):
+    a_ops = [a]
+    result = []
+    for op in ops:
+        a_ops, op_ops = _transform_against_op(a_ops, op, a_first)
+        result.extend(op_ops)
+    return a_ops, result
+
+
+def transform_ops(ops, against, ops_first=False):
+    """变换两组作用于同一文本的并发操作，返回 (ops', against')
+
+    ops' 在 against 之后应用，against' 在 ops 之后应用，两种顺序得到相同的文本。
+    服务器变换客户端批次、客户端变换收到的远程操作时都以已提交的操作为先
+    （ops_first=False），双方的结果因此一致。
+    """
+    against = list(against)
+    result = []
+    for op in ops:
+        op_ops, against = _transform_op(op, against, ops_first)
+        result.extend(op_ops)
+    return result, against
+
+
+DIFF_BLOCK = 4096
+
+
+def _common_prefix(a, b):
+    """公共前缀长度：先按块比较切片（C 实现），再在不同的块内二分"""
+    limit = min(len(a), len(b))
+    start = 0
+    while start + DIFF_BLOCK <= limit and a[start:start + DIFF_BLOCK] == b[start:start + DIFF_BLOCK]:
+        start += DIFF_BLOCK
+    low, high = start, min(start + DIFF_BLOCK, limit)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[start:mid] == b[start:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix(a, b, limit):
+    """公共后缀长度（不超过 limit）"""
+    a_len, b_len = len(a), len(b)
+    length = 0
+    while length + DIFF_BLOCK <= limit and \
+            a[a_len - length - DIFF_BLOCK:a_len - length] == b[b_len - length - DIFF_BLOCK:b_len - length]:
+        length += DIFF_BLOCK
+    low, high = length, min(length + DIFF_BLOCK, limit)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[a_len - mid:a_len - length] == b[b_len - mid:b_len - length]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def diff_text(old, new):
+    """通过公共前缀/后缀计算从 old 到 new 的最小操作"""
+    if old == new:
+        return []
+    start = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - start)
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+
+    ops = []
+    if old_end > start:
+        ops.append(delete_op(start, old_end - start))
+    if new_end > start:
+        ops.append(insert_op(start, new[start:new_end]))
+    return ops
+
+
+class OpBatcher:
+    """合并连续的细碎编辑，减少发送的帧数"""
+
+    def __init__(self, window=0.05, max_chars=4096):
+        self.window = window
+        self.max_chars = max_chars
+        self.pending = []
+        self.pending_chars = 0
+        self.first_time = None
+
+    def add(self, op, now):
+        """加入一个操作，尽量与上一个操作合并"""
+        if self.first_time is None:
+            self.first_time = now
+        if self.pending and self._merge(op):
+            return
+        self.pending.append(op)
+        self.pending_chars += len(op[2]) if op[0] == OP_INSERT else 1
+
+    def _merge(self, op):
+        kind, pos, data = op
+        last_kind, last_pos, last_data = self.pending[-1]
+        if kind != last_kind:
+            return False
+        if kind == OP_INSERT:
+            # 连续输入：新插入紧跟在上次插入之后
+            if pos == last_pos + len(last_data):
+                self.pending[-1] = (OP_INSERT, last_pos, last_data + data)
+                self.pending_chars += len(data)
+                return True
+        else:
+            # 退格：新删除紧挨在上次删除之前
+            if pos + data == last_pos:
+                self.pending[-1] = (OP_DELETE, pos, last_data + data)
+                return True
+            # 向前删除：同一位置连续删除
+            if pos == last_pos:
+                self.pending[-1] = (OP_DELETE, pos, last_data + data)
+                return True
+        return False
+
+    def due(self, now):
+        """是否应当发送当前批次"""
+        if not self.pending:
+            return False
+        return self.pending_chars >= self.max_chars or now - self.first_time >= self.window
+
+    def flush(self):
+        """取出当前批次"""
+        ops = self.pending
+        self.pending = []
+        self.pending_chars = 0
+        self.first_time = None
+        return ops
+
+
+# ===== 帧编码 =====
+
+def _compress(payload, threshold, use_lz4):
+    if threshold is None or len(payload) < threshold:
+        return payload, 0
+    if use_lz4 and HAS_LZ4:
+        compressed, flag = lz4_frame.compress(payload), FLAG_LZ4
+    else:
+        compressed, flag = zlib.compress(payload, 6), FLAG_ZLIB
+    if len(compressed) >= len(payload):
+        return payload, 0
+    return compressed, flag
+
+
+def encode_frame(msg_type, payload, compress_threshold=COMPRESS_THRESHOLD, use_lz4=False):
+    """编码一帧"""
+    body, flags = _compress(payload, compress_threshold, use_lz4)
+    header = MAGIC + bytes((PROTOCOL_VERSION, flags, msg_type))
+    return header + encode_varint(len(body)) + body
+
+
+def _decompress(body, flags):
+    if flags & FLAG_LZ4:
+        if not HAS_LZ4:
+            raise ProtocolError("收到 LZ4 压缩帧，但未安装 lz4")
+        return lz4_frame.decompress(body)
+    if flags & FLAG_ZLIB:
+        return zlib.decompress(body)
+    return body
+
+
+class FrameDecoder:
+    """增量解析字节流中的帧（处理半包/粘包）"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """追加收到的数据，返回已完整的 (消息类型, 负载) 列表"""
+        self.buffer += data
+        frames = []
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+        return frames
+
+    def _next_frame(self):
+        buf = self.buffer
+        if len(buf) < HEADER_SIZE + 1:
+            return None
+        if buf[:2] != MAGIC:
+            raise ProtocolError("帧标识错误")
+        version, flags, msg_type = buf[2], buf[3], buf[4]
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"不支持的协议版本: {version}")
+        try:
+            length, pos = decode_varint(buf, HEADER_SIZE)
+        except ProtocolError:
+            return None  # 长度字段尚未收全
+        if length > MAX_FRAME_SIZE:
+            raise ProtocolError(f"帧过大: {length}")
+        if len(buf) < pos + length:
+            return None
+        body = bytes(buf[pos:pos + length])
+        del buf[:pos + length]
+        return msg_type, _decompress(body, flags)
+
+
+# ===== 消息负载 =====
+
+def encode_hello(client_id, last_seq=None):
+    """客户端握手：客户端ID + 已确认的最后序号（None 表示还没有文档，需要快照）"""
+    return encode_string(client_id) + encode_varint(0 if last_seq is None else last_seq + 1)
+
+
+def decode_hello(payload):
+    client_id, pos = decode_string(payload, 0)
+    last_seq, _ = decode_varint(payload, pos)
+    return client_id, (last_seq - 1 if last_seq else None)
+
+
+def encode_snapshot(seq, text):
+    """文档快照：快照对应的序号 + 全文"""
+    return encode_varint(seq) + encode_string(text)
+
+
+def decode_snapshot(payload):
+    seq, pos = decode_varint(payload, 0)
+    text, _ = decode_string(payload, pos)
+    return seq, text
+
+
+def encode_ops_message(seq_start, author, ops, client_ref=0):
+    """操作消息（服务器 -> 客户端）：首个操作的序号 + 作者 + 作者的批次编号 + 操作列表"""
+    return encode_varint(seq_start) + encode_string(author) + encode_varint(client_ref) + encode_ops(ops)
+
+
+def decode_ops_message(payload):
+    seq_start, pos = decode_varint(payload, 0)
+    author, pos = decode_string(payload, pos)
+    client_ref, pos = decode_varint(payload, pos)
+    ops, _ = decode_ops(payload, pos)
+    return seq_start, author, client_ref, ops
+
+
+def encode_submit(client_ref, base_seq, ops):
+    """提交（客户端 -> 服务器）：客户端的批次编号 + 批次所基于的服务器序号 + 操作列表"""
+    return encode_varint(client_ref) + encode_varint(base_seq) + encode_ops(ops)
+
+
+def decode_submit(payload):
+    client_ref, pos = decode_varint(payload, 0)
+    base_seq, pos = decode_varint(payload, pos)
+    ops, _ = decode_ops(payload, pos)
+    return client_ref, base_seq, ops
+
+
+def encode_ack(seq, client_ref=0):
+    """确认：客户端的批次已提交为序号 seq 及之前的操作 + 该客户端最后一个已应用批次的编号"""
+    return encode_varint(seq) + encode_varint(client_ref)
+
+
+def decode_ack(payload):
+    seq, pos = decode_varint(payload, 0)
+    client_ref, _ = decode_varint(payload, pos)
+    return seq, client_ref
+
+
+def encode_presence(entries):
+    """在线状态：[(用户ID, (光标, 选区起点, 选区终点) 或 None 表示离开)]"""
+    out = bytearray(encode_varint(len(entries)))
+    for user_id, state in entries:
+        out += encode_string(user_id)
+        if state is None:
+            out.append(1)
+        else:
+            out.append(0)
+            for value in state:
+                out += encode_varint(value)
+    return bytes(out)
+
+
+def decode_presence(payload):
+    count, pos = decode_varint(payload, 0)
+    entries = []
+    for _ in range(count):
+        user_id, pos = decode_string(payload, pos)
+        removed = payload[pos]
+        pos += 1
+        if removed:
+            entries.append((user_id, None))
+            continue
+        cursor, pos = decode_varint(payload, pos)
+        sel_start, pos = decode_varint(payload, pos)
+        sel_end, pos = decode_varint(payload, pos)
+        entries.append((user_id, (cursor, sel_start, sel_end)))
+    return entries
+
+
+class DeltaLog:
+    """服务器端的增量日志
+
+    保存一个检查点快照（以及其编码好的帧，避免每次加入都重新压缩），
+    和最近若干操作（带作者和作者的批次编号）。新客户端加入时发送 快照 + 尾部；
+    断线重连的客户端只需要它最后确认序号之后的操作。当前文本保存在 TextBuffer
+    中，追加操作的耗时与文档大小无关。
+    """
+
+    def __init__(self, text="", checkpoint_interval=1000, retain_limit=10000):
+        self.buffer = TextBuffer(text)
+        self.seq = 0
+        self.checkpoint_interval = checkpoint_interval
+        self.retained = deque(maxlen=max(retain_limit, checkpoint_interval))
+        self.checkpoint_seq = 0
+        self.checkpoint_text = text
+        self._checkpoint_frame = None
+
+    @property
+    def text(self):
+        return self.buffer.text()
+
+    def append(self, ops, author="", client_ref=0):
+        """追加操作（已是最新版本上的操作），返回首个操作的序号"""
+        self.buffer.apply(ops)
+        seq_start = self.seq + 1
+        for op in ops:
+            self.seq += 1
+            self.retained.append((self.seq, author, client_ref, op))
+        if self.seq - self.checkpoint_seq >= self.checkpoint_interval:
+            self.checkpoint()
+        return seq_start
+
+    def commit(self, ops, base_seq, author="", client_ref=0):
+        """提交基于序号 base_seq 的批次
+
+        先把批次变换到 base_seq 之后已提交的操作之后再追加，返回 (首个序号, 变换后的操作)。
+        base_seq 之后的操作已超出保留范围时无法变换，返回 None。
+        """
+        entries = self.entries_since(base_seq)
+        if entries is None:
+            return None
+        if entries:
+            ops, _ = transform_ops(ops, [op for _, _, _, op in entries])
+        return self.append(ops, author, client_ref), ops
+
+    def checkpoint(self):
+        """以当前文本建立新的检查点"""
+        self.checkpoint_seq = self.seq
+        self.checkpoint_text = self.text
+        self._checkpoint_frame = None
+
+    def entries_since(self, seq):
+        """返回序号大于 seq 的 (序号, 作者, 批次编号, 操作)；若已超出保留范围返回 None"""
+        if seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self.retained or self.retained[0][0] > seq + 1:
+            return None
+        return [entry for entry in self.retained if entry[0] > seq]
+
+    def ops_since(self, seq):
+        """返回序号大于 seq 的操作；若已超出保留范围返回 None"""
+        entries = self.entries_since(seq)
+        if entries is None:
+            return None
+        return [op for _, _, _, op in entries]
+
+    def snapshot_frame(self):
+        """检查点快照帧（缓存）"""
+        if self._checkpoint_frame is None:
+            payload = encode_snapshot(self.checkpoint_seq, self.checkpoint_text)
+            self._checkpoint_frame = encode_frame(MSG_SNAPSHOT, payload)
+        return self._checkpoint_frame
+
+    def _tail_frames(self, entries):
+        """把同一批次（作者和批次编号相同）的连续操作编码为一帧"""
+        frames = []
+        for (author, client_ref), batch in itertools.groupby(entries, key=lambda entry: entry[1:3]):
+            batch = list(batch)
+            payload = encode_ops_message(batch[0][0], author, [op for _, _, _, op in batch], client_ref)
+            frames.append(encode_frame(MSG_OPS, payload))
+        return frames
+
+    def join_frames(self):
+        """新客户端加入时发送的帧：快照 + 增量尾部"""
+        tail = self.entries_since(self.checkpoint_seq)
+        if tail is None:
+            self.checkpoint()
+            tail = []
+        return [self.snapshot_frame()] + self._tail_frames(tail)
+
+    def resync_frames(self, seq):
+        """重连客户端的增量帧；超出保留范围时返回 None（需发送快照）"""
+        entries = self.entries_since(seq)
+        if entries is None:
+            return None
+        return self._tail_frames(entries)
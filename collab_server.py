@@ -0,0 +1,246 @@
+"""
+OfficeMate 协作服务器
+
+- 每个客户端连接一个接收线程（handle_client）和一个发送线程（FrameSender）；
+  广播只把帧放入各连接的发送队列，调用方（包括 Tk 线程）不会因为某个客户端
+  接收缓慢而阻塞
+- 客户端提交的批次带有它所基于的序号，由 DeltaLog.commit 变换到最新版本后提交，
+  再广播给其他客户端并向提交者确认；服务器本机的编辑通过 submit_local 以同样
+  的方式提交
+- 提交和入队都在 lock 内进行，每个连接收到的帧顺序与提交顺序一致
+"""
+import queue
+import socket
+import threading
+
+from collab_protocol import (
+    DeltaLog, FrameDecoder, ProtocolError,
+    MSG_HELLO, MSG_OPS, MSG_ACK, MSG_PRESENCE, MSG_SUBMIT,
+    encode_frame, decode_hello, encode_ops_message, decode_submit, encode_ack, decode_presence
+)
+from collab_presence import PresenceHub
+
+KEEPALIVE_IDLE = 60  # 协作连接空闲多少秒后开始探测对端是否还在
+MAX_QUEUED_BYTES = 64 * 1024 * 1024  # 发送队列积压超过该值的客户端被断开
+
+
+class FrameSender:
+    """连接的发送端：帧放入队列，由独立线程发送"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.queue = queue.Queue()
+        self.queued_bytes = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="collab-sender", daemon=True)
+        self.thread.start()
+
+    def send(self, frame):
+        """把帧放入发送队列，不阻塞；对端长时间不接收、积压过多时断开连接"""
+        if self.closed:
+            return False
+        with self.lock:
+            self.queued_bytes += len(frame)
+            overflow = self.queued_bytes > MAX_QUEUED_BYTES
+        if overflow:
+            print("协作连接发送积压过多，断开连接")
+            self.close()
+            return False
+        self.queue.put(frame)
+        return True
+
+    def _run(self):
+        while True:
+            frames = [self.queue.get()]
+            # 积压的帧合并为一次发送
+            while frames[-1] is not None:
+                try:
+                    frames.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            data = b"".join(frame for frame in frames if frame is not None)
+            with self.lock:
+                self.queued_bytes -= len(data)
+            if data:
+                try:
+                    self.sock.sendall(data)
+                except OSError:
+                    self.close()
+                    return
+            if frames[-1] is None:
+                return
+
+    def close(self):
+        """停止发送并关闭套接字，该连接的接收线程随之退出"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class CollaborationServer:
+    """协作服务器的状态和连接处理，不依赖 Tk
+
+    Tk 线程通过 inbox 接收其他用户已提交的批次 (MSG_OPS, (首个序号, 作者, 批次编号, 操作))
+    和本机批次的确认 (MSG_ACK, (序号, 批次编号))，二者的顺序与提交顺序一致。
+    """
+
+    def __init__(self, text, user_id, inbox, tls_context=None):
+        self.delta_log = DeltaLog(text)
+        self.user_id = user_id
+        self.inbox = inbox
+        self.tls_context = tls_context
+        self.lock = threading.Lock()
+        self.clients = {}  # FrameSender -> 客户端ID（握手前为 None）
+        self.client_refs = {}  # 客户端ID -> 已提交的最后一个批次编号
+        self.presence_hub = PresenceHub()
+
+    def serve(self, server_socket):
+        """接受连接（后台线程），server_socket 关闭后返回"""
+        while True:
+            try:
+                client_socket, address = server_socket.accept()
+            except OSError:
+                break
+            try:
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # 客户端异常断开（断电、断网）时 recv 不会返回，靠 keepalive 发现死连接
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                if hasattr(socket, 'TCP_KEEPIDLE'):
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+                if self.tls_context:
+                    # 握手放到处理线程中，避免阻塞 accept
+                    client_socket = self.tls_context.wrap_socket(
+                        client_socket, server_side=True, do_handshake_on_connect=False)
+            except OSError as e:
+                print(f"客户端连接失败: {e}")
+                client_socket.close()
+                continue
+            print(f"客户端连接: {address}")
+            threading.Thread(target=self.handle_client, args=(client_socket,), daemon=True).start()
+
+    def handle_client(self, client_socket):
+        """处理单个客户端的消息（后台线程）"""
+        decoder = FrameDecoder()
+        sender = None
+        try:
+            if self.tls_context:
+                client_socket.do_handshake()
+            # 握手完成后才加入广播列表
+            sender = FrameSender(client_socket)
+            with self.lock:
+                self.clients[sender] = None
+            while True:
+                data = client_socket.recv(65536)
+                if not data:
+                    break
+                for msg_type, payload in decoder.feed(data):
+                    if msg_type == MSG_HELLO:
+                        self.handle_hello(sender, *decode_hello(payload))
+                    elif msg_type == MSG_PRESENCE:
+                        client_id = self.clients.get(sender)
+                        # 只接受客户端自己的状态
+                        for user_id, state in decode_presence(payload):
+                            if client_id and user_id == client_id:
+                                with self.lock:
+                                    self.presence_hub.update(client_id, state)
+                    elif msg_type == MSG_SUBMIT:
+                        client_id = self.clients.get(sender)
+                        if not client_id:
+                            raise ProtocolError("握手前提交了编辑")
+                        self.submit(client_id, *decode_submit(payload), sender=sender)
+        except (OSError, ProtocolError) as e:
+            print(f"客户端连接异常: {e}")
+        finally:
+            with self.lock:
+                client_id = self.clients.pop(sender, None)
+                if client_id:
+                    self.presence_hub.remove(client_id)
+            if sender:
+                sender.close()
+            else:
+                client_socket.close()
+
+    def handle_hello(self, sender, client_id, last_seq):
+        """握手：补发客户端缺失的增量（超出保留范围时发送快照），然后确认"""
+        with self.lock:
+            self.clients[sender] = client_id
+            frames = self.delta_log.resync_frames(last_seq) if last_seq is not None else None
+            if frames is None:
+                frames = self.delta_log.join_frames()
+            for frame in frames:
+                sender.send(frame)
+            # 握手确认：已发送到的序号 + 该客户端已提交的最后一个批次（其余的需要重新提交）
+            ack = encode_ack(self.delta_log.seq, self.client_refs.get(client_id, 0))
+            sender.send(encode_frame(MSG_ACK, ack))
+            sender.send(self.presence_hub.full_frame())
+
+    def submit(self, client_id, client_ref, base_seq, ops, sender=None):
+        """提交基于 base_seq 的批次；sender 为 None 时是服务器本机的编辑"""
+        with self.lock:
+            if client_ref <= self.client_refs.get(client_id, 0):
+                # 已提交过的批次，只重新确认
+                ack = (base_seq, self.client_refs[client_id])
+            else:
+                result = self.delta_log.commit(ops, base_seq, client_id, client_ref)
+                if result is None:
+                    # 无法变换：断开连接，客户端重连后从快照开始
+                    raise ProtocolError(f"批次基于的序号 {base_seq} 已超出增量日志的保留范围")
+                seq_start, ops = result
+                self.client_refs[client_id] = client_ref
+                if ops:
+                    frame = encode_frame(MSG_OPS, encode_ops_message(seq_start, client_id, ops, client_ref))
+                    self.broadcast(frame, exclude=sender)
+                    if sender is not None:
+                        self.inbox.put((MSG_OPS, (seq_start, client_id, client_ref, ops)))
+                ack = (self.delta_log.seq, client_ref)
+            if sender is not None:
+                sender.send(encode_frame(MSG_ACK, encode_ack(*ack)))
+            else:
+                self.inbox.put((MSG_ACK, ack))
+
+    def submit_local(self, client_ref, base_seq, ops):
+        """提交服务器本机的编辑批次（Tk 线程），确认经由 inbox 返回"""
+        self.submit(self.user_id, client_ref, base_seq, ops)
+
+    def broadcast(self, frame, exclude=None):
+        """把同一帧放入每个已握手客户端的发送队列（调用方需持有 lock）"""
+        for sender, client_id in self.clients.items():
+            if sender is not exclude and client_id:
+                sender.send(frame)
+
+    def presence_tick(self, state=None):
+        """汇总本周期的在线状态变化并广播，返回变化列表（无变化时为 None）"""
+        with self.lock:
+            if state is not None:
+                self.presence_hub.update(self.user_id, state)
+            entries, frame = self.presence_hub.tick()
+            if frame:
+                # 每个周期一帧，同一份字节发给所有客户端
+                self.broadcast(frame)
+        return entries
+
+    def connection_count(self):
+        return len(self.clients)
+
+    def user_count(self):
+        return sum(1 for client_id in self.clients.values() if client_id)
+
+    def close(self):
+        """断开所有客户端"""
+        with self.lock:
+            senders = list(self.clients)
+            self.clients.clear()
+        for sender in senders:
+            sender.close()
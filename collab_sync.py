@@ -0,0 +1,142 @@
+"""
+OfficeMate 协作编辑的本地同步状态
+
+客户端（以及服务器本机的编辑者）的本地文本 = 服务器序号 last_seq 时的文本 +
+pending 中尚未确认的本地批次。
+
+- 同一时间只有一个批次在途；确认之前产生的编辑留在 pending 中，确认后合并为
+  一个批次发送，因此每个批次所基于的序号都是确定的
+- 收到的远程操作基于 last_seq：先与 pending 中的批次相互变换再应用到本地文本，
+  pending 中的批次随之变换。服务器变换同一批次时使用相同的规则（已提交的操作
+  优先），双方的结果一致
+- 有持久化日志时还维护 last_seq 时的服务器文本，断线和退出时连同变换后的批次
+  保存为同步点。重启后握手时发送该序号，服务器只补发之后的增量，日志中的批次
+  与增量变换后照常提交
+"""
+from collab_protocol import TextBuffer, transform_ops
+
+
+class SyncState:
+    """本地批次和服务器序号（只在 Tk 线程中使用）
+
+    store 为可选的持久化日志（OfflineOpLog），提供 append/ack 和同步点。last_seq 为 None
+    表示还没有收到快照（客户端），服务器本机的编辑者从序号 0 开始；日志中有同步点时
+    从同步点继续。
+    """
+
+    def __init__(self, store=None, last_seq=None):
+        self.store = store
+        self.last_seq = last_seq
+        self.base = None  # 序号 last_seq 时的服务器文本（TextBuffer），只在有日志时维护
+        self.saved = False  # 日志中的同步点与 base 和 pending 一致
+        point = store.sync_point() if store else None
+        if point:
+            self.last_seq, text = point
+            self.base = TextBuffer(text)
+            self.saved = True
+        # [[批次编号, 操作列表]]，按顺序；没有同步点时日志中的批次基于未知的版本，收到快照后才处理
+        self.pending = [[ref, ops] for ref, ops in store.pending()] if store else []
+        self.in_flight = 0  # 在途批次的编号（合并发送时为其中最大的编号），0 表示没有
+        self.next_ref = 0
+
+    def add_local(self, ops):
+        """记录一个本地编辑批次，返回批次编号"""
+        if self.store:
+            ref = self.store.append(ops)
+        else:
+            self.next_ref += 1
+            ref = self.next_ref
+        self.pending.append([ref, ops])
+        return ref
+
+    def take_submit(self):
+        """没有在途批次时取出要提交的 (批次编号, 基于的序号, 操作)，否则返回 None"""
+        if self.in_flight or not self.pending:
+            return None
+        self.in_flight = self.pending[-1][0]
+        ops = [op for _, batch in self.pending for op in batch]
+        return self.in_flight, self.last_seq, ops
+
+    def receive(self, seq_start, author, client_ref, ops, own_id):
+        """处理服务器发来的已提交操作，返回需要应用到本地文本的操作"""
+        skip = self.last_seq + 1 - seq_start
+        if skip > 0:
+            ops = ops[skip:]
+            seq_start += skip
+        if not ops:
+            return []
+        self.last_seq = seq_start + len(ops) - 1
+        self._advance(ops)
+        if author == own_id and self.pending and self.pending[0][0] <= client_ref:
+            # 自己已提交的批次（重连后补发的增量中）：本地已有这些编辑，相当于确认
+            self._acknowledge(client_ref, committed=True)
+            return []
+        for batch in self.pending:
+            batch[1], ops = transform_ops(batch[1], ops)
+        return ops
+
+    def acknowledge(self, seq, client_ref):
+        """服务器确认：seq 及之前的操作都已收到，client_ref 及之前的批次已提交"""
+        self.last_seq = seq if self.last_seq is None else max(self.last_seq, seq)
+        self._acknowledge(client_ref)
+
+    def _acknowledge(self, client_ref, committed=False):
+        """删除 client_ref 及之前的批次；committed 为 True 时服务器文本已按收到的操作更新"""
+        if self.in_flight and self.in_flight <= client_ref:
+            self.in_flight = 0
+        if client_ref <= 0 or not self.pending or self.pending[0][0] > client_ref:
+            return
+        if not committed:
+            for ref, ops in self.pending:
+                if ref <= client_ref:
+                    self._advance(ops)
+        self.pending = [batch for batch in self.pending if batch[0] > client_ref]
+        if self.store:
+            self.store.ack(client_ref)
+
+    def _advance(self, ops):
+        """服务器文本前进：更新 base，日志中的同步点随之失效（先于删除批次）"""
+        if self.base is None:
+            return
+        self._invalidate()
+        self.base.apply(ops)
+
+    def _invalidate(self):
+        if self.saved:
+            self.store.invalidate_sync_point()
+            self.saved = False
+
+    def reset(self, seq, text):
+        """收到快照，本地文本被替换为序号 seq 时的文本 text
+
+        pending 中的批次基于旧的文本，无法再变换，返回它们由调用方处理；其中已提交的
+        批次包含在快照或随后的增量中。
+        """
+        detached = self.pending
+        self.pending = []
+        self.in_flight = 0
+        self.last_seq = seq
+        if self.store:
+            self._invalidate()
+            self.base = TextBuffer(text)
+        return detached
+
+    def local_text(self):
+        """同步点恢复的本地文本（base + 未确认的批次），没有 base 时返回 None"""
+        if self.base is None:
+            return None
+        buffer = TextBuffer(self.base.text())
+        for _, ops in self.pending:
+            buffer.apply(ops)
+        return buffer.text()
+
+    def save(self):
+        """把 base 和变换后的批次保存为日志中的同步点（断线和退出时调用）"""
+        if self.base is None or self.saved:
+            return
+        self.store.save_sync_point(self.last_seq, self.base.text(), self.pending)
+        self.saved = True
+
+    def disconnected(self):
+        """连接断开：在途批次是否已提交要等重连后由服务器告知"""
+        self.in_flight = 0
@@ -0,0 +1,105 @@
+"""
+OfficeMate 协作传输层 TLS 支持
+
+- 服务器/客户端均使用 ssl.SSLContext 包装协作套接字
+- 仅允许 ECDHE 密钥交换（前向保密），优先使用 EC 证书
+- 服务器开启会话票据，客户端缓存会话，重连时跳过完整握手
+"""
+import os
+import threading
+
+COLLAB_CERT_FILE = "collab_cert.pem"
+COLLAB_KEY_FILE = "collab_key.pem"
+
+# main.py 默认生成的证书，作为没有 cryptography 时的后备
+FALLBACK_CERT_FILE = "my_cert.pem"
+FALLBACK_KEY_FILE = "my_key.pem"
+
+ECDHE_CIPHERS = "ECDHE+AESGCM:ECDHE+CHACHA20"
+
+
+def ensure_certificate(cert_file=COLLAB_CERT_FILE, key_file=COLLAB_KEY_FILE,
+                       common_name="localhost"):
+    """确保协作证书可用：已有证书仍然有效时复用，缺失、过期或与私钥不匹配时用 main.py 重新生成 EC 证书"""
+    try:
+        from main import generate_enhanced_self_signed_cert
+    except ImportError:
+        # 未安装 cryptography，无法检查或生成证书：沿用已有证书，否则退回到随程序分发的证书
+        if os.path.exists(cert_file) and os.path.exists(key_file):
+            return cert_file, key_file
+        return FALLBACK_CERT_FILE, FALLBACK_KEY_FILE
+    return generate_enhanced_self_signed_cert(
+        cert_file=cert_file,
+        key_file=key_file,
+        common_name=common_name,
+        key_type="ec",
+        key_size=256,
+        reuse_existing=True
+    )
+
+
+def create_server_context(cert_file, key_file):
+    """创建服务器端 TLS 上下文"""
+    import ssl  # 只在启用协作时加载
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.set_ciphers(ECDHE_CIPHERS)  # TLS1.2；TLS1.3 套件均为 (EC)DHE
+    context.set_ecdh_curve("prime256v1")
+    context.load_cert_chain(cert_file, key_file)
+    # 会话票据 + 服务器会话缓存，支持客户端快速重连
+    context.options &= ~ssl.OP_NO_TICKET
+    context.num_tickets = 2
+    return context
+
+
+def create_client_context(cert_file=None):
+    """创建客户端 TLS 上下文
+
+    cert_file 为服务器的自签名证书时，将其作为唯一信任锚（证书固定）。
+    """
+    import ssl
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.set_ciphers(ECDHE_CIPHERS)
+    if cert_file:
+        context.load_verify_locations(cert_file)
+        # 自签名证书已被固定为信任锚，主机名可能与证书 CN 不一致
+        context.check_hostname = False
+    else:
+        context.load_default_certs()
+    return context
+
+
+class TLSSessionCache:
+    """客户端 TLS 会话缓存，按 (主机, 端口) 保存可恢复的会话"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, host, port):
+        with self._lock:
+            return self._sessions.get((host, port))
+
+    def store(self, host, port, tls_socket):
+        """保存套接字当前的会话（TLS1.3 的票据在首次读取后才到达）"""
+        try:
+            session = tls_socket.session
+        except (AttributeError, ValueError):
+            return
+        if session is not None and (session.has_ticket or session.id):
+            with self._lock:
+                self._sessions[(host, port)] = session
+
+    def discard(self, host, port):
+        with self._lock:
+            self._sessions.pop((host, port), None)
+
+    def wrap(self, context, sock, host, port):
+        """包装并完成握手，尽量复用缓存的会话"""
+        session = self.get(host, port)
+        tls_socket = context.wrap_socket(sock, server_hostname=host, session=session)
+        self.store(host, port, tls_socket)
+        return tls_socket
@@ -0,0 +1,196 @@
+"""
+OfficeMate 紧凑文档格式（.omd）
+
+文件结构:
+    b"OMD1" | 头部长度 (4 字节, 大端) | 头部 JSON | 各分区数据
+
+头部记录文档元数据和分区表 {名称: {offset, length, size, codec}}，offset 相对于
+分区数据起点。各分区独立压缩（安装了 zstandard 时用 zstd，否则 zlib），读取时可以
+只解压需要的分区，例如打开文件时先只加载正文，切换到电子表格时再加载表格。
+
+- content       正文文本（UTF-8）
+- formatting    正文格式（rich_text 的样式表，紧凑 JSON）；打开文档时与正文一起读取
+- spreadsheet   只保存非空单元格 [[键, 值, 公式, 样式序号], ...]，相同样式只存一份
+- presentation  幻灯片列表（紧凑 JSON）
+"""
+import json
+import struct
+import zlib
+
+from atomic_file import atomic_write
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+MAGIC = b"OMD1"
+CONTAINER_EXTENSION = ".omd"
+SECTIONS = ("content", "formatting", "spreadsheet", "presentation")
+ZLIB_LEVEL = 1
+ZSTD_LEVEL = 3
+
+_HEADER_LENGTH = struct.Struct(">I")
+
+
+class ContainerError(Exception):
+    """文件不是有效的 .omd 文档"""
+
+
+def is_container_path(path):
+    return path.lower().endswith(CONTAINER_EXTENSION)
+
+
+def _compact_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# ===== 分区编码 =====
+
+
+def encode_cells(cell_data):
+    """去掉空单元格，样式字典去重后用序号引用"""
+    styles = []
+    style_index = {}
+    cells = []
+    for key, cell in cell_data.items():
+        value = cell.get("value", "")
+        formula = cell.get("formula", "")
+        style = cell.get("style") or {}
+        if not value and not formula and not style:
+            continue
+        index = -1
+        if style:
+            style_key = json.dumps(style, sort_keys=True)
+            index = style_index.get(style_key)
+            if index is None:
+                index = style_index[style_key] = len(styles)
+                styles.append(style)
+        cells.append([key, value, formula, index])
+    return {"styles": styles, "cells": cells}
+
+
+def decode_cells(data):
+    """还原为 cell_data 字典；共用样式的单元格各自得到一份拷贝，可以单独修改"""
+    styles = data.get("styles", [])
+    return {
+        key: {"value": value, "formula": formula, "style": dict(styles[index]) if index >= 0 else {}}
+        for key, value, formula, index in data.get("cells", [])
+    }
+
+
+def _encode_section(name, document):
+    if name == "content":
+        return document.get("content", "").encode('utf-8')
+    if name == "formatting":
+        return _compact_json(document.get("formatting"))
+    if name == "spreadsheet":
+        return _compact_json(encode_cells(document.get("spreadsheet_data", {})))
+    return _compact_json(document.get("presentation_data", []))
+
+
+def _decode_section(name, raw):
+    if name == "content":
+        return raw.decode('utf-8')
+    if name == "spreadsheet":
+        return decode_cells(json.loads(raw))
+    return json.loads(raw)
+
+
+DOCUMENT_KEYS = {"content": "content", "formatting": "formatting", "spreadsheet": "spreadsheet_data",
+                 "presentation": "presentation_data"}
+
+
+# ===== 压缩 =====
+
+
+def default_codec():
+    return "zstd" if HAS_ZSTD else "zlib"
+
+
+def _compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        if not HAS_ZSTD:
+            raise ContainerError("该文档使用 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "none":
+        return data
+    raise ContainerError(f"未知的压缩方式: {codec}")
+
+
+# ===== 读写 =====
+
+
+def encode_container(document, codec=None):
+    """把文档编码为 .omd 字节串"""
+    codec = codec or default_codec()
+    table = {}
+    blobs = []
+    offset = 0
+    for name in SECTIONS:
+        raw = _encode_section(name, document)
+        blob, section_codec = _compress(raw, codec), codec
+        if len(blob) >= len(raw):
+            # 很小或无法压缩的分区直接存储
+            blob, section_codec = raw, "none"
+        table[name] = {"offset": offset, "length": len(blob), "size": len(raw), "codec": section_codec}
+        blobs.append(blob)
+        offset += len(blob)
+    header = _compact_json({"metadata": document.get("metadata", {}), "sections": table})
+    return b"".join([MAGIC, _HEADER_LENGTH.pack(len(header)), header] + blobs)
+
+
+def write_container(path, document, codec=None):
+    data = encode_container(document, codec)
+    atomic_write(path, data)
+    return len(data)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ContainerError("不是 OfficeMate 文档")
+    prefix = f.read(_HEADER_LENGTH.size)
+    if len(prefix) != _HEADER_LENGTH.size:
+        raise ContainerError("文档头不完整")
+    length, = _HEADER_LENGTH.unpack(prefix)
+    header = json.loads(f.read(length))
+    return header, len(MAGIC) + _HEADER_LENGTH.size + length
+
+
+def read_header(path):
+    """只读取元数据和分区表"""
+    with open(path, 'rb') as f:
+        return _read_header(f)[0]
+
+
+def read_container(path, sections=SECTIONS):
+    """读取文档，只解压 sections 中列出的分区；未读取的分区不出现在结果中"""
+    document = {}
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+        document["metadata"] = header.get("metadata", {})
+        table = header["sections"]
+        for name in sections:
+            entry = table.get(name)
+            if entry is None:
+                continue
+            f.seek(data_start + entry["offset"])
+            blob = f.read(entry["length"])
+            if len(blob) != entry["length"]:
+                raise ContainerError(f"分区 {name} 不完整")
+            document[DOCUMENT_KEYS[name]] = _decode_section(name, _decompress(blob, entry["codec"]))
+    return document
+
+
+def read_section(path, name):
+    """读取单个分区（正文为字符串，表格为 cell_data，演示文稿为幻灯片列表）"""
+    return read_container(path, (name,)).get(DOCUMENT_KEYS[name])
@@ -0,0 +1,259 @@
+"""
+OfficeMate 无界面文档引擎
+
+文字处理、电子表格、演示文稿和数据库的核心逻辑，不依赖 Tk，
+供主程序、命令行工具（officemate_cli.py）和批处理任务共用。
+"""
+import ast
+import json
+import operator
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from atomic_file import atomic_open
+from document_container import is_container_path, read_container, write_container
+
+DOCUMENT_VERSION = '2.0'
+DEFAULT_DB_FILE = 'officemate.db'
+
+# ===== 文档 =====
+
+
+def build_document(content, spreadsheet_data=None, presentation_data=None, author="", formatting=None):
+    """组装 OfficeMate JSON 文档；formatting 为正文格式（rich_text 样式表），没有格式时为 None"""
+    now = datetime.now().isoformat()
+    return {
+        'metadata': {
+            'version': DOCUMENT_VERSION,
+            'created_at': now,
+            'modified_at': now,
+            'author': author
+        },
+        'content': content,
+        'formatting': formatting,
+        'spreadsheet_data': spreadsheet_data or {},
+        'presentation_data': presentation_data or []
+    }
+
+
+def load_document(path):
+    """读取文档；纯文本文件包装为只有正文的文档"""
+    if is_container_path(path):
+        document = build_document('')
+        document.update(read_container(path))
+        return document
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = f.read()
+    if path.lower().endswith('.json'):
+        data = json.loads(raw)
+        if isinstance(data, dict):
+            document = build_document('')
+            document.update(data)
+            return document
+    return build_document(raw)
+
+
+def write_document(path, document):
+    """按扩展名写入：.omd 和 .json 保存完整文档，其他格式只保存正文
+
+    写入临时文件后原子替换，保存中途崩溃不会损坏原文件。
+    """
+    if is_container_path(path):
+        write_container(path, document)
+    elif path.lower().endswith('.json'):
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    else:
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            f.write(document.get('content', ''))
+
+
+# ===== 电子表格 =====
+
+CELL_REF = re.compile(r'\b([A-Z])(\d+)\b', re.IGNORECASE)  # 引用不区分大小写，cell_key 转为大写
+RANGE_FUNCTION = re.compile(r'\b(SUM|AVERAGE|MAX|MIN)\(\s*([A-Z]\d+)\s*:\s*([A-Z]\d+)\s*\)', re.IGNORECASE)
+
+
+MAX_POWER_EXPONENT = 1000
+MAX_INTEGER_BITS = 4096  # 整数乘方结果的最大位数，超过时按错误处理
+
+_BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub,
+                     ast.Mult: operator.mul, ast.Div: operator.truediv}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+class FormulaError(Exception):
+    """公式无法计算"""
+
+
+def cell_key(ref):
+    """单元格引用转换为 cell_data 的键：列字母与表头一致（A 为第 0 列），数字为行号"""
+    match = CELL_REF.fullmatch(ref.upper())
+    if not match:
+        raise FormulaError(ref)
+    return f"{match.group(2)},{ord(match.group(1)) - 65}"
+
+
+def _numeric(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+def _power(base, exponent):
+    if abs(exponent) > MAX_POWER_EXPONENT:
+        raise ValueError("指数过大")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 \
+            and base.bit_length() * exponent > MAX_INTEGER_BITS:
+        raise ValueError("结果过大")
+    return base ** exponent
+
+
+def evaluate_arithmetic(expression):
+    """计算只含数字、+ - * / 和乘方的算术表达式
+
+    按语法树逐个节点求值，不使用 eval；其他语法（名称、属性、调用等）引发 ValueError。
+    """
+    def evaluate(node):
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.BinOp):
+            left, right = evaluate(node.left), evaluate(node.right)
+            if isinstance(node.op, ast.Pow):
+                return _power(left, right)
+            if type(node.op) in _BINARY_OPERATORS:
+                return _BINARY_OPERATORS[type(node.op)](left, right)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            return _UNARY_OPERATORS[type(node.op)](evaluate(node.operand))
+        raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+    return evaluate(ast.parse(expression.strip(), mode='eval'))
+
+
+def evaluate_formula(formula, resolve=None):
+    """计算公式（不含前导 '='）
+
+    resolve(键) 返回被引用单元格的值；没有单元格数据时引用按 0 计算。
+    """
+    resolve = resolve or (lambda key: 0)
+
+    def range_values(start, end):
+        (row1, col1), (row2, col2) = (map(int, cell_key(ref).split(',')) for ref in (start, end))
+        return [_numeric(resolve(f"{row},{col}"))
+                for row in range(min(row1, row2), max(row1, row2) + 1)
+                for col in range(min(col1, col2), max(col1, col2) + 1)]
+
+    def replace_range(match):
+        values = range_values(match.group(2), match.group(3))
+        name = match.group(1).upper()
+        if name == 'SUM':
+            return repr(sum(values))
+        if not values:
+            return '0'
+        if name == 'AVERAGE':
+            return repr(sum(values) / len(values))
+        return repr(max(values) if name == 'MAX' else min(values))
+
+    try:
+        expression = RANGE_FUNCTION.sub(replace_range, formula)
+        expression = CELL_REF.sub(lambda m: repr(_numeric(resolve(cell_key(m.group(0))))), expression)
+        return evaluate_arithmetic(expression)
+    except FormulaError:
+        raise
+    except Exception:
+        return "#ERROR!"
+
+
+def recalc_cells(cell_data):
+    """按依赖顺序重新计算所有公式单元格，循环引用标记为 #CYCLE!，返回计算的单元格数"""
+    state = {}
+
+    def resolve(key):
+        cell = cell_data.get(key)
+        if not cell or not cell.get("formula"):
+            return cell.get("value", "") if cell else ""
+        if state.get(key) == "visiting":
+            raise FormulaError("#CYCLE!")
+        if key not in state:
+            state[key] = "visiting"
+            try:
+                cell["value"] = str(evaluate_formula(cell["formula"], resolve))
+            except FormulaError:
+                # 环上的每个单元格都标记为循环引用
+                cell["value"] = "#CYCLE!"
+                raise
+            finally:
+                state[key] = "done"
+        return cell["value"]
+
+    for key, cell in cell_data.items():
+        if cell.get("formula"):
+            try:
+                resolve(key)
+            except FormulaError:
+                pass
+    return len(state)
+
+
+# ===== 数据库 =====
+
+
+def ensure_schema(conn):
+    """创建主程序使用的表"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT UNIQUE,
+            content TEXT,
+            metadata TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            type TEXT,
+            content TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def open_database(db_path=DEFAULT_DB_FILE):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    ensure_schema(conn)
+    return conn
+
+
+def document_index_row(path):
+    """为文档索引准备一行 (文件名, 正文, 元数据JSON)，可在子进程中执行"""
+    document = load_document(path)
+    metadata = dict(document.get('metadata', {}))
+    metadata.update({
+        'size': os.path.getsize(path),
+        'characters': len(document.get('content', '')),
+        'cells': sum(1 for cell in document.get('spreadsheet_data', {}).values() if cell.get('value')),
+        'slides': len(document.get('presentation_data', [])),
+    })
+    return os.path.abspath(path), document.get('content', ''), json.dumps(metadata, ensure_ascii=False)
+
+
+def index_rows(conn, rows):
+    """批量写入文档索引（单个事务）"""
+    conn.executemany('''
+        INSERT INTO documents (filename, content, metadata) VALUES (?, ?, ?)
+        ON CONFLICT(filename) DO UPDATE SET
+            content = excluded.content,
+            metadata = excluded.metadata,
+            updated_at = CURRENT_TIMESTAMP
+    ''', rows)
+    conn.commit()
@@ -0,0 +1,489 @@
+"""
+OfficeMate 正文导出（HTML / Markdown / PDF / 纯文本）
+
+导出以段落流的形式进行：来源逐段产生 (段落类型, [(文字, 样式), ...])，写入器
+逐段写出，不在内存中拼接整个输出文件，导出很大的文档时内存占用有上限。
+
+段落类型: "p" 正文、"h1"/"h2"/"h3" 标题、"quote" 引用、"code" 代码
+样式: Style(bold, italic, underline, code, color)
+
+来源:
+- paragraphs_from_text    纯文本（命令行、没有格式的文档）
+- paragraphs_from_widget  Tk Text 组件，按行分块 dump，格式来自文本标签
+
+写入器以临时文件写出，完成后原子替换目标文件；中途取消时不留下不完整的文件。
+"""
+import html
+import io
+import os
+import re
+from collections import namedtuple
+from contextlib import ExitStack
+from datetime import datetime
+
+from atomic_file import atomic_open
+
+Style = namedtuple("Style", "bold italic underline code color")
+PLAIN = Style(False, False, False, False, None)
+
+# 快速样式标签 -> 段落类型（标签覆盖段首时）
+BLOCK_TAGS = {"标题1": "h1", "标题2": "h2", "标题3": "h3", "引用": "quote", "代码": "code"}
+WIDGET_CHUNK_LINES = 2000
+
+EXPORT_FORMATS = ("html", "md", "pdf", "txt")
+FORMAT_EXTENSIONS = {".html": "html", ".htm": "html", ".md": "md", ".markdown": "md", ".pdf": "pdf"}
+
+
+class ExportError(Exception):
+    """无法导出（缺少依赖或格式不支持）"""
+
+
+class ExportCancelled(Exception):
+    """导出被取消"""
+
+
+def format_for_path(path):
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "txt")
+
+
+# ===== 来源 =====
+
+
+def paragraphs_from_text(text):
+    """纯文本按行拆成正文段落（逐行读取，不复制整个文本）"""
+    for line in io.StringIO(text):
+        line = line.rstrip("\n")
+        yield "p", [(line, PLAIN)] if line else []
+
+
+def paragraphs_from_file(path):
+    """读取文档正文；纯文本文件逐行读取"""
+    if os.path.splitext(path)[1].lower() in (".txt", ".md", ""):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip("\n")
+                yield "p", [(line, PLAIN)] if line else []
+        return
+    import document_engine
+    yield from paragraphs_from_text(document_engine.load_document(path).get("content", ""))
+
+
+def style_for_tags(tags, tag_colors):
+    """文本标签 -> (段落类型, 样式)
+
+    format_ 标签的名称就是字体描述（format_Arial_12_bold_italic），颜色取自
+    tag_colors；快速样式标签在段首时决定段落类型，在段中时作为行内样式。
+    """
+    bold = italic = underline = code = False
+    color = None
+    block = "p"
+    for tag in tags:
+        if tag.startswith("format_"):
+            parts = tag.split("_")
+            bold = bold or "bold" in parts
+            italic = italic or "italic" in parts
+            underline = underline or "underline" in parts
+        elif tag in BLOCK_TAGS:
+            block = BLOCK_TAGS[tag]
+            bold = bold or block.startswith("h")
+            italic = italic or block == "quote"
+            code = code or block == "code"
+        if tag in tag_colors:
+            color = tag_colors[tag]
+    return block, Style(bold, italic, underline, code, color)
+
+
+def paragraphs_from_widget(text_widget, chunk_lines=WIDGET_CHUNK_LINES):
+    """从 Tk Text 组件逐段产生段落（必须在 Tk 线程中迭代）
+
+    每次 dump chunk_lines 行，块开头已生效的标签用 tag_names 取得。
+    """
+    tag_colors = {}
+    for tag in text_widget.tag_names():
+        foreground = text_widget.tag_cget(tag, "foreground")
+        if foreground and tag not in ("sel", "highlight"):
+            tag_colors[tag] = str(foreground)
+    styles = {}  # frozenset(标签) -> (段落类型, 样式)
+
+    def resolve(active):
+        key = frozenset(active)
+        if key not in styles:
+            styles[key] = style_for_tags(key, tag_colors)
+        return styles[key]
+
+    last_line = int(text_widget.index("end-1c").split(".")[0])
+    line = 1
+    while line <= last_line:
+        end_line = min(line + chunk_lines, last_line + 1)
+        start = f"{line}.0"
+        end = f"{end_line}.0" if end_line <= last_line else "end-1c"
+        active = set(text_widget.tag_names(start)) - {"sel", "highlight"}
+        block, runs = None, []
+        for key, value, _ in text_widget.dump(start, end, text=True, tagon=True, tagoff=True):
+            if key == "tagon":
+                active.add(value)
+            elif key == "tagoff":
+                active.discard(value)
+            elif key == "text":
+                pieces = value.split("\n")
+                for index, piece in enumerate(pieces):
+                    if index:
+                        yield block or "p", runs
+                        block, runs = None, []
+                    if piece:
+                        run_block, style = resolve(active - {"sel", "highlight"})
+                        if block is None:
+                            block = run_block
+                        runs.append((piece, style))
+        # 块边界总在行首；最后一块的末行没有换行符，在这里产生
+        if end == "end-1c":
+            yield block or "p", runs
+        line = end_line
+
+
+# ===== 写入器 =====
+
+
+class ExportWriter:
+    """写入器基类：write_paragraph 逐段写出，close 完成，abort 放弃"""
+
+    binary = False
+
+    def __init__(self, path, title=""):
+        self.path = path
+        self.title = title or os.path.splitext(os.path.basename(path))[0]
+        self.paragraphs = 0
+        self.stack = ExitStack()
+        if self.binary:
+            self.file = self.stack.enter_context(atomic_open(path, 'wb'))
+        else:
+            self.file = self.stack.enter_context(atomic_open(path, 'w', encoding='utf-8'))
+        self.begin()
+
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+    def write_paragraph(self, block, runs):
+        raise NotImplementedError
+
+    def close(self):
+        self.end()
+        self.stack.close()
+
+    def abort(self):
+        """删除临时文件，目标文件保持不变"""
+        try:
+            self.stack.__exit__(ExportCancelled, ExportCancelled(), None)
+        except ExportCancelled:
+            pass
+
+
+class TextWriter(ExportWriter):
+
+    def write_paragraph(self, block, runs):
+        if self.paragraphs:
+            self.file.write("\n")
+        self.file.write("".join(text for text, _ in runs))
+        self.paragraphs += 1
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; color: #333; }}
+        .content {{ background: #f8f9fa; padding: 20px; border-radius: 5px; border: 1px solid #ddd; }}
+        .content p {{ margin: 0; white-space: pre-wrap; min-height: 1.6em; }}
+        .content pre {{ background: #eef1f4; padding: 8px; }}
+        .content blockquote {{ border-left: 4px solid #bdc3c7; margin: 8px 0; padding-left: 12px; color: #555; }}
+        .header {{ text-align: center; margin-bottom: 30px; color: #2c3e50; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>{title}</h1>
+        <p>导出时间: {time}</p>
+    </div>
+    <div class="content">
+"""
+
+HTML_TAIL = """    </div>
+</body>
+</html>
+"""
+
+
+class HtmlWriter(ExportWriter):
+    """连续的代码行合并为一个 <pre>，连续的引用行合并为一个 <blockquote>"""
+
+    def begin(self):
+        self.group = None
+        self.file.write(HTML_HEAD.format(title=html.escape(self.title),
+                                         time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+    def _set_group(self, group):
+        if group == self.group:
+            return
+        if self.group == "code":
+            self.file.write("</pre>\n")
+        elif self.group == "quote":
+            self.file.write("</blockquote>\n")
+        if group == "code":
+            self.file.write("<pre>")
+        elif group == "quote":
+            self.file.write("<blockquote>\n")
+        self.group = group
+
+    @staticmethod
+    def render_runs(runs, in_code=False):
+        parts = []
+        for text, style in runs:
+            text = html.escape(text)
+            if style.code and not in_code:
+                text = f"<code>{text}</code>"
+            if style.underline:
+                text = f"<u>{text}</u>"
+            if style.italic:
+                text = f"<em>{text}</em>"
+            if style.bold:
+                text = f"<strong>{text}</strong>"
+            if style.color:
+                text = f'<span style="color: {html.escape(style.color)}">{text}</span>'
+            parts.append(text)
+        return "".join(parts)
+
+    def write_paragraph(self, block, runs):
+        if block == "code":
+            # <pre> 内各行之间用换行分隔
+            if self.group == "code":
+                self.file.write("\n")
+            self._set_group("code")
+            self.file.write(self.render_runs(runs, in_code=True))
+        else:
+            self._set_group("quote" if block == "quote" else None)
+            tag = block if block in ("h1", "h2", "h3") else "p"
+            self.file.write(f"<{tag}>{self.render_runs(runs)}</{tag}>\n")
+        self.paragraphs += 1
+
+    def end(self):
+        self._set_group(None)
+        self.file.write(HTML_TAIL)
+
+
+MARKDOWN_ESCAPES = str.maketrans({char: "\\" + char for char in "\\`*_[]<>|"})
+MARKDOWN_LINE_START = re.compile(r"\s*(?:[#>+\-]|\d+\.)(?=\s|$)")
+
+
+def escape_markdown(text):
+    return text.translate(MARKDOWN_ESCAPES)
+
+
+class MarkdownWriter(ExportWriter):
+    """连续的代码行合并为一个代码块"""
+
+    def begin(self):
+        self.in_code = False
+        self.file.write(f"# {escape_markdown(self.title)}\n\n")
+
+    @staticmethod
+    def render_runs(runs):
+        parts = []
+        for text, style in runs:
+            if style.code:
+                fence = "``" if "`" in text else "`"
+                parts.append(f"{fence}{text}{fence}")
+                continue
+            stripped = text.strip()
+            if not stripped:
+                parts.append(text)
+                continue
+            # 强调标记不能紧贴空白，把首尾空白留在标记外
+            lead = text[:len(text) - len(text.lstrip())]
+            trail = text[len(text.rstrip()):]
+            body = escape_markdown(stripped)
+            if style.italic:
+                body = f"*{body}*"
+            if style.bold:
+                body = f"**{body}**"
+            if style.underline:
+                body = f"<u>{body}</u>"
+            parts.append(lead + body + trail)
+        line = "".join(parts)
+        # 行首的 #、>、-、+、“1.” 会被当作标题、引用或列表
+        match = MARKDOWN_LINE_START.match(line)
+        if match:
+            # 转义标记的最后一个字符：\#、\-、1\.
+            end = match.end() - 1
+            line = line[:end] + "\\" + line[end:]
+        return line
+
+    def write_paragraph(self, block, runs):
+        if block == "code":
+            if not self.in_code:
+                self.file.write("```\n")
+                self.in_code = True
+            self.file.write("".join(text for text, _ in runs) + "\n")
+            self.paragraphs += 1
+            return
+        if self.in_code:
+            self.file.write("```\n")
+            self.in_code = False
+        line = self.render_runs(runs)
+        if block in ("h1", "h2", "h3"):
+            # 文档标题占用了一级标题，正文标题依次降一级
+            line = "#" * (int(block[1]) + 1) + " " + line
+        elif block == "quote":
+            line = "> " + line
+        # Markdown 中单个换行不分段，每行都作为一个段落
+        self.file.write(line + "\n\n" if line else "\n")
+        self.paragraphs += 1
+
+    def end(self):
+        if self.in_code:
+            self.file.write("```\n")
+
+
+class PdfWriter(ExportWriter):
+    """用 reportlab 按行排版，逐页写出
+
+    使用 reportlab 内置的 STSong-Light 字体（中西文都能显示，不需要字体文件）。
+    该字体没有粗体和斜体，粗体用描边模拟，斜体不区分。reportlab 在 save 之前
+    把已完成的页面压缩后保存在内存中。
+    """
+
+    binary = True
+    PAGE_MARGIN = 56
+    FONT = "STSong-Light"
+    SIZES = {"p": 11, "quote": 11, "code": 10, "h1": 20, "h2": 16, "h3": 13}
+
+    def begin(self):
+        try:
+            from reportlab.lib.colors import HexColor, black
+            from reportlab.lib.pagesizes import A4
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+            from reportlab.pdfgen import canvas as pdf_canvas
+        except ImportError:
+            self.abort()
+            raise ExportError("导出 PDF 需要安装 reportlab")
+        if self.FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(UnicodeCIDFont(self.FONT))
+        self.string_width = pdfmetrics.stringWidth
+        self.hex_color, self.black = HexColor, black
+        self.page_width, self.page_height = A4
+        self.canvas = pdf_canvas.Canvas(self.file, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle(self.title)
+        self.y = self.page_height - self.PAGE_MARGIN
+
+    def _color(self, color):
+        try:
+            return self.hex_color(color) if color else self.black
+        except ValueError:
+            return self.black
+
+    def _new_page_if_needed(self, height):
+        if self.y - height < self.PAGE_MARGIN:
+            self.canvas.showPage()
+            self.y = self.page_height - self.PAGE_MARGIN
+
+    def _atoms(self, runs):
+        """拆成可换行的最小单位：西文单词、空白、单个中日韩字符"""
+        for text, style in runs:
+            for atom in re.findall(r"[A-Za-z0-9_\-.,;:!?'\"()]+|\s+|.", text):
+                yield atom, style
+
+    def write_paragraph(self, block, runs):
+        size = self.SIZES.get(block, 11)
+        leading = size * 1.5
+        left = self.PAGE_MARGIN + (18 if block in ("quote", "code") else 0)
+        width = self.page_width - self.PAGE_MARGIN - left
+        pieces = [(text, style, self.string_width(text, self.FONT, size)) for text, style in runs]
+        if sum(piece[2] for piece in pieces) <= width:
+            # 大多数段落一行放得下，不必逐词测量
+            self._draw_lines([pieces], block, size, leading, left)
+            return
+        lines, line, line_width = [], [], 0
+        for atom, style in self._atoms(runs):
+            atom_width = self.string_width(atom, self.FONT, size)
+            if line and line_width + atom_width > width and not atom.isspace():
+                lines.append(line)
+                line, line_width = [], 0
+            if not line and atom.isspace():
+                continue
+            line.append((atom, style, atom_width))
+            line_width += atom_width
+        lines.append(line)
+        self._draw_lines(lines, block, size, leading, left)
+
+    def _draw_lines(self, lines, block, size, leading, left):
+        for line in lines:
+            self._new_page_if_needed(leading)
+            self.y -= leading
+            x = left
+            # 同一行中样式相同的相邻单位合并为一段文字输出
+            segment, segment_style, segment_width = [], None, 0
+            for atom, style, atom_width in line + [(None, None, 0)]:
+                if segment and style != segment_style:
+                    self._draw_segment("".join(segment), segment_style, x, size, segment_width)
+                    x += segment_width
+                    segment, segment_width = [], 0
+                if atom is not None:
+                    segment.append(atom)
+                    segment_style = style
+                    segment_width += atom_width
+        if block in ("h1", "h2", "h3"):
+            self.y -= size * 0.5
+        self.paragraphs += 1
+
+    def _draw_segment(self, text, style, x, size, width):
+        canvas = self.canvas
+        color = self._color(style.color)
+        canvas.setFillColor(color)
+        text_object = canvas.beginText(x, self.y)
+        text_object.setFont(self.FONT, size)
+        if style.bold:
+            text_object.setTextRenderMode(2)  # 填充并描边
+            canvas.setStrokeColor(color)
+            canvas.setLineWidth(size / 30)
+        text_object.textOut(text)
+        canvas.drawText(text_object)
+        if style.underline:
+            canvas.setStrokeColor(color)
+            canvas.setLineWidth(0.5)
+            canvas.line(x, self.y - 2, x + width, self.y - 2)
+
+    def end(self):
+        self.canvas.save()
+
+
+WRITERS = {"html": HtmlWriter, "md": MarkdownWriter, "pdf": PdfWriter, "txt": TextWriter}
+
+
+def open_writer(path, fmt=None, title=""):
+    fmt = fmt or format_for_path(path)
+    if fmt not in WRITERS:
+        raise ExportError(f"不支持的导出格式: {fmt}")
+    return WRITERS[fmt](path, title)
+
+
+def export_paragraphs(paragraphs, path, fmt=None, title=""):
+    """把段落流写入 path，返回段落数"""
+    writer = open_writer(path, fmt, title)
+    try:
+        for block, runs in paragraphs:
+            writer.write_paragraph(block, runs)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.paragraphs
+
+
+def export_file(path, out_path, fmt=None):
+    """导出文档文件的正文（命令行批量转换使用）"""
+    return export_paragraphs(paragraphs_from_file(path), out_path, fmt, os.path.basename(path))
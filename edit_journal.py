@@ -0,0 +1,274 @@
+"""
+OfficeMate 编辑日志（预写日志）
+
+输入时把文字处理区的变化以很小的操作记录追加到日志文件，程序崩溃后重放日志即可
+恢复未保存的编辑。
+
+日志文件结构:
+    b"OMJ1" | 记录 | 记录 | ...
+    记录 = 类型 (1 字节) | 长度 (4 字节) | CRC32 (4 字节) | 数据
+
+- META      文档信息 JSON {path, saved, time}
+- SNAPSHOT  检查点时的完整正文（zlib 压缩）
+- OPS       一次编辑的操作列表（collab_protocol.encode_ops 编码）
+
+写入在后台线程中进行，同一时间窗口内的记录合并为一次 fsync（组提交），输入时
+Tk 线程只做文本比较和入队。保存文档或操作记录过多时写入检查点：新日志只包含
+META 和 SNAPSHOT，写入临时文件后原子替换旧日志。重放在分块的 TextBuffer 上进行，
+每条操作只复制所在的块，耗时与记录数成正比而与文档大小无关；自动检查点按记录数
+和记录的总字节数触发。
+崩溃时最后一条记录可能只写了一半，读取时遇到长度或校验和不符的记录即停止。
+"""
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from atomic_file import atomic_open
+from collab_protocol import ProtocolError, TextBuffer, decode_ops, diff_text, encode_ops
+
+MAGIC = b"OMJ1"
+JOURNAL_DIR = "journals"
+JOURNAL_EXTENSION = ".omj"
+SYNC_INTERVAL = 1.0  # 秒，两次 fsync 的最小间隔
+COMPACT_RECORDS = 2000  # 超过后自动写检查点，限制重放的记录数
+COMPACT_BYTES = 8 * 1024 * 1024  # 检查点之后的操作记录超过该字节数时也写检查点
+
+RECORD_META = 0
+RECORD_SNAPSHOT = 1
+RECORD_OPS = 2
+
+_RECORD_HEADER = struct.Struct(">BII")
+
+_STOP = object()
+
+
+def encode_record(kind, payload):
+    return _RECORD_HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def _encode_meta(document_path, saved):
+    meta = {"path": document_path, "saved": saved, "time": time.time()}
+    return encode_record(RECORD_META, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+
+def _encode_snapshot(text):
+    return encode_record(RECORD_SNAPSHOT, zlib.compress(text.encode('utf-8'), 1))
+
+
+def iter_records(data):
+    """依次返回 (类型, 数据)，遇到不完整或损坏的记录即停止"""
+    pos = len(MAGIC)
+    while pos + _RECORD_HEADER.size <= len(data):
+        kind, length, crc = _RECORD_HEADER.unpack_from(data, pos)
+        start = pos + _RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            return
+        yield kind, payload
+        pos = start + length
+
+
+class JournalState:
+    """从日志恢复出的文档状态"""
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.document_path = None
+        self.saved = True
+        self.time = None
+        self.text = None
+        self.ops = 0
+
+    @property
+    def has_unsaved_edits(self):
+        return self.text is not None and (self.ops > 0 or not self.saved)
+
+
+def read_journal(journal_path):
+    """重放日志，返回 JournalState；文件不是编辑日志时返回 None"""
+    with open(journal_path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        return None
+    state = JournalState(journal_path)
+    buffer = None
+    for kind, payload in iter_records(data):
+        try:
+            if kind == RECORD_META:
+                meta = json.loads(payload)
+                state.document_path = meta.get("path")
+                state.saved = meta.get("saved", True)
+                state.time = meta.get("time")
+            elif kind == RECORD_SNAPSHOT:
+                buffer = TextBuffer(zlib.decompress(payload).decode('utf-8'))
+                state.ops = 0
+            elif kind == RECORD_OPS and buffer is not None:
+                buffer.apply(decode_ops(payload)[0])
+                state.ops += 1
+        except (ValueError, zlib.error, ProtocolError):
+            break
+    if buffer is not None:
+        state.text = buffer.text()
+    return state
+
+
+def find_journals(directory=JOURNAL_DIR, exclude=None):
+    """目录中的日志，最近修改的在前"""
+    paths = [path for path in glob.glob(os.path.join(directory, "*" + JOURNAL_EXTENSION))
+             if path != exclude]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def owner_running(journal_path):
+    """日志所属的进程是否仍在运行（文件名中记录了进程号）
+
+    另一个正在运行的实例的日志不能当作崩溃遗留来恢复或删除。Windows 上无法
+    简单地探测进程，按已退出处理。
+    """
+    try:
+        pid = int(os.path.basename(journal_path).split("_")[1])
+    except (IndexError, ValueError):
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_journal(journal_path):
+    try:
+        os.remove(journal_path)
+    except OSError:
+        pass
+
+
+class EditJournal:
+    """单个文档的编辑日志
+
+    record/checkpoint 在 Tk 线程中调用，只比较文本并把编码好的记录放入队列；
+    文件写入和 fsync 由后台线程完成。
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, sync_interval=SYNC_INTERVAL, compact_records=COMPACT_RECORDS,
+                 compact_bytes=COMPACT_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"journal_{os.getpid()}_{int(time.time() * 1000)}{JOURNAL_EXTENSION}")
+        self.sync_interval = sync_interval
+        self.compact_records = compact_records
+        self.compact_bytes = compact_bytes
+        self.document_path = None
+        self.shadow = None
+        self.records = 0
+        self.record_bytes = 0
+        self.errors = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._writer, name="edit-journal", daemon=True)
+        self.thread.start()
+
+    def checkpoint(self, text, document_path=None, saved=True):
+        """以 text 为新的起点压缩日志；saved 表示 text 已写入文档文件"""
+        self.document_path = document_path
+        self.shadow = text
+        self.records = 0
+        self.record_bytes = 0
+        # 快照的压缩在后台线程中进行
+        self.queue.put(("checkpoint", (_encode_meta(document_path, saved), text)))
+
+    def record(self, text):
+        """记录从上次记录到 text 的变化"""
+        if self.shadow is None:
+            self.checkpoint(text, saved=False)
+            return
+        ops = diff_text(self.shadow, text)
+        if not ops:
+            return
+        if self.records >= self.compact_records or self.record_bytes >= self.compact_bytes:
+            self.checkpoint(text, self.document_path, saved=False)
+            return
+        record = encode_record(RECORD_OPS, encode_ops(ops))
+        self.shadow = text
+        self.records += 1
+        self.record_bytes += len(record)
+        self.queue.put(("ops", record))
+
+    def flush(self, timeout=5):
+        """等待已入队的记录全部落盘"""
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self, discard=True):
+        """停止写入线程；discard 时删除日志（正常退出时不需要恢复）"""
+        self.queue.put((_STOP, None))
+        self.thread.join(timeout=5)
+        if discard:
+            remove_journal(self.path)
+
+    # ===== 后台写入 =====
+
+    def _collect(self, last_sync):
+        """取出一批记录：第一条到达后等到距上次 fsync 满 sync_interval 再写"""
+        batch = [self.queue.get()]
+        deadline = last_sync + self.sync_interval
+        while batch[-1][0] in ("ops", "checkpoint"):
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _writer(self):
+        handle = None
+        last_sync = 0.0
+        while True:
+            batch = self._collect(last_sync)
+            # 最后一个检查点之前的记录都已包含在快照中
+            start = 0
+            for index, (kind, _) in enumerate(batch):
+                if kind == "checkpoint":
+                    start = index
+            pending = [data for kind, data in batch[start:] if kind == "ops"]
+            if batch[start][0] == "checkpoint":
+                meta, text = batch[start][1]
+                pending.insert(0, meta + _encode_snapshot(text))
+            if pending:
+                try:
+                    if batch[start][0] == "checkpoint":
+                        if handle:
+                            handle.close()
+                            handle = None
+                        with atomic_open(self.path, 'wb') as f:
+                            f.write(MAGIC + b"".join(pending))
+                    else:
+                        if handle is None:
+                            new_file = not os.path.exists(self.path)
+                            handle = open(self.path, 'ab')
+                            if new_file:
+                                handle.write(MAGIC)
+                        handle.write(b"".join(pending))
+                        handle.flush()
+                        os.fsync(handle.fileno())
+                except OSError as e:
+                    self.errors += 1
+                    print(f"写入编辑日志失败: {e}")
+                last_sync = time.monotonic()
+            for kind, data in batch:
+                if kind == "flush":
+                    data.set()
+            if batch[-1][0] is _STOP:
+                break
+        if handle:
+            handle.close()
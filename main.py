@@ -5,23 +5,16 @@ from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, ec
 from cryptography.hazmat.backends import default_backend
+from cryptography.exceptions import InvalidSignature
 import os
+import re
+import ipaddress
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_enhanced_self_signed_cert(cert_file="certificate.pem", 
-                                     key_file="private.key",
-                                     common_name="localhost",
-                                     days_valid=365,
-                                     key_type="rsa",
-                                     key_size=2048):
-    """
-    增强版自签名证书生成
-    
-    Args:
-        key_type: "rsa" 或 "ec" (椭圆曲线)
-        key_size: RSA密钥长度或EC曲线类型
-    """
-    
-    # 生成私钥
+def _generate_private_key(key_type="rsa", key_size=2048):
+    """生成私钥"""
     if key_type.lower() == "ec":
         # 使用椭圆曲线密码学
         if key_size == 256:
@@ -31,17 +24,18 @@ def generate_enhanced_self_signed_cert(cert_file="certificate.pem",
         else:
             curve = ec.SECP256R1()
         
-        private_key = ec.generate_private_key(curve, default_backend())
-    else:
-        # 使用RSA
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=key_size,
-            backend=default_backend()
-        )
-    
-    # 创建证书主题
-    subject = issuer = x509.Name([
+        return ec.generate_private_key(curve, default_backend())
+    # 使用RSA
+    return rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=key_size,
+        backend=default_backend()
+    )
+
+
+def _build_name(common_name):
+    """创建证书主题"""
+    return x509.Name([
         x509.NameAttribute(NameOID.COUNTRY_NAME, "CN"),
         x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, "Beijing"),
         x509.NameAttribute(NameOID.LOCALITY_NAME, "Beijing"),
@@ -49,20 +43,10 @@ def generate_enhanced_self_signed_cert(cert_file="certificate.pem",
         x509.NameAttribute(NameOID.ORGANIZATIONAL_UNIT_NAME, "IT Department"),
         x509.NameAttribute(NameOID.COMMON_NAME, common_name),
     ])
-    
-    # 修复：使用时区感知的时间
-    current_time = datetime.datetime.now(datetime.timezone.utc)
-    not_valid_after = current_time + datetime.timedelta(days=days_valid)
-    
-    # 构建证书
-    builder = x509.CertificateBuilder()
-    builder = builder.subject_name(subject)
-    builder = builder.issuer_name(issuer)
-    builder = builder.public_key(private_key.public_key())
-    builder = builder.serial_number(x509.random_serial_number())
-    builder = builder.not_valid_before(current_time)
-    builder = builder.not_valid_after(not_valid_after)
-    
+
+
+def _build_san_list(common_name):
+    """证书的主体备用名称"""
     # 修复：正确的IP地址类名
     san_list = [
         x509.DNSName(common_name),
@@ -72,13 +56,30 @@ def generate_enhanced_self_signed_cert(cert_file="certificate.pem",
     
     # 添加IP地址（可选）
     try:
-        san_list.append(x509.IPAddress(x509.IPv4Address("127.0.0.1")))
+        san_list.append(x509.IPAddress(ipaddress.IPv4Address("127.0.0.1")))
     except Exception as e:
         print(f"警告: 无法添加IP地址到SAN扩展: {e}")
+    return san_list
+
+
+def _build_leaf_certificate(common_name, public_key, issuer, signing_key, days_valid):
+    """构建并签名服务器/客户端证书（自签名时 issuer 与主题相同）"""
+    # 修复：使用时区感知的时间
+    current_time = datetime.datetime.now(datetime.timezone.utc)
+    not_valid_after = current_time + datetime.timedelta(days=days_valid)
+    
+    # 构建证书
+    builder = x509.CertificateBuilder()
+    builder = builder.subject_name(_build_name(common_name))
+    builder = builder.issuer_name(issuer)
+    builder = builder.public_key(public_key)
+    builder = builder.serial_number(x509.random_serial_number())
+    builder = builder.not_valid_before(current_time)
+    builder = builder.not_valid_after(not_valid_after)
     
     # 添加扩展
     builder = builder.add_extension(
-        x509.SubjectAlternativeName(san_list),
+        x509.SubjectAlternativeName(_build_san_list(common_name)),
         critical=False,
     )
     
@@ -114,13 +115,15 @@ def generate_enhanced_self_signed_cert(cert_file="certificate.pem",
     )
     
     # 签名证书
-    certificate = builder.sign(
-        private_key=private_key,
+    return builder.sign(
+        private_key=signing_key,
         algorithm=hashes.SHA256(),
         backend=default_backend()
     )
-    
-    # 保存文件
+
+
+def _write_cert_and_key(certificate, private_key, cert_file, key_file):
+    """保存证书和私钥文件"""
     os.makedirs(os.path.dirname(cert_file) if os.path.dirname(cert_file) else '.', exist_ok=True)
     
     with open(cert_file, "wb") as f:
@@ -138,6 +141,104 @@ def generate_enhanced_self_signed_cert(cert_file="certificate.pem",
         os.chmod(key_file, 0o600)
     except:
         pass
+
+
+def _not_valid_after(certificate):
+    """证书到期时间（兼容新旧版本 cryptography）"""
+    try:
+        return certificate.not_valid_after_utc
+    except AttributeError:
+        return certificate.not_valid_after.replace(tzinfo=datetime.timezone.utc)
+
+
+def _public_key_bytes(public_key):
+    return public_key.public_bytes(
+        serialization.Encoding.DER,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def _san_set(san_list):
+    return {str(name.value) for name in san_list}
+
+
+def _key_matches(public_key, key_type, key_size):
+    """公钥类型和长度（EC 为曲线）是否与 _generate_private_key 生成的一致"""
+    if key_type.lower() == "ec":
+        curve = ec.SECP384R1 if key_size == 384 else ec.SECP256R1
+        return isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, curve)
+    return isinstance(public_key, rsa.RSAPublicKey) and public_key.key_size == key_size
+
+
+def is_certificate_reusable(cert_file, key_file, common_name, min_remaining_days=30,
+                            key_type="rsa", key_size=2048):
+    """检查已有证书能否复用
+    
+    条件：证书与私钥都存在且匹配、通用名称一致、SAN 与期望一致、
+    密钥类型和长度与要求一致、剩余有效期不少于 min_remaining_days 天。
+    """
+    if not (os.path.exists(cert_file) and os.path.exists(key_file)):
+        return False
+    try:
+        with open(cert_file, "rb") as f:
+            certificate = x509.load_pem_x509_certificate(f.read(), default_backend())
+        with open(key_file, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), None, default_backend())
+    except (OSError, ValueError):
+        return False
+    
+    remaining = _not_valid_after(certificate) - datetime.datetime.now(datetime.timezone.utc)
+    if remaining < datetime.timedelta(days=min_remaining_days):
+        return False
+    
+    names = certificate.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    if not names or names[0].value != common_name:
+        return False
+    
+    try:
+        san = certificate.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+    except x509.ExtensionNotFound:
+        return False
+    if _san_set(san) != _san_set(_build_san_list(common_name)):
+        return False
+    
+    if not _key_matches(certificate.public_key(), key_type, key_size):
+        return False
+    
+    return _public_key_bytes(certificate.public_key()) == _public_key_bytes(private_key.public_key())
+
+
+def generate_enhanced_self_signed_cert(cert_file="certificate.pem", 
+                                     key_file="private.key",
+                                     common_name="localhost",
+                                     days_valid=365,
+                                     key_type="rsa",
+                                     key_size=2048,
+                                     reuse_existing=False,
+                                     min_remaining_days=30):
+    """
+    增强版自签名证书生成
+    
+    Args:
+        key_type: "rsa" 或 "ec" (椭圆曲线)
+        key_size: RSA密钥长度或EC曲线类型
+        reuse_existing: 已有证书仍然有效（见 is_certificate_reusable）时直接复用
+        min_remaining_days: 复用证书要求的最少剩余有效天数
+    """
+    if reuse_existing and is_certificate_reusable(cert_file, key_file, common_name, min_remaining_days,
+                                                  key_type, key_size) and _is_issued_by(cert_file, cert_file):
+        print(f"♻️ 复用已有证书: {cert_file}")
+        return cert_file, key_file
+    
+    # 生成私钥
+    private_key = _generate_private_key(key_type, key_size)
+    
+    # 构建自签名证书
+    certificate = _build_leaf_certificate(
+        common_name, private_key.public_key(), _build_name(common_name), private_key, days_valid)
+    
+    # 保存文件
+    _write_cert_and_key(certificate, private_key, cert_file, key_file)
     
     print(f"✅ 证书已生成: {cert_file}")
     print(f"✅ 私钥已生成: {key_file}")
@@ -147,14 +248,208 @@ def generate_enhanced_self_signed_cert(cert_file="certificate.pem",
     
     return cert_file, key_file
 
-# 使用示例
+
+def generate_local_ca(ca_cert_file="ca_cert.pem",
+                      ca_key_file="ca_key.pem",
+                      common_name="OfficeMate Local CA",
+                      days_valid=3650,
+                      key_type="ec",
+                      key_size=256,
+                      min_remaining_days=30):
+    """生成（或复用）本地 CA，用于批量签发叶子证书"""
+    if os.path.exists(ca_cert_file) and os.path.exists(ca_key_file):
+        with open(ca_cert_file, "rb") as f:
+            ca_cert = x509.load_pem_x509_certificate(f.read(), default_backend())
+        remaining = _not_valid_after(ca_cert) - datetime.datetime.now(datetime.timezone.utc)
+        if remaining >= datetime.timedelta(days=min_remaining_days):
+            return ca_cert_file, ca_key_file
+    
+    private_key = _generate_private_key(key_type, key_size)
+    name = _build_name(common_name)
+    current_time = datetime.datetime.now(datetime.timezone.utc)
+    
+    builder = x509.CertificateBuilder()
+    builder = builder.subject_name(name)
+    builder = builder.issuer_name(name)
+    builder = builder.public_key(private_key.public_key())
+    builder = builder.serial_number(x509.random_serial_number())
+    builder = builder.not_valid_before(current_time)
+    builder = builder.not_valid_after(current_time + datetime.timedelta(days=days_valid))
+    builder = builder.add_extension(
+        x509.BasicConstraints(ca=True, path_length=0),
+        critical=True
+    )
+    builder = builder.add_extension(
+        x509.KeyUsage(
+            digital_signature=True,
+            key_encipherment=False,
+            key_cert_sign=True,
+            crl_sign=True,
+            content_commitment=False,
+            data_encipherment=False,
+            key_agreement=False,
+            encipher_only=False,
+            decipher_only=False
+        ),
+        critical=True
+    )
+    certificate = builder.sign(
+        private_key=private_key,
+        algorithm=hashes.SHA256(),
+        backend=default_backend()
+    )
+    _write_cert_and_key(certificate, private_key, ca_cert_file, ca_key_file)
+    print(f"✅ 本地CA已生成: {ca_cert_file}")
+    return ca_cert_file, ca_key_file
+
+
+def _cert_paths(common_name, out_dir):
+    """批量模式下每个通用名称对应的证书/私钥路径"""
+    safe_name = re.sub(r'[^A-Za-z0-9.-]', '_', common_name)
+    return (os.path.join(out_dir, f"{safe_name}_cert.pem"),
+            os.path.join(out_dir, f"{safe_name}_key.pem"))
+
+
+def _generate_batch_item(job):
+    """进程池任务：生成一个证书（自签名或由CA签发）"""
+    common_name, cert_file, key_file, days_valid, key_type, key_size, ca_pem = job
+    private_key = _generate_private_key(key_type, key_size)
+    if ca_pem:
+        ca_cert_pem, ca_key_pem = ca_pem
+        ca_cert = x509.load_pem_x509_certificate(ca_cert_pem, default_backend())
+        ca_key = serialization.load_pem_private_key(ca_key_pem, None, default_backend())
+        certificate = _build_leaf_certificate(
+            common_name, private_key.public_key(), ca_cert.subject, ca_key, days_valid)
+    else:
+        certificate = _build_leaf_certificate(
+            common_name, private_key.public_key(), _build_name(common_name), private_key, days_valid)
+    _write_cert_and_key(certificate, private_key, cert_file, key_file)
+    return common_name
+
+
+def generate_certs_batch(common_names,
+                         out_dir="certs",
+                         days_valid=365,
+                         key_type="rsa",
+                         key_size=2048,
+                         min_remaining_days=30,
+                         use_ca=False,
+                         max_workers=None):
+    """
+    批量生成证书
+    
+    仍然有效且 SAN 匹配的证书直接复用，其余在进程池中并行生成密钥。
+    use_ca 为 True 时先生成（或复用）本地CA，由其签发所有叶子证书。
+    
+    Returns:
+        每个通用名称一条记录: {"common_name", "cert_file", "key_file", "status"}，
+        status 为 "reused" 或 "generated"
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    
+    ca_pem = None
+    ca_cert_file = None
+    if use_ca:
+        ca_cert_file, ca_key_file = generate_local_ca(
+            os.path.join(out_dir, "ca_cert.pem"),
+            os.path.join(out_dir, "ca_key.pem"),
+            min_remaining_days=min_remaining_days
+        )
+        with open(ca_cert_file, "rb") as f:
+            ca_cert_pem = f.read()
+        with open(ca_key_file, "rb") as f:
+            ca_key_pem = f.read()
+        ca_pem = (ca_cert_pem, ca_key_pem)
+    
+    results = []
+    jobs = []
+    for common_name in dict.fromkeys(common_names):  # 去重并保持顺序
+        cert_file, key_file = _cert_paths(common_name, out_dir)
+        record = {"common_name": common_name, "cert_file": cert_file, "key_file": key_file}
+        # 不使用CA时证书必须是自签名的，使用CA时必须由当前CA签发
+        if is_certificate_reusable(cert_file, key_file, common_name, min_remaining_days, key_type, key_size) and \
+                _is_issued_by(cert_file, ca_cert_file if use_ca else cert_file):
+            record["status"] = "reused"
+        else:
+            record["status"] = "generated"
+            jobs.append((common_name, cert_file, key_file, days_valid, key_type, key_size, ca_pem))
+        results.append(record)
+    
+    if len(jobs) == 1:
+        _generate_batch_item(jobs[0])
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_generate_batch_item, jobs))
+    
+    return results
+
+
+def _is_issued_by(cert_file, ca_cert_file):
+    """证书是否由指定CA签发（校验签名）
+    
+    本地CA每次重新生成时主题名称都相同，只比较颁发者名称无法发现旧CA签发的证书。
+    """
+    with open(cert_file, "rb") as f:
+        certificate = x509.load_pem_x509_certificate(f.read(), default_backend())
+    with open(ca_cert_file, "rb") as f:
+        ca_cert = x509.load_pem_x509_certificate(f.read(), default_backend())
+    try:
+        certificate.verify_directly_issued_by(ca_cert)
+    except (ValueError, TypeError, InvalidSignature):
+        return False
+    return True
+
+
+def main(argv=None):
+    """命令行入口：不带参数时生成示例证书，带通用名称时进入批量模式"""
+    parser = argparse.ArgumentParser(description="OfficeMate 证书生成工具")
+    parser.add_argument("common_names", nargs="*", help="要生成证书的通用名称（主机名）")
+    parser.add_argument("-f", "--hosts-file", help="从文件读取通用名称，每行一个")
+    parser.add_argument("-o", "--out-dir", default="certs", help="输出目录")
+    parser.add_argument("--days", type=int, default=365, help="有效期（天）")
+    parser.add_argument("--key-type", choices=["rsa", "ec"], default="rsa")
+    parser.add_argument("--key-size", type=int, default=2048, help="RSA密钥长度或EC曲线(256/384)")
+    parser.add_argument("--min-remaining-days", type=int, default=30,
+                        help="复用已有证书要求的最少剩余有效天数")
+    parser.add_argument("--ca", action="store_true", help="由本地CA签发，而非逐个自签名")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="并行进程数")
+    args = parser.parse_args(argv)
+    
+    common_names = list(args.common_names)
+    if args.hosts_file:
+        with open(args.hosts_file, "r", encoding="utf-8") as f:
+            common_names.extend(line.strip() for line in f
+                                if line.strip() and not line.startswith("#"))
+    
+    if not common_names:
+        # 使用示例：生成RSA证书
+        generate_enhanced_self_signed_cert(
+            cert_file="my_cert.pem",
+            key_file="my_key.pem",
+            common_name="mysite.example.com",
+            days_valid=365,
+            key_type="rsa",
+            key_size=2048
+        )
+        return 0
+    
+    results = generate_certs_batch(
+        common_names,
+        out_dir=args.out_dir,
+        days_valid=args.days,
+        key_type=args.key_type,
+        key_size=args.key_size,
+        min_remaining_days=args.min_remaining_days,
+        use_ca=args.ca,
+        max_workers=args.workers
+    )
+    for record in results:
+        mark = "♻️" if record["status"] == "reused" else "✅"
+        print(f"{mark} {record['common_name']}: {record['cert_file']}")
+    generated = sum(1 for r in results if r["status"] == "generated")
+    print(f"共 {len(results)} 个证书，新生成 {generated} 个，复用 {len(results) - generated} 个")
+    return 0
+
+
 if __name__ == "__main__":
-    # 生成RSA证书
-    cert, key = generate_enhanced_self_signed_cert(
-        cert_file="my_cert.pem",
-        key_file="my_key.pem",
-        common_name="mysite.example.com",
-        days_valid=365,
-        key_type="rsa",
-        key_size=2048
-    )
\ No newline at end of file
+    sys.exit(main())
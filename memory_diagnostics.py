@@ -0,0 +1,200 @@
+"""
+OfficeMate 内存诊断
+
+长时间运行的会话定期记录内存快照：
+- tracemalloc（开启跟踪后）按源文件归类到各子系统，比较快照找出增长来源
+- gc 统计：各代计数、对象总数、数量最多的对象类型
+- 探针：主程序登记的结构大小（版本历史条数、文本标签数、协作连接数等）；
+  需要遍历对象的探针与类型统计共用同一次 gc.get_objects()
+
+快照在 Tk 线程中获取，保留最近 max_snapshots 个。
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter, deque
+
+try:
+    import resource  # 仅 Unix
+except ImportError:
+    resource = None
+
+# 源文件 -> 子系统（按顺序匹配文件名前缀或路径片段）
+SUBSYSTEMS = (
+    ("collab", ("collab_",)),
+    ("slides", ("slide_",)),
+    ("document", ("document_engine", "document_container", "document_export", "edit_journal", "rich_text",
+                  "outline_index")),
+    ("spelling", ("spell_checker",)),
+    ("assistant", ("assistant_backend",)),
+    ("settings", ("recent_files", "preferences_store")),
+    ("diagnostics", ("memory_diagnostics", "perf_monitor", "startup_profile", "tracemalloc")),
+    ("app", ("OfficeMate",)),
+    ("tk", ("tkinter",)),
+    ("pillow", ("PIL",)),
+    ("sqlite", ("sqlite3",)),
+)
+
+MEMORY_SNAPSHOT_INTERVAL = 5 * 60 * 1000  # 毫秒
+TOP_TYPES = 15
+TOP_LINES = 10
+
+
+def subsystem_of(filename):
+    """根据源文件路径判断所属子系统"""
+    parts = filename.replace("\\", "/").split("/")
+    for name, prefixes in SUBSYSTEMS:
+        for part in parts:
+            if part.startswith(prefixes):
+                return name
+    return "other"
+
+
+def process_rss():
+    """进程常驻内存峰值（字节），无法获取时返回 None"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class MemorySnapshot:
+    """某一时刻的内存状态"""
+
+    def __init__(self, probes, objects, trace=None):
+        self.time = time.time()
+        self.rss = process_rss()
+        self.gc_counts = gc.get_count()
+        self.object_count = len(objects)
+        self.types = Counter(type(obj).__name__ for obj in objects)
+        self.probes = probes
+        self.trace = trace
+        self.traced = tracemalloc.get_traced_memory() if trace is not None else None
+
+    def subsystem_sizes(self):
+        """各子系统当前分配的字节数（需要开启 tracemalloc）"""
+        sizes = Counter()
+        if self.trace is not None:
+            for stat in self.trace.statistics('filename'):
+                sizes[subsystem_of(stat.traceback[0].filename)] += stat.size
+        return sizes
+
+
+class MemoryMonitor:
+    """定期快照并比较增长"""
+
+    def __init__(self, max_snapshots=60):
+        self.snapshots = deque(maxlen=max_snapshots)
+        self.baseline = None
+        self.probes = {}  # 名称 -> (返回数量的函数, 是否以 gc 对象列表为参数)
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def register_probe(self, name, func, objects=False):
+        """登记探针；objects 为 True 时以快照的 gc 对象列表调用 func，避免再次遍历"""
+        self.probes[name] = (func, objects)
+
+    def start_tracing(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        # 开始跟踪后重新建立基线
+        self.baseline = None
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+        self.baseline = None
+
+    def read_probes(self, objects):
+        values = {}
+        for name, (func, uses_objects) in self.probes.items():
+            try:
+                values[name] = func(objects) if uses_objects else func()
+            except Exception as e:
+                values[name] = f"错误: {e}"
+        return values
+
+    def take_snapshot(self):
+        trace = None
+        if tracemalloc.is_tracing():
+            trace = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+        objects = gc.get_objects()
+        snapshot = MemorySnapshot(self.read_probes(objects), objects, trace)
+        del objects
+        if self.baseline is None or (trace is not None and self.baseline.trace is None):
+            self.baseline = snapshot
+        # 只有基线和最新快照保留 tracemalloc 数据，其余释放以免诊断本身占用内存
+        if self.snapshots and self.snapshots[-1] is not self.baseline:
+            self.snapshots[-1].trace = None
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def growth(self):
+        """从基线到最新快照的变化"""
+        if not self.snapshots:
+            return None
+        latest = self.snapshots[-1]
+        base = self.baseline or latest
+        result = {
+            "minutes": round((latest.time - base.time) / 60, 1),
+            "objects": latest.object_count - base.object_count,
+            "types": (latest.types - base.types).most_common(TOP_TYPES),
+            "probes": {},
+            "subsystems": {},
+            "lines": [],
+        }
+        for name, value in latest.probes.items():
+            old = base.probes.get(name)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)):
+                result["probes"][name] = (old, value)
+        if latest.trace is not None and base.trace is not None:
+            old_sizes = base.subsystem_sizes()
+            for name, size in latest.subsystem_sizes().items():
+                result["subsystems"][name] = (old_sizes.get(name, 0), size)
+            for stat in latest.trace.compare_to(base.trace, 'lineno')[:TOP_LINES]:
+                frame = stat.traceback[0]
+                result["lines"].append((f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                                        stat.size_diff, stat.count_diff))
+        return result
+
+    def report(self):
+        """文本形式的诊断报告"""
+        if not self.snapshots:
+            return "还没有内存快照"
+        latest = self.snapshots[-1]
+        growth = self.growth()
+        lines = [f"快照: {len(self.snapshots)} 个，基线距今 {growth['minutes']} 分钟"]
+        if latest.rss:
+            lines.append(f"进程内存峰值: {latest.rss / 1024 / 1024:.1f} MB")
+        if latest.traced:
+            current, peak = latest.traced
+            lines.append(f"tracemalloc: 当前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB")
+        else:
+            lines.append("tracemalloc 未开启（开启跟踪后可按子系统和代码行统计）")
+        lines.append(f"gc: 对象 {latest.object_count}（{growth['objects']:+d}），各代计数 {latest.gc_counts}")
+
+        lines.append("\n结构大小（基线 -> 当前）:")
+        for name, value in latest.probes.items():
+            old_new = growth["probes"].get(name)
+            lines.append(f"  {name}: {old_new[0]} -> {old_new[1]}" if old_new else f"  {name}: {value}")
+
+        if growth["subsystems"]:
+            lines.append("\n子系统分配（基线 -> 当前）:")
+            for name, (old, new) in sorted(growth["subsystems"].items(), key=lambda item: -item[1][1]):
+                lines.append(f"  {name}: {old / 1024:.0f} KB -> {new / 1024:.0f} KB ({(new - old) / 1024:+.0f} KB)")
+        if growth["lines"]:
+            lines.append("\n增长最多的代码行:")
+            for location, size_diff, count_diff in growth["lines"]:
+                lines.append(f"  {location}: {size_diff / 1024:+.1f} KB, {count_diff:+d} 个块")
+        if growth["types"]:
+            lines.append("\n数量增长最多的对象类型:")
+            for name, diff in growth["types"]:
+                lines.append(f"  {name}: {diff:+d}")
+        return "\n".join(lines)
@@ -0,0 +1,146 @@
+"""
+OfficeMate 命令行工具（无需图形界面）
+
+用法:
+    python officemate_cli.py convert FILES... --to json|omd|txt|html|md|pdf [--out-dir DIR]
+    python officemate_cli.py recalc FILES... [--out-dir DIR]
+    python officemate_cli.py export FILES... --format pdf|png|html [--out-dir DIR]
+    python officemate_cli.py index FILES... [--db officemate.db]
+
+convert 到 html/md/pdf 时导出正文，逐段写出，大文档的内存占用有上限；
+export 导出的 PDF/PNG 是演示文稿。
+多个文件在进程池中并发处理（--workers 指定进程数，默认为 CPU 核心数）。
+每个文件输出一行 JSON 结果，有失败时退出码为 1。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import document_engine as engine
+import document_export
+
+CONVERT_FORMATS = ("json", "omd", "txt", "html", "md", "pdf")
+
+
+def _output_path(path, out_dir, extension):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, f"{name}.{extension}")
+
+
+def convert_file(path, out_dir, fmt):
+    out_path = _output_path(path, out_dir, fmt)
+    if fmt in ("html", "md", "pdf"):
+        return {"output": out_path, "paragraphs": document_export.export_file(path, out_path, fmt)}
+    engine.write_document(out_path, engine.load_document(path))
+    return {"output": out_path}
+
+
+def recalc_file(path, out_dir):
+    document = engine.load_document(path)
+    count = engine.recalc_cells(document.get('spreadsheet_data', {}))
+    # 表格数据只能保存在 .json 或 .omd 中，其他格式改存为 .json
+    extension = "omd" if engine.is_container_path(path) else "json"
+    out_path = _output_path(path, out_dir, extension) if out_dir else path
+    if not out_path.lower().endswith(('.json', '.omd')):
+        out_path = os.path.splitext(out_path)[0] + ".json"
+    engine.write_document(out_path, document)
+    return {"output": out_path, "formulas": count}
+
+
+def export_file(path, out_dir, fmt):
+    if fmt == "html":
+        return convert_file(path, out_dir, "html")
+    from slide_export import export_presentation
+
+    slides = engine.load_document(path).get('presentation_data', [])
+    out_path = _output_path(path, out_dir, "pdf")
+    if fmt == "png":
+        out_path = os.path.splitext(out_path)[0]
+    return {"output": out_path, "slides": export_presentation(slides, out_path, fmt)}
+
+
+def run_job(job):
+    """进程池任务：执行一个文件的命令，返回结果记录"""
+    command, path, options = job
+    started = time.perf_counter()
+    record = {"command": command, "input": path}
+    try:
+        if command == "convert":
+            record.update(convert_file(path, options["out_dir"], options["to"]))
+        elif command == "recalc":
+            record.update(recalc_file(path, options["out_dir"]))
+        elif command == "export":
+            record.update(export_file(path, options["out_dir"], options["format"]))
+        elif command == "index":
+            record["row"] = engine.document_index_row(path)
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_command(command, paths, options, workers=None):
+    """在进程池中处理所有文件；index 命令在主进程中统一写入数据库"""
+    if options.get("out_dir"):
+        os.makedirs(options["out_dir"], exist_ok=True)
+    jobs = [(command, path, options) for path in paths]
+    if len(jobs) == 1 or workers == 1:
+        records = [run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(run_job, jobs, chunksize=max(len(jobs) // 64, 1)))
+
+    if command == "index":
+        rows = [record.pop("row") for record in records if record["status"] == "ok"]
+        conn = engine.open_database(options["db"])
+        try:
+            engine.index_rows(conn, rows)
+        finally:
+            conn.close()
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OfficeMate 命令行工具")
+    parser.add_argument("--workers", type=int, help="进程数，默认为 CPU 核心数")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="转换文档格式")
+    convert.add_argument("files", nargs="+")
+    convert.add_argument("--to", choices=CONVERT_FORMATS, required=True)
+    convert.add_argument("--out-dir", default="converted")
+
+    recalc = commands.add_parser("recalc", help="重新计算电子表格公式")
+    recalc.add_argument("files", nargs="+")
+    recalc.add_argument("--out-dir", help="输出目录，默认覆盖原文件")
+
+    export = commands.add_parser("export", help="导出正文（HTML）或演示文稿（PDF/PNG）")
+    export.add_argument("files", nargs="+")
+    export.add_argument("--format", choices=("pdf", "png", "html"), default="pdf")
+    export.add_argument("--out-dir", default="exports")
+
+    index = commands.add_parser("index", help="把文档写入数据库索引")
+    index.add_argument("files", nargs="+")
+    index.add_argument("--db", default=engine.DEFAULT_DB_FILE)
+
+    args = parser.parse_args(argv)
+    options = {key: value for key, value in vars(args).items() if key not in ("command", "files", "workers")}
+    options.setdefault("out_dir", None)
+
+    started = time.perf_counter()
+    records = run_command(args.command, args.files, options, args.workers)
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False))
+    failed = sum(record["status"] != "ok" for record in records)
+    print(f"{args.command}: {len(records) - failed}/{len(records)} 个文件成功，用时 {time.perf_counter() - started:.2f}s",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
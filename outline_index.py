@@ -0,0 +1,293 @@
+"""
+OfficeMate 文档大纲索引
+
+从正文中识别标题，供侧边栏“文档结构”树使用:
+
+- 使用了“标题1/标题2/标题3”样式（apply_style 的标签）的行
+- 编号行，例如 “1. 概述”、“2.3 实现”、“第一章 总则”、“一、背景”
+
+索引保存按行号排序的标题列表。编辑后只比较新旧正文的公共前缀/后缀，重新识别
+变化的几行，其后的标题整体平移行号，不重新扫描全文。标题的 key 在编辑过程中
+保持不变（修改标题文字时沿用原来的 key），树中对应的条目只更新文字。
+
+OutlineTree 把索引同步到 ttk.Treeview：只创建已展开节点的子节点，未展开的
+节点下放一个占位子节点，展开时再创建。
+"""
+import bisect
+import re
+
+from collab_protocol import OP_DELETE, diff_text
+
+HEADING_TAGS = {"标题1": 1, "标题2": 2, "标题3": 3}
+MAX_HEADING_CHARS = 80  # 超过该长度的编号行视为正文段落
+MAX_TITLE_CHARS = 40  # 树中显示的标题长度
+
+_NUMBERED = re.compile(r"(\d{1,3}(?:\.\d{1,3}){0,3})([.、．]?)(\s*)(\S.*)")
+_CHAPTER = re.compile(r"第[0-9一二三四五六七八九十百零]+([章篇部节])\s*(\S.*)?")
+_CHINESE_NUMBERED = re.compile(r"[一二三四五六七八九十]+、\s*(\S.*)")
+_SENTENCE_END = ("。", "；", "，", ";", ",", "：", ":")
+
+
+def _clip(text):
+    return text if len(text) <= MAX_TITLE_CHARS else text[:MAX_TITLE_CHARS - 1] + "…"
+
+
+def detect_heading(line, tag_level=None):
+    """识别一行是否为标题，返回 (级别, 标题文字) 或 None"""
+    text = line.strip()
+    if not text:
+        return None
+    if tag_level is not None:
+        return tag_level, _clip(text)
+    if len(text) > MAX_HEADING_CHARS or text.endswith(_SENTENCE_END):
+        return None
+    match = _NUMBERED.match(text)
+    if match:
+        number, dot, space, _ = match.groups()
+        # “2023 年” 之类以数字开头的句子不算标题：单个数字后必须有 “.” 或 “、”
+        if dot or ("." in number and space):
+            return min(number.count(".") + 1, 3), _clip(text)
+        return None
+    match = _CHAPTER.match(text)
+    if match:
+        return (2 if match.group(1) == "节" else 1), _clip(text)
+    if _CHINESE_NUMBERED.match(text):
+        return 1, _clip(text)
+    return None
+
+
+class Heading:
+    """一个标题；key 在编辑过程中保持不变，用作树条目的 ID"""
+
+    __slots__ = ("key", "line", "level", "title")
+
+    def __init__(self, key, line, level, title):
+        self.key = key
+        self.line = line
+        self.level = level
+        self.title = title
+
+
+class OutlineIndex:
+    """按行号排序的标题列表，随正文增量更新"""
+
+    def __init__(self):
+        self.text = ""
+        self.headings = []
+        self.by_key = {}
+        self.next_key = 0
+        self._children = None
+
+    def _new_key(self):
+        self.next_key += 1
+        return f"h{self.next_key}"
+
+    def _scan(self, first_line, lines, tagged, previous=()):
+        """识别从 first_line 开始的各行
+
+        previous 为这些行原有的标题：同一行、同一级别的标题沿用原来的 key（修改了
+        标题文字），否则按级别和文字匹配（标题前插入或删除了行）。
+        """
+        by_line = {heading.line: heading for heading in previous}
+        by_title = {(heading.level, heading.title): heading for heading in previous}
+        used = set()
+        found = []
+        for offset, line in enumerate(lines):
+            number = first_line + offset
+            heading = detect_heading(line, tagged.get(number))
+            if heading is None:
+                continue
+            level, title = heading
+            old = by_line.get(number)
+            if old is None or old.level != level or old.key in used:
+                old = by_title.get((level, title))
+            if old is not None and old.key not in used:
+                used.add(old.key)
+                old.line, old.title = number, title
+                found.append(old)
+            else:
+                found.append(Heading(self._new_key(), number, level, title))
+        return found
+
+    def rebuild(self, text, tagged=None):
+        """扫描全文；tagged 为 {行号: 级别}（使用了标题样式的行）"""
+        self.text = text
+        self.headings = self._scan(1, text.split("\n"), tagged or {})
+        self.by_key = {heading.key: heading for heading in self.headings}
+        self._children = None
+
+    def update(self, text, tagged_lines=None):
+        """正文变为 text 后更新索引，返回变化的行范围 (首行, 末行) 或 None
+
+        tagged_lines(首行, 末行) 返回该范围内使用了标题样式的行 {行号: 级别}。
+        """
+        old = self.text
+        ops = diff_text(old, text)
+        if not ops:
+            return None
+        start = ops[0][1]
+        old_end = start + (ops[0][2] if ops[0][0] == OP_DELETE else 0)
+        new_end = start + (len(ops[-1][2]) if ops[-1][0] != OP_DELETE else 0)
+        first_line = old.count("\n", 0, start) + 1
+        old_last = first_line + old.count("\n", start, old_end)
+        new_last = first_line + text.count("\n", start, new_end)
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", new_end)
+        lines = text[line_start:line_end if line_end >= 0 else len(text)].split("\n")
+        self.text = text
+        tagged = tagged_lines(first_line, new_last) if tagged_lines else {}
+        self._replace(first_line, old_last, new_last - old_last, lines, tagged)
+        return first_line, new_last
+
+    def refresh_lines(self, first_line, lines, tagged):
+        """正文未变、只有样式变化时重新识别从 first_line 开始的 lines"""
+        last_line = first_line + len(lines) - 1
+        self._replace(first_line, last_line, 0, lines, tagged)
+
+    def _replace(self, first_line, old_last, delta, lines, tagged):
+        line_numbers = [heading.line for heading in self.headings]
+        low = bisect.bisect_left(line_numbers, first_line)
+        high = bisect.bisect_right(line_numbers, old_last)
+        found = self._scan(first_line, lines, tagged, self.headings[low:high])
+        kept = {heading.key for heading in found}
+        for heading in self.headings[low:high]:
+            if heading.key not in kept:
+                del self.by_key[heading.key]
+        for heading in found:
+            self.by_key[heading.key] = heading
+        tail = self.headings[high:]
+        if delta:
+            for heading in tail:
+                heading.line += delta
+        self.headings[low:] = found + tail
+        self._children = None
+
+    # ===== 查询 =====
+
+    def children(self, key=None):
+        """key 的子标题列表（key 为 None 时为顶层标题）"""
+        if self._children is None:
+            children = {None: []}
+            stack = []
+            for heading in self.headings:
+                while stack and stack[-1].level >= heading.level:
+                    stack.pop()
+                children.setdefault(stack[-1].key if stack else None, []).append(heading)
+                stack.append(heading)
+            self._children = children
+        return self._children.get(key, [])
+
+    def has_children(self, key):
+        return bool(self.children(key))
+
+    def line_of(self, key):
+        heading = self.by_key.get(key)
+        return heading.line if heading else None
+
+    def heading_at(self, line):
+        """line 所在章节的标题（line 之前最后一个标题）"""
+        index = bisect.bisect_right([heading.line for heading in self.headings], line)
+        return self.headings[index - 1] if index else None
+
+
+def heading_tag_lines(text_widget, first_line, last_line):
+    """Text 控件中 first_line..last_line 内使用了标题样式的行 {行号: 级别}"""
+    lines = {}
+    end = f"{last_line}.end"
+    for tag, level in HEADING_TAGS.items():
+        index = f"{first_line}.0"
+        while True:
+            found = text_widget.tag_nextrange(tag, index, end)
+            if not found:
+                break
+            start, stop = str(found[0]), str(found[1])
+            start_line = int(start.split(".")[0])
+            stop_line, stop_col = (int(part) for part in stop.split("."))
+            if stop_col == 0 and stop_line > start_line:
+                stop_line -= 1  # 标签结束于下一行行首时不包含下一行
+            for line in range(max(start_line, first_line), min(stop_line, last_line) + 1):
+                if level < lines.get(line, len(HEADING_TAGS) + 1):
+                    lines[line] = level
+            index = stop
+    return lines
+
+
+class OutlineTree:
+    """把 OutlineIndex 同步到 ttk.Treeview（条目 ID 为标题 key）"""
+
+    PLACEHOLDER = "::more"
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+        self.populated = {""}  # 已创建子节点的条目，"" 为根
+        self.texts = {}
+        tree.bind("<<TreeviewOpen>>", self.on_open)
+
+    def _placeholder(self, key):
+        return key + self.PLACEHOLDER
+
+    def _sync_children(self, parent):
+        wanted = [heading.key for heading in self.index.children(parent or None)]
+        current = self.tree.get_children(parent)
+        for position, key in enumerate(wanted):
+            heading = self.index.by_key[key]
+            if key not in self.texts:
+                self.tree.insert(parent, position, iid=key, text=heading.title)
+                self.texts[key] = heading.title
+            else:
+                if position >= len(current) or current[position] != key:
+                    self.tree.move(key, parent, position)
+                if self.texts[key] != heading.title:
+                    self.tree.item(key, text=heading.title)
+                    self.texts[key] = heading.title
+            if key not in self.populated:
+                placeholder = self._placeholder(key)
+                has_placeholder = self.tree.exists(placeholder)
+                if self.index.has_children(key) and not has_placeholder:
+                    self.tree.insert(key, "end", iid=placeholder, text="…")
+                elif not self.index.has_children(key) and has_placeholder:
+                    self.tree.delete(placeholder)
+        wanted_set = set(wanted)
+        for key in self.tree.get_children(parent):
+            if key not in wanted_set:
+                self._forget(key)
+                self.tree.delete(key)
+
+    def _forget(self, key):
+        """删除条目前清理它和已创建的子孙条目的记录"""
+        if key in self.populated:
+            for child in self.tree.get_children(key):
+                self._forget(child)
+        self.populated.discard(key)
+        self.texts.pop(key, None)
+
+    def refresh(self):
+        """按索引更新已创建的条目：先处理父节点，再处理其子节点"""
+        for key in list(self.texts):
+            if key not in self.index.by_key and self.tree.exists(key):
+                self._forget(key)
+                self.tree.delete(key)
+        pending = [""]
+        while pending:
+            parent = pending.pop()
+            if parent and (parent not in self.index.by_key or parent not in self.populated):
+                continue
+            self._sync_children(parent)
+            pending.extend(key for key in self.tree.get_children(parent) if key in self.populated)
+
+    def reset(self):
+        self.tree.delete(*self.tree.get_children(""))
+        self.populated = {""}
+        self.texts = {}
+        self.refresh()
+
+    def on_open(self, event=None):
+        key = self.tree.focus()
+        if not key or key in self.populated or key not in self.index.by_key:
+            return
+        placeholder = self._placeholder(key)
+        if self.tree.exists(placeholder):
+            self.tree.delete(placeholder)
+        self.populated.add(key)
+        self._sync_children(key)
@@ -0,0 +1,184 @@
+"""
+OfficeMate 性能监视
+
+- 按处理函数记录耗时直方图（对数分桶，估算 p50/p95/p99）
+- 统计 Tk 主循环卡顿：定时器实际触发时间比预期晚超过阈值即记一次
+- 未开启时装饰器只多一次属性判断，几乎没有开销
+
+命令行加 --perf（或设置环境变量 OFFICEMATE_PERF=1）时从启动开始记录，
+也可以在“工具 > 性能监视”窗口中随时开启。
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# 直方图桶上界（毫秒），最后一个桶收集所有更慢的调用
+BUCKET_BOUNDS_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+# 卡顿检测：每隔 STALL_INTERVAL_MS 检查一次，延迟超过 STALL_THRESHOLD_MS 记为卡顿
+STALL_INTERVAL_MS = 50
+STALL_THRESHOLD_MS = 100
+
+
+class LatencyHistogram:
+    """单个处理函数的耗时分布"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, fraction):
+        """按桶估算百分位（返回所在桶的上界，最慢的桶返回最大值）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                if index < len(BUCKET_BOUNDS_MS):
+                    return round(min(BUCKET_BOUNDS_MS[index], self.max_ms), 3)
+                break
+        return round(self.max_ms, 3)
+
+    def to_dict(self):
+        buckets = {f"<={bound}": count for bound, count in zip(BUCKET_BOUNDS_MS, self.buckets)}
+        buckets[f">{BUCKET_BOUNDS_MS[-1]}"] = self.buckets[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class PerfMonitor:
+    """收集各处理函数的耗时和主循环卡顿"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.stalls = 0
+        self.worst_stall_ms = 0.0
+        self._stall_root = None
+        self._stall_after = None
+        self._stall_expected = None
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.add(seconds * 1000)
+
+    def timed(self, name=None):
+        """装饰器：记录函数每次调用的耗时"""
+        def decorator(func):
+            label = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(label, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def measure(self, name):
+        """上下文管理器：记录一段代码的耗时"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # ----- 主循环卡顿 -----
+
+    def watch_mainloop(self, root):
+        """开始检测 Tk 主循环卡顿（需要在 Tk 线程中调用）"""
+        self._stall_root = root
+        if self.enabled and self._stall_after is None:
+            self._schedule_stall_check()
+
+    def _schedule_stall_check(self):
+        self._stall_expected = time.perf_counter() + STALL_INTERVAL_MS / 1000
+        self._stall_after = self._stall_root.after(STALL_INTERVAL_MS, self._check_stall)
+
+    def _check_stall(self):
+        self._stall_after = None
+        if not self.enabled:
+            return
+        lag_ms = (time.perf_counter() - self._stall_expected) * 1000
+        if lag_ms > STALL_THRESHOLD_MS:
+            self.stalls += 1
+            self.worst_stall_ms = max(self.worst_stall_ms, lag_ms)
+            self.record("tk.stall", lag_ms / 1000)
+        self._schedule_stall_check()
+
+    # ----- 开关与导出 -----
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled and self._stall_root is not None and self._stall_after is None:
+            self._schedule_stall_check()
+        elif not enabled and self._stall_after is not None:
+            self._stall_root.after_cancel(self._stall_after)
+            self._stall_after = None
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.stalls = 0
+            self.worst_stall_ms = 0.0
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """当前统计的字典形式，按总耗时从高到低排列"""
+        with self.lock:
+            items = sorted(self.histograms.items(), key=lambda item: item[1].total_ms, reverse=True)
+            handlers = {name: histogram.to_dict() for name, histogram in items}
+        return {
+            "enabled": self.enabled,
+            "since": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            "duration_s": round(time.time() - self.started_at, 1),
+            "stall_threshold_ms": STALL_THRESHOLD_MS,
+            "stalls": self.stalls,
+            "worst_stall_ms": round(self.worst_stall_ms, 1),
+            "handlers": handlers,
+        }
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+monitor = PerfMonitor(enabled="--perf" in sys.argv[1:] or bool(os.environ.get("OFFICEMATE_PERF")))
+timed = monitor.timed
+measure = monitor.measure
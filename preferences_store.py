@@ -0,0 +1,204 @@
+"""
+OfficeMate 偏好设置存储
+
+设置保存在内存中，修改时只标记为脏；后台线程把修改合并后写盘，两次写入至少
+间隔 SAVE_INTERVAL 秒，连续打开多个文件只会写一次。写入使用临时文件加原子替换。
+
+文件带有 schema_version，旧版本的文件读取时依次经过 MIGRATIONS 升级。
+文件损坏时不会静默丢弃：原文件改名备份，本次使用默认设置，并通过 load_error
+告知调用方。比当前程序更新的版本写入的文件只读取、不覆盖。
+
+修改请通过 store[key] = value 赋值（列表等可变值先复制再赋值），后台线程序列化
+时持有同一把锁，不会读到修改了一半的数据。
+"""
+import copy
+import json
+import os
+import threading
+import time
+
+from atomic_file import atomic_write
+from recent_files import MAX_RECENT
+
+PREFERENCES_FILE = "preferences.json"
+SCHEMA_VERSION = 2
+SAVE_INTERVAL = 5.0  # 秒
+
+DEFAULTS = {
+    'theme': 'dark',
+    'auto_save': True,
+    'recent_files': [],
+    'default_font': 'Arial',
+    'default_font_size': 12,
+    'window_size': [1400, 900],
+    'collab_tls': True,
+    'assistant_backend': 'local',  # 写作助手后端: local 或 http
+    'assistant_url': '',  # http 后端的地址，例如 http://127.0.0.1:8765/v1/batch
+}
+
+
+def _migrate_v1(data):
+    """第 1 版（没有 schema_version）：整理最近文件列表和窗口大小"""
+    recent = []
+    for path in data.get('recent_files') or []:
+        if isinstance(path, str) and path not in recent:
+            recent.append(path)
+    data['recent_files'] = recent[:MAX_RECENT]
+    size = data.get('window_size')
+    if not (isinstance(size, (list, tuple)) and len(size) == 2 and all(isinstance(v, int) for v in size)):
+        data['window_size'] = list(DEFAULTS['window_size'])
+    return data
+
+
+# 版本号 -> 把该版本升级到下一版本的函数
+MIGRATIONS = {
+    1: _migrate_v1,
+}
+
+
+def migrate(data):
+    """把读取到的设置升级到 SCHEMA_VERSION，返回 (设置, 原版本号)
+
+    schema_version 不是正整数时抛出 ValueError，调用方按文件损坏处理。
+    """
+    original = version = data.get('schema_version', 1)
+    if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+        raise ValueError(f"无效的 schema_version: {version!r}")
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data)
+        version += 1
+    data['schema_version'] = version
+    return data, original
+
+
+class PreferencesStore:
+    """内存中的偏好设置，后台合并写盘"""
+
+    def __init__(self, path=PREFERENCES_FILE, save_interval=SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.write_lock = threading.Lock()  # 后台写入和 flush 不同时写文件
+        self.data = dict(copy.deepcopy(DEFAULTS), schema_version=SCHEMA_VERSION)
+        self.revision = 0  # 每次修改加一
+        self.saved_revision = 0
+        self.last_write = 0.0
+        self.load_error = None
+        self.read_only = False
+        self.closed = False
+        self.load()
+        self.thread = threading.Thread(target=self._writer, name="preferences", daemon=True)
+        self.thread.start()
+
+    # ===== 读取 =====
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("偏好设置不是 JSON 对象")
+            data, version = migrate(data)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.load_error = f"{e}"
+            backup = f"{self.path}.corrupt-{time.strftime('%Y%m%d_%H%M%S')}"
+            try:
+                os.replace(self.path, backup)
+                self.load_error += f"\n原文件已备份为 {backup}"
+            except OSError:
+                # 无法备份时不覆盖原文件
+                self.read_only = True
+            return
+        if version > SCHEMA_VERSION:
+            # 新版本程序写入的设置，保留原文件
+            self.read_only = True
+        self.data.update(data)
+        if version < SCHEMA_VERSION:
+            self.revision += 1  # 升级后的设置需要写回
+
+    # ===== 读写接口 =====
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            if key in self.data and self.data[key] == value:
+                return
+            self.data[key] = value
+            self.revision += 1
+            self.changed.notify()
+
+    def update(self, values):
+        with self.lock:
+            self.data.update(values)
+            self.revision += 1
+            self.changed.notify()
+
+    @property
+    def dirty(self):
+        return self.revision != self.saved_revision
+
+    # ===== 写盘 =====
+
+    def _serialize(self):
+        """持有锁时调用"""
+        return self.revision, json.dumps(self.data, ensure_ascii=False)
+
+    def _write(self, revision, text):
+        with self.write_lock:
+            if revision <= self.saved_revision:
+                return
+            saved = True
+            try:
+                if not self.read_only:
+                    atomic_write(self.path, text)
+            except OSError as e:
+                print(f"保存偏好设置失败: {e}")
+                saved = False
+            with self.lock:
+                # 写入失败时保持为脏，间隔 save_interval 后重试
+                if saved:
+                    self.saved_revision = revision
+                self.last_write = time.monotonic()
+
+    def _writer(self):
+        while True:
+            with self.lock:
+                while not self.closed and not self.dirty:
+                    self.changed.wait()
+                if self.closed:
+                    return
+                # 距上次写入不足 save_interval 时先等待，期间的修改一并写入
+                delay = self.last_write + self.save_interval - time.monotonic()
+                if delay > 0:
+                    self.changed.wait(delay)
+                    if self.closed:
+                        return
+                    continue
+                revision, text = self._serialize()
+            self._write(revision, text)
+
+    def flush(self):
+        """立即写入未保存的修改（退出程序时调用）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            revision, text = self._serialize()
+        self._write(revision, text)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.changed.notify()
+        self.thread.join(timeout=2)
+        self.flush()
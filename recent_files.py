@@ -0,0 +1,187 @@
+"""
+OfficeMate 最近文件服务
+
+最近文件的元数据（大小、修改时间、内容预览、文件类型）缓存在 SQLite 中。
+菜单先用缓存立即生成，不访问文件系统；文件是否存在以及元数据是否变化在后台
+线程中检查（网络共享上的 stat 可能很慢），检查完成后再更新菜单。
+只有大小或修改时间变化时才重新读取文件生成预览。
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from document_container import ContainerError, MAGIC as CONTAINER_MAGIC, read_section
+
+RECENT_DB_FILE = "recent_files.db"
+MAX_RECENT = 10
+PREVIEW_CHARS = 80
+PREVIEW_READ_BYTES = 4096
+JSON_PREVIEW_LIMIT = 1024 * 1024  # 超过该大小的 JSON 文档不解析，只取开头
+
+TYPE_NAMES = {
+    "omd": "OfficeMate 文档",
+    "json": "JSON 文档",
+    "html": "HTML 文件",
+    "text": "文本文档",
+    "binary": "其他文件",
+}
+
+
+class RecentFile:
+    """一条最近文件记录"""
+
+    __slots__ = ("path", "size", "mtime", "preview", "kind", "exists", "checked_at")
+
+    def __init__(self, path, size=None, mtime=None, preview="", kind="", exists=True, checked_at=None):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.preview = preview
+        self.kind = kind
+        self.exists = exists
+        self.checked_at = checked_at
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def type_name(self):
+        return TYPE_NAMES.get(self.kind, "")
+
+    def describe(self):
+        """菜单中显示的附加信息，例如 “12.3 KB, 10-18 14:05”"""
+        parts = []
+        if self.size is not None:
+            parts.append(format_size(self.size))
+        if self.mtime:
+            parts.append(time.strftime('%m-%d %H:%M', time.localtime(self.mtime)))
+        return ", ".join(parts)
+
+
+def format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def detect_type(path, head):
+    """根据扩展名和文件开头判断类型"""
+    lower = path.lower()
+    if head.startswith(CONTAINER_MAGIC) or lower.endswith(".omd"):
+        return "omd"
+    if lower.endswith(".json"):
+        return "json"
+    if lower.endswith((".html", ".htm")):
+        return "html"
+    if b"\0" in head:
+        return "binary"
+    return "text"
+
+
+def _first_line(text):
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            return line[:PREVIEW_CHARS]
+    return ""
+
+
+def read_preview(path, kind, head, size):
+    """正文开头的第一行非空文字"""
+    try:
+        if kind == "omd":
+            return _first_line(read_section(path, "content") or "")
+        if kind == "json" and size <= JSON_PREVIEW_LIMIT:
+            # 延迟导入：文档引擎只在需要解析 JSON 文档时才用到
+            import document_engine
+            return _first_line(str(document_engine.load_document(path).get("content", "")))
+    except (OSError, ValueError, ContainerError):
+        pass
+    if kind == "binary":
+        return ""
+    return _first_line(head.decode('utf-8', errors='replace'))
+
+
+def inspect_file(path, cached=None):
+    """读取文件的元数据；大小和修改时间未变时沿用缓存的预览"""
+    now = time.time()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return RecentFile(path, exists=False, checked_at=now)
+    if cached and cached.exists and cached.size == stat.st_size and cached.mtime == stat.st_mtime:
+        cached.checked_at = now
+        return cached
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(PREVIEW_READ_BYTES)
+    except OSError:
+        head = b""
+    kind = detect_type(path, head)
+    return RecentFile(path, stat.st_size, stat.st_mtime, read_preview(path, kind, head, stat.st_size),
+                      kind, True, now)
+
+
+class RecentFilesService:
+    """最近文件元数据缓存和后台检查"""
+
+    def __init__(self, db_path=RECENT_DB_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS recent_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                preview TEXT,
+                kind TEXT,
+                exists_flag INTEGER,
+                checked_at REAL
+            )
+        ''')
+        self.conn.commit()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recent-files")
+
+    def cached(self, paths):
+        """按 paths 的顺序返回缓存中的记录，不访问文件系统；没有缓存的路径视为存在"""
+        if not paths:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT path, size, mtime, preview, kind, exists_flag, checked_at FROM recent_files "
+                f"WHERE path IN ({','.join('?' * len(paths))})", list(paths)
+            ).fetchall()
+        entries = {row[0]: RecentFile(row[0], row[1], row[2], row[3], row[4], bool(row[5]), row[6]) for row in rows}
+        return [entries.get(path) or RecentFile(path) for path in paths]
+
+    def validate(self, paths):
+        """在后台线程中检查各文件并更新缓存（只保留 paths 中的文件），返回 Future，结果为记录列表"""
+        return self.executor.submit(self._validate, list(paths))
+
+    def _validate(self, paths):
+        cached = {entry.path: entry for entry in self.cached(paths)}
+        entries = [inspect_file(path, cached.get(path)) for path in paths]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO recent_files (path, size, mtime, preview, kind, exists_flag, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(e.path, e.size, e.mtime, e.preview, e.kind, int(e.exists), e.checked_at) for e in entries]
+            )
+            # 已移出列表的文件不再保留缓存
+            if paths:
+                self.conn.execute(f"DELETE FROM recent_files WHERE path NOT IN ({','.join('?' * len(paths))})", paths)
+            else:
+                self.conn.execute("DELETE FROM recent_files")
+            self.conn.commit()
+        return entries
+
+    def close(self):
+        # 不等待可能卡在网络路径上的检查
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            self.conn.close()
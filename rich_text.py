@@ -0,0 +1,149 @@
+"""
+OfficeMate 富文本格式序列化
+
+把文字处理区的格式（文本标签）保存为紧凑的样式表，与正文分开存放:
+
+    {
+        "tags":   [[标签名, {选项: 值}], ...],      # 按 Tk 中的优先级从低到高
+        "styles": [[标签序号, ...], ...],           # 出现过的标签组合
+        "runs":   [长度, 样式序号, 长度, 样式序号, ...]
+    }
+
+runs 是游程编码：正文从头开始依次有“长度”个字符使用该样式，样式序号 -1 表示
+没有格式。保存时用 text.dump 按行分块读取标签切换；读取时先把游程还原为每个
+标签的区间列表，换算成“行.列”索引（不让 Tk 从头数字符），每个标签每批只调用
+一次 tag_add，而不是每个区间调用一次。
+
+只保存格式标签（format_*、color_*、快速样式），选区、查找高亮、协作光标等
+临时标签不保存。
+"""
+import bisect
+import re
+
+STYLE_TAGS = ("标题1", "标题2", "标题3", "正文", "引用", "代码", "color")
+STYLE_TAG_PREFIXES = ("format_", "color_")
+TAG_OPTIONS = ("font", "foreground", "background", "underline", "overstrike")
+DUMP_CHUNK_LINES = 2000
+TAG_ADD_BATCH = 5000  # 每次 tag_add 传入的区间数
+
+
+def is_style_tag(tag):
+    return tag in STYLE_TAGS or tag.startswith(STYLE_TAG_PREFIXES)
+
+
+def _tag_options(text_widget, tag):
+    options = {}
+    for option in TAG_OPTIONS:
+        value = text_widget.tag_cget(tag, option)
+        if value not in ("", None):
+            options[option] = str(value)
+    return options
+
+
+# ===== 保存 =====
+
+
+def dump_formatting(text_widget, chunk_lines=DUMP_CHUNK_LINES):
+    """读取文字处理区的格式，没有任何格式时返回 None"""
+    tags = [tag for tag in text_widget.tag_names() if is_style_tag(tag) and text_widget.tag_ranges(tag)]
+    if not tags:
+        return None
+    tag_index = {tag: index for index, tag in enumerate(tags)}
+    styles = []
+    style_index = {frozenset(): -1}
+    runs = []
+
+    def style_of(active):
+        key = frozenset(active)
+        index = style_index.get(key)
+        if index is None:
+            index = style_index[key] = len(styles)
+            styles.append(sorted(tag_index[tag] for tag in key))
+        return index
+
+    last_line = int(text_widget.index("end-1c").split(".")[0])
+    line = 1
+    while line <= last_line:
+        end_line = min(line + chunk_lines, last_line + 1)
+        start = f"{line}.0"
+        end = f"{end_line}.0" if end_line <= last_line else "end-1c"
+        active = {tag for tag in text_widget.tag_names(start) if tag in tag_index}
+        for key, value, _ in text_widget.dump(start, end, text=True, tagon=True, tagoff=True):
+            if key == "tagon":
+                if value in tag_index:
+                    active.add(value)
+            elif key == "tagoff":
+                active.discard(value)
+            elif key == "text" and value:
+                style = style_of(active)
+                if runs and runs[-1] == style:
+                    runs[-2] += len(value)
+                else:
+                    runs += [len(value), style]
+        line = end_line
+
+    return {
+        "tags": [[tag, _tag_options(text_widget, tag)] for tag in tags],
+        "styles": styles,
+        "runs": runs,
+    }
+
+
+# ===== 读取 =====
+
+
+def tag_ranges_from_runs(formatting):
+    """游程 -> {标签名: [起点, 终点, 起点, 终点, ...]}（字符偏移，相邻区间已合并）"""
+    tags = [name for name, _ in formatting.get("tags", [])]
+    styles = formatting.get("styles", [])
+    runs = formatting.get("runs", [])
+    ranges = {tag: [] for tag in tags}
+    offset = 0
+    for index in range(0, len(runs) - 1, 2):
+        length, style = runs[index], runs[index + 1]
+        if style >= 0:
+            end = offset + length
+            for tag_number in styles[style]:
+                spans = ranges[tags[tag_number]]
+                if spans and spans[-1] == offset:
+                    spans[-1] = end
+                else:
+                    spans += [offset, end]
+        offset += length
+    return ranges
+
+
+class IndexConverter:
+    """字符偏移 -> Tk 的“行.列”索引"""
+
+    def __init__(self, text):
+        self.line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+    def index(self, offset):
+        line = bisect.bisect_right(self.line_starts, offset) - 1
+        return f"{line + 1}.{offset - self.line_starts[line]}"
+
+
+def apply_formatting(text_widget, formatting, text):
+    """把格式应用到已插入 text 的文字处理区（text 从 1.0 开始）"""
+    if not formatting:
+        return 0
+    converter = IndexConverter(text)
+    calls = 0
+    for name, options in formatting.get("tags", []):
+        if not is_style_tag(name):
+            continue
+        options = {key: value for key, value in options.items() if key in TAG_OPTIONS}
+        text_widget.tag_configure(name, **options)
+        # 保持保存时的优先级顺序
+        text_widget.tag_raise(name)
+    # 选区始终显示在格式之上
+    text_widget.tag_raise("sel")
+    for name, spans in tag_ranges_from_runs(formatting).items():
+        if not spans or not is_style_tag(name):
+            continue
+        indices = [converter.index(offset) for offset in spans]
+        for start in range(0, len(indices), TAG_ADD_BATCH * 2):
+            text_widget.tag_add(name, *indices[start:start + TAG_ADD_BATCH * 2])
+            calls += 1
+    return calls
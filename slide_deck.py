@@ -0,0 +1,138 @@
+"""
+OfficeMate 幻灯片文稿模型
+
+- 每张幻灯片有稳定ID，按ID查找为 O(1)
+- 插入、删除、移动、复制都会通知监听者，界面只增量更新变化的行
+- 复制幻灯片时深拷贝内容，副本与源幻灯片互不影响
+"""
+import copy
+import uuid
+
+DEFAULT_LAYOUT = "title_content"
+
+
+def new_slide_id():
+    return uuid.uuid4().hex
+
+
+class SlideDeck:
+    """有序的幻灯片集合
+
+    slides 是按顺序排列的幻灯片字典列表，原地修改，外部可以直接持有引用。
+    监听者收到 (事件, 位置, 参数)：
+    - ("insert", index, count)   在 index 处插入了 count 张
+    - ("delete", index, count)   从 index 起删除了 count 张
+    - ("move", old_index, new_index)
+    - ("update", index, None)    幻灯片内容或标题变化
+    """
+
+    def __init__(self, slides=None):
+        self.slides = []
+        self.by_id = {}
+        self._positions = None
+        self.listeners = []
+        if slides:
+            self.insert(len(self.slides), slides)
+
+    # ----- 查询 -----
+
+    def __len__(self):
+        return len(self.slides)
+
+    def get(self, slide_id):
+        return self.by_id.get(slide_id)
+
+    def index_of(self, slide_id):
+        """幻灯片位置；结构变化后首次查询时重建位置表"""
+        if self._positions is None:
+            self._positions = {slide["id"]: index for index, slide in enumerate(self.slides)}
+        return self._positions[slide_id]
+
+    def to_list(self):
+        return list(self.slides)
+
+    # ----- 修改 -----
+
+    def _notify(self, event, index, arg=None):
+        for listener in self.listeners:
+            listener(event, index, arg)
+
+    def _normalize(self, slide):
+        slide.setdefault("id", new_slide_id())
+        while slide["id"] in self.by_id:
+            slide["id"] = new_slide_id()
+        slide.setdefault("layout", DEFAULT_LAYOUT)
+        slide.setdefault("elements", [])
+        return slide
+
+    def insert(self, index, slides):
+        """在 index 处插入幻灯片列表"""
+        slides = [self._normalize(slide) for slide in slides]
+        if not slides:
+            return
+        self.slides[index:index] = slides
+        for slide in slides:
+            self.by_id[slide["id"]] = slide
+        self._positions = None
+        self._notify("insert", index, len(slides))
+
+    def append(self, slide):
+        self.insert(len(self.slides), [slide])
+        return slide
+
+    def delete_many(self, slide_ids):
+        """批量删除，返回被删除的幻灯片；连续的位置合并为一次通知"""
+        indices = sorted({self.index_of(slide_id) for slide_id in slide_ids if slide_id in self.by_id})
+        if not indices:
+            return []
+        removed = [self.slides[index] for index in indices]
+        doomed = set(indices)
+        self.slides[:] = [slide for index, slide in enumerate(self.slides) if index not in doomed]
+        for slide in removed:
+            del self.by_id[slide["id"]]
+        self._positions = None
+
+        # 从后往前通知，前面的位置不受影响
+        runs = []
+        start = previous = indices[0]
+        for index in indices[1:]:
+            if index != previous + 1:
+                runs.append((start, previous - start + 1))
+                start = index
+            previous = index
+        runs.append((start, previous - start + 1))
+        for start, count in reversed(runs):
+            self._notify("delete", start, count)
+        return removed
+
+    def move(self, old_index, new_index):
+        """把幻灯片从 old_index 移动到 new_index（拖动排序）"""
+        new_index = max(0, min(new_index, len(self.slides) - 1))
+        if old_index == new_index:
+            return
+        slide = self.slides.pop(old_index)
+        self.slides.insert(new_index, slide)
+        if self._positions is not None:
+            low, high = min(old_index, new_index), max(old_index, new_index)
+            for index in range(low, high + 1):
+                self._positions[self.slides[index]["id"]] = index
+        self._notify("move", old_index, new_index)
+
+    def duplicate(self, slide_ids):
+        """复制幻灯片，副本放在最后一张源幻灯片之后"""
+        sources = sorted((self.index_of(slide_id) for slide_id in slide_ids if slide_id in self.by_id))
+        if not sources:
+            return []
+        copies = []
+        for index in sources:
+            clone = copy.deepcopy(self.slides[index])
+            clone["id"] = new_slide_id()
+            copies.append(clone)
+        self.insert(sources[-1] + 1, copies)
+        return copies
+
+    def update(self, slide_id, **changes):
+        """修改幻灯片属性（标题、内容、布局、背景等）"""
+        slide = self.by_id[slide_id]
+        slide.update(changes)
+        self._notify("update", self.index_of(slide_id))
@@ -0,0 +1,155 @@
+"""
+OfficeMate 演示文稿批量导出（无需 Tk）
+
+把演示文稿的每张幻灯片渲染为 PNG，或合成为多页 PDF（reportlab）。
+批量导出时文稿分配到进程池中并行处理，单个大文稿则按幻灯片并行渲染，
+运行时间随 CPU 核心数扩展。
+
+用法: python slide_export.py deck1.json deck2.json --format pdf --out-dir exports
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from slide_image import render_slide_png
+from slide_scene import SLIDE_WIDTH, SLIDE_HEIGHT
+
+EXPORT_FORMATS = ("png", "pdf")
+
+
+def load_presentation(path):
+    """读取演示文稿：OfficeMate JSON 文档的 presentation_data，或幻灯片列表"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('presentation_data', [])
+    if not isinstance(data, list):
+        raise ValueError(f"{path} 不包含演示文稿数据")
+    return data
+
+
+def _render_job(job):
+    """进程池任务：渲染一张幻灯片；PNG 直接写文件，PDF 返回图像字节"""
+    slide, index, count, scale, png_path = job
+    data = render_slide_png(slide, index, count, scale)
+    if png_path:
+        with open(png_path, 'wb') as f:
+            f.write(data)
+        return None
+    return data
+
+
+def write_pdf(pages, out_path):
+    """把渲染好的页面（PNG 字节）按幻灯片尺寸写入多页 PDF"""
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    temp_path = out_path + ".tmp"
+    pdf = pdf_canvas.Canvas(temp_path, pagesize=(SLIDE_WIDTH, SLIDE_HEIGHT))
+    for data in pages:
+        pdf.drawImage(ImageReader(io.BytesIO(data)), 0, 0, SLIDE_WIDTH, SLIDE_HEIGHT)
+        pdf.showPage()
+    pdf.save()
+    os.replace(temp_path, out_path)
+
+
+def _deck_jobs(slides, fmt, out_base, scale):
+    """每张幻灯片一个渲染任务"""
+    count = len(slides)
+    jobs = []
+    for index, slide in enumerate(slides):
+        png_path = f"{out_base}_{index + 1:03d}.png" if fmt == "png" else None
+        jobs.append((slide, index, count, scale, png_path))
+    return jobs
+
+
+def export_presentation(slides, out_path, fmt="pdf", scale=1.0, executor=None):
+    """导出一个演示文稿；out_path 对 PDF 为文件路径，对 PNG 为文件名前缀"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    jobs = _deck_jobs(slides, fmt, out_path, scale)
+    if executor:
+        results = list(executor.map(_render_job, jobs))
+    else:
+        results = [_render_job(job) for job in jobs]
+    if fmt == "pdf":
+        write_pdf(results, out_path)
+    return len(jobs)
+
+
+def _output_path(path, out_dir, fmt):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, f"{name}.pdf" if fmt == "pdf" else name)
+
+
+def _export_deck_job(job):
+    """进程池任务：在一个进程内导出整个文稿（文稿数多于核心数时使用）"""
+    path, out_dir, fmt, scale = job
+    started = time.perf_counter()
+    out_path = _output_path(path, out_dir, fmt)
+    record = {"input": path, "output": out_path}
+    try:
+        record["slides"] = export_presentation(load_presentation(path), out_path, fmt, scale)
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def export_batch(paths, out_dir, fmt="pdf", scale=1.0, max_workers=None):
+    """批量导出多个文稿，返回每个文稿的结果记录
+
+    文稿数不少于进程数时，每个进程导出整个文稿（PDF 合成也并行，页面不跨进程传输）；
+    文稿较少时改为按幻灯片并行渲染，由主进程合成 PDF。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if len(paths) >= workers:
+            jobs = [(path, out_dir, fmt, scale) for path in paths]
+            return list(executor.map(_export_deck_job, jobs))
+
+        records = []
+        for path in paths:
+            started = time.perf_counter()
+            out_path = _output_path(path, out_dir, fmt)
+            record = {"input": path, "output": out_path}
+            try:
+                slides = load_presentation(path)
+                record["slides"] = export_presentation(slides, out_path, fmt, scale, executor)
+                record["status"] = "ok"
+            except Exception as e:
+                record["status"] = "error"
+                record["error"] = str(e)
+            record["seconds"] = round(time.perf_counter() - started, 3)
+            records.append(record)
+        return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OfficeMate 演示文稿批量导出")
+    parser.add_argument("inputs", nargs="+", help="OfficeMate JSON 文档或幻灯片列表 JSON")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="pdf")
+    parser.add_argument("--out-dir", default="exports")
+    parser.add_argument("--scale", type=float, default=1.0, help="相对 800x500 的渲染比例")
+    parser.add_argument("--workers", type=int, help="进程数，默认为 CPU 核心数")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    records = export_batch(args.inputs, args.out_dir, args.format, args.scale, args.workers)
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False))
+    failed = sum(record["status"] != "ok" for record in records)
+    print(f"导出 {len(records) - failed}/{len(records)} 个文稿，用时 {time.perf_counter() - started:.2f}s",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+OfficeMate 幻灯片放映画面缓存
+
+放映时在后台线程预先渲染当前幻灯片前后几张的整屏画面，Tk 线程在空闲时
+把完成的图像转换为 PhotoImage。翻页时只需切换画布图像项引用的 PhotoImage，
+不需要在 Tk 线程中重新绘制。全屏放映和演讲者视图共用同一个缓存。
+"""
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from slide_image import render_slide
+from slide_thumbnails import slide_hash
+
+# 演讲者视图中当前幻灯片和下一张的缩放比例
+PRESENTER_CURRENT_SCALE = 0.75
+PRESENTER_NEXT_SCALE = 0.45
+
+
+class SlideFrameCache:
+    """按 (内容哈希, 位置, 总数, 比例) 缓存渲染好的画面"""
+
+    def __init__(self, converter=None, max_frames=24, max_workers=2):
+        self.converter = converter  # 在 Tk 线程中把 PIL 图像转换为 PhotoImage
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.pending = set()
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def key(self, slide, index, count, scale):
+        return slide_hash(slide, scale), index, count, scale
+
+    def get(self, key):
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+        return frame
+
+    def render_now(self, slide, index, count, scale):
+        """缓存未命中时在当前线程渲染（只在第一次显示时发生）"""
+        key = self.key(slide, index, count, scale)
+        frame = self.get(key)
+        if frame is None:
+            image = render_slide(slide, index, count, scale)
+            frame = self.converter(image) if self.converter else image
+            self._store(key, frame)
+        return frame
+
+    def prefetch(self, slide, index, count, scale):
+        """在后台渲染尚未缓存的画面"""
+        key = self.key(slide, index, count, scale)
+        with self.lock:
+            if key in self.frames or key in self.pending:
+                return
+            self.pending.add(key)
+        self.executor.submit(self._render, key, dict(slide), index, count, scale)
+
+    def _render(self, key, slide, index, count, scale):
+        try:
+            image = render_slide(slide, index, count, scale)
+        except Exception as e:
+            print(f"放映画面渲染失败: {e}")
+            image = None
+        self.results.put((key, image))
+
+    def collect(self, limit=2):
+        """Tk 线程调用：转换至多 limit 个完成的画面，避免单次占用过久"""
+        for _ in range(limit):
+            try:
+                key, image = self.results.get_nowait()
+            except queue.Empty:
+                return
+            with self.lock:
+                self.pending.discard(key)
+            if image is not None and key not in self.frames:
+                self._store(key, self.converter(image) if self.converter else image)
+
+    def _store(self, key, frame):
+        self.frames[key] = frame
+        self.frames.move_to_end(key)
+        while len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
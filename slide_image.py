@@ -0,0 +1,110 @@
+"""
+OfficeMate 幻灯片图像渲染（Pillow，无需 Tk）
+
+与画布渲染共用 slide_scene.scene_items 的绘制项，保证缩略图、导出和
+放映画面与编辑画布一致。可在工作线程或子进程中调用。
+"""
+import io
+import threading
+
+from PIL import Image, ImageDraw, ImageFont
+
+from slide_scene import SLIDE_WIDTH, SLIDE_HEIGHT, scene_items
+
+# 按顺序尝试的字体文件，前面的覆盖中文
+FONT_CANDIDATES = {
+    False: ["msyh.ttc", "simhei.ttf", "NotoSansCJK-Regular.ttc", "wqy-microhei.ttc",
+            "arial.ttf", "DejaVuSans.ttf"],
+    True: ["msyhbd.ttc", "simhei.ttf", "NotoSansCJK-Bold.ttc", "wqy-microhei.ttc",
+           "arialbd.ttf", "DejaVuSans-Bold.ttf"],
+}
+
+_font_cache = {}
+_font_lock = threading.Lock()
+
+
+def load_font(font, scale=1.0):
+    """把 Tk 字体描述 (family, size[, 'bold']) 转换为 Pillow 字体（带缓存）"""
+    size = max(int(round(font[1] * scale)), 1)
+    bold = "bold" in font[2:]
+    key = (size, bold)
+    with _font_lock:
+        cached = _font_cache.get(key)
+        if cached is not None:
+            return cached
+        loaded = None
+        for name in FONT_CANDIDATES[bold]:
+            try:
+                loaded = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        if loaded is None:
+            try:
+                loaded = ImageFont.load_default(size)
+            except TypeError:
+                # Pillow < 10.1 的默认字体不支持字号
+                loaded = ImageFont.load_default()
+        _font_cache[key] = loaded
+        return loaded
+
+
+def wrap_text(draw, text, font, width):
+    """按像素宽度逐字换行（兼容中文无空格文本），保留原有换行"""
+    lines = []
+    for paragraph in text.split("\n"):
+        if not width:
+            lines.append(paragraph)
+            continue
+        line = ""
+        for char in paragraph:
+            if line and draw.textlength(line + char, font=font) > width:
+                lines.append(line)
+                line = char
+            else:
+                line += char
+        lines.append(line)
+    return lines
+
+
+def draw_text_item(draw, coords, options, scale):
+    """模拟 Tk 文本项：以坐标为中心（anchor=center），多行左对齐"""
+    font = load_font(options.get("font", ("Arial", 12)), scale)
+    width = options.get("width", 0) * scale
+    lines = wrap_text(draw, str(options.get("text", "")), font, width)
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    block_width = max((draw.textlength(line, font=font) for line in lines), default=0)
+    x = coords[0] * scale - block_width / 2
+    y = coords[1] * scale - line_height * len(lines) / 2
+    fill = options.get("fill", "black")
+    for line in lines:
+        draw.text((x, y), line, font=font, fill=fill)
+        y += line_height
+
+
+def render_slide(slide, index=None, count=None, scale=1.0):
+    """把幻灯片渲染为 RGB 图像，scale 为相对 800x500 的缩放比例"""
+    size = (max(int(SLIDE_WIDTH * scale), 1), max(int(SLIDE_HEIGHT * scale), 1))
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for _, kind, coords, options in scene_items(slide, index, count):
+        points = [c * scale for c in coords]
+        if kind == "text":
+            draw_text_item(draw, coords, options, scale)
+        elif kind in ("rectangle", "oval"):
+            shape = draw.rectangle if kind == "rectangle" else draw.ellipse
+            outline = options.get("outline", "black") or None
+            shape(points, fill=options.get("fill") or None, outline=outline,
+                  width=max(int(options.get("width", 1) * scale), 1))
+        elif kind == "line":
+            draw.line(points, fill=options.get("fill", "black"),
+                      width=max(int(options.get("width", 1) * scale), 1))
+    return image
+
+
+def render_slide_png(slide, index=None, count=None, scale=1.0):
+    """渲染为 PNG 字节（便于跨进程传递和写入磁盘缓存）"""
+    buffer = io.BytesIO()
+    render_slide(slide, index, count, scale).save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
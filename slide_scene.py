@@ -0,0 +1,149 @@
+"""
+OfficeMate 幻灯片保留模式渲染
+
+- scene_items: 把幻灯片数据转换为绘制项列表（纯函数，不依赖 Tk）
+- SlideSceneRenderer: 为每张幻灯片保留画布项ID，变化时只用 coords/itemconfig
+  更新改动的项；切换幻灯片时隐藏/显示已有的项，而不是删除后重建
+"""
+from collections import OrderedDict
+
+SLIDE_WIDTH = 800
+SLIDE_HEIGHT = 500
+
+TITLE_COLOR = "#2c3e50"
+BODY_COLOR = "#34495e"
+NUMBER_COLOR = "#7f8c8d"
+
+# 元素字典中不作为画布选项的键
+ELEMENT_META_KEYS = ("id", "type", "coords")
+
+
+def scene_items(slide, index, count):
+    """幻灯片的绘制项 [(键, 类型, 坐标, 选项)]，按从下到上的绘制顺序
+
+    index 为 None 时不绘制页码（缩略图等与位置无关的渲染）。
+    """
+    layout = slide.get("layout", "title_content")
+    items = [("background", "rectangle", (0, 0, SLIDE_WIDTH, SLIDE_HEIGHT),
+              {"fill": slide["background"], "outline": ""})]
+
+    if layout == "title_content":
+        items.append(("title", "text", (400, 100),
+                      {"text": slide["title"], "font": ("Arial", 32, "bold"), "fill": TITLE_COLOR}))
+        items.append(("content", "text", (400, 300),
+                      {"text": slide["content"], "font": ("Arial", 18), "fill": BODY_COLOR, "width": 600}))
+    elif layout == "two_columns":
+        items.append(("title", "text", (400, 80),
+                      {"text": slide["title"], "font": ("Arial", 32, "bold"), "fill": TITLE_COLOR}))
+        items.append(("left_column", "text", (200, 300),
+                      {"text": "左栏内容", "font": ("Arial", 16), "fill": BODY_COLOR, "width": 300}))
+        items.append(("right_column", "text", (600, 300),
+                      {"text": "右栏内容", "font": ("Arial", 16), "fill": BODY_COLOR, "width": 300}))
+    elif layout == "title_only":
+        items.append(("title", "text", (400, 250),
+                      {"text": slide["title"], "font": ("Arial", 36, "bold"), "fill": TITLE_COLOR}))
+
+    # 自定义元素: {"id", "type": text/rectangle/oval/line, "coords": [...], 其余为画布选项}
+    for position, element in enumerate(slide.get("elements", [])):
+        options = {k: v for k, v in element.items() if k not in ELEMENT_META_KEYS}
+        items.append((("element", element.get("id", position)), element.get("type", "text"),
+                      tuple(element["coords"]), options))
+
+    if index is not None:
+        items.append(("number", "text", (750, 480),
+                      {"text": f"{index + 1}/{count}", "font": ("Arial", 12), "fill": NUMBER_COLOR}))
+    return items
+
+
+class SlideSceneRenderer:
+    """保留模式的幻灯片画布渲染器
+
+    每张幻灯片的画布项带有同一个标签，切换时整组隐藏/显示。缓存的幻灯片数
+    超过 max_scenes 时删除最久未显示的一组，控制画布项数量。
+    """
+
+    def __init__(self, canvas, max_scenes=20):
+        self.canvas = canvas
+        self.max_scenes = max_scenes
+        self.scenes = OrderedDict()  # 幻灯片键 -> {项键: [项ID, 类型, 坐标, 选项]}
+        self.orders = {}
+        self.current = None
+
+    def _tag(self, slide_key):
+        return f"slide_{slide_key}"
+
+    def render(self, slide_key, items):
+        """显示幻灯片并把画布项同步到 items，返回实际改动的项数"""
+        if slide_key != self.current:
+            if self.current in self.scenes:
+                self.canvas.itemconfigure(self._tag(self.current), state='hidden')
+            if slide_key in self.scenes:
+                self.canvas.itemconfigure(self._tag(slide_key), state='normal')
+            self.current = slide_key
+
+        scene = self.scenes.get(slide_key)
+        if scene is None:
+            scene = self.scenes[slide_key] = {}
+            self._evict()
+        self.scenes.move_to_end(slide_key)
+
+        changes = 0
+        created = False
+        order = []
+        for key, kind, coords, options in items:
+            order.append(key)
+            entry = scene.get(key)
+            if entry is not None and (entry[1] != kind or set(entry[3]) - set(options)):
+                # 类型变化或去掉了选项，无法就地更新
+                self.canvas.delete(entry[0])
+                entry = None
+            if entry is None:
+                item_id = getattr(self.canvas, f"create_{kind}")(
+                    *coords, tags=(self._tag(slide_key),), **options)
+                scene[key] = [item_id, kind, coords, options]
+                changes += 1
+                created = True
+                continue
+            item_id, _, old_coords, old_options = entry
+            if coords != old_coords:
+                self.canvas.coords(item_id, *coords)
+                entry[2] = coords
+                changes += 1
+            changed = {k: v for k, v in options.items() if old_options.get(k) != v}
+            if changed:
+                self.canvas.itemconfigure(item_id, **changed)
+                entry[3] = options
+                changes += 1
+
+        for key in set(scene) - set(order):
+            self.canvas.delete(scene.pop(key)[0])
+            changes += 1
+
+        # 新建的项位于最上层；只有已有场景的叠放顺序可能被打乱时才重新排列
+        old_order = self.orders.get(slide_key)
+        if old_order and (created or old_order != order):
+            for key in order:
+                self.canvas.tag_raise(scene[key][0])
+        self.orders[slide_key] = order
+        return changes
+
+    def _evict(self):
+        while len(self.scenes) > self.max_scenes:
+            slide_key = next(iter(self.scenes))
+            if slide_key == self.current:
+                self.scenes.move_to_end(slide_key)
+                continue
+            self.forget(slide_key)
+
+    def forget(self, slide_key):
+        """删除某张幻灯片的画布项（幻灯片被删除时调用）"""
+        if self.scenes.pop(slide_key, None) is not None:
+            self.canvas.delete(self._tag(slide_key))
+        self.orders.pop(slide_key, None)
+        if self.current == slide_key:
+            self.current = None
+
+    def clear(self):
+        """删除所有缓存的画布项"""
+        for slide_key in list(self.scenes):
+            self.forget(slide_key)
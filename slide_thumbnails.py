@@ -0,0 +1,119 @@
+"""
+OfficeMate 幻灯片缩略图缓存
+
+- 缩略图按幻灯片内容哈希缓存，内容未变的幻灯片不会重新渲染
+- 内存中为有界 LRU，磁盘上按哈希保存 PNG，重新打开演示文稿时直接读取
+- 渲染在工作线程池中进行，结果放入队列，由 Tk 线程轮询取出
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from slide_image import render_slide_png
+
+THUMBNAIL_CACHE_DIR = ".thumbnail_cache"
+THUMBNAIL_SCALE = 0.16  # 800x500 -> 128x80
+THUMBNAIL_SLOT = 92  # 幻灯片面板中每个缩略图占用的高度
+
+
+def slide_hash(slide, scale=THUMBNAIL_SCALE):
+    """幻灯片内容哈希（不含ID，复制出的相同幻灯片共用缩略图）"""
+    content = {k: v for k, v in slide.items() if k != "id"}
+    data = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{scale}:{data}".encode("utf-8")).hexdigest()
+
+
+class ThumbnailCache:
+    """缩略图缓存：内存 LRU + 磁盘缓存 + 后台渲染"""
+
+    def __init__(self, cache_dir=THUMBNAIL_CACHE_DIR, scale=THUMBNAIL_SCALE,
+                 memory_limit=300, disk_limit=5000, max_workers=2):
+        self.cache_dir = cache_dir
+        self.scale = scale
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()  # 内容哈希 -> PNG 字节
+        self.pending = {}  # 内容哈希 -> 等待该缩略图的幻灯片键集合
+        self.results = queue.Queue()  # (幻灯片键, 内容哈希, PNG 字节)
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.executor.submit(self.prune_disk)
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def _remember(self, digest, data):
+        self.memory[digest] = data
+        self.memory.move_to_end(digest)
+        while len(self.memory) > self.memory_limit:
+            self.memory.popitem(last=False)
+
+    def get(self, slide_key, slide):
+        """返回 (内容哈希, PNG 字节)；未命中内存时在后台加载/渲染，完成后放入 results"""
+        digest = slide_hash(slide, self.scale)
+        with self.lock:
+            data = self.memory.get(digest)
+            if data is not None:
+                self.memory.move_to_end(digest)
+                return digest, data
+            waiting = self.pending.get(digest)
+            if waiting is not None:
+                waiting.add(slide_key)
+                return digest, None
+            self.pending[digest] = {slide_key}
+        # 复制一份，渲染期间界面继续修改原字典不受影响
+        self.executor.submit(self._load, digest, json.loads(json.dumps(slide, default=str)))
+        return digest, None
+
+    def _load(self, digest, slide):
+        path = self._path(digest)
+        data = None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            pass
+        if data is None:
+            try:
+                data = render_slide_png(slide, scale=self.scale)
+            except Exception as e:
+                print(f"缩略图渲染失败: {e}")
+                with self.lock:
+                    self.pending.pop(digest, None)
+                return
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"缩略图缓存写入失败: {e}")
+        with self.lock:
+            self._remember(digest, data)
+            slide_keys = self.pending.pop(digest, ())
+        for slide_key in slide_keys:
+            self.results.put((slide_key, digest, data))
+
+    def prune_disk(self):
+        """磁盘缓存超过上限时删除最久未使用的文件"""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".png")]
+        except OSError:
+            return
+        if len(entries) <= self.disk_limit:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.disk_limit]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,484 @@
+"""
+OfficeMate 拼写和文风检查
+
+- 词典：dictionaries/ 目录下的词表（每行 “词 [词频] [词性]”，与常见中文分词词典
+  格式相同）以及系统英文词表，构建为紧凑前缀树（子边连续存放在数组中）
+- 英文单词查词典，拼写建议按编辑距离在前缀树上搜索
+- 中文按词典分词（有词频时取概率最大的切分，否则取词数最少的切分）；相邻两个
+  单字换成常见易混字后组成词典中的词时提示，例如 “在见” -> “再见”
+- 文风：重复的词、重复的标点、中文之间的半角标点、过长的句子
+
+检查以段落为单位，结果按段落文字缓存，编辑后只有变化的段落需要重新检查。
+检查在后台线程中进行，界面只为可见区域的段落添加波浪线标签。
+"""
+import glob
+import json
+import math
+import os
+import queue
+import re
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_file import atomic_open
+
+DICTIONARY_DIR = "dictionaries"
+USER_DICTIONARY = os.path.join(DICTIONARY_DIR, "user_words.txt")
+TRIE_CACHE = ".dictionary.trie"  # 构建好的前缀树，词表未变时直接读取
+TRIE_MAGIC = b"OMT1"
+SYSTEM_WORD_LISTS = ("/usr/share/dict/words",)
+CACHE_PARAGRAPHS = 20000
+MAX_SUGGESTIONS = 5
+MAX_EDIT_DISTANCE = 2
+LONG_SENTENCE_CHARS = 120
+CHECK_BATCH = 200  # 后台每检查这么多段落发布一次结果
+REPORT_SUGGESTIONS = 50  # 检查报告中最多为这么多个拼写问题计算建议
+
+SPELLING = "spelling"
+STYLE = "style"
+
+# 常见易混字，每组中的字可能互相写错
+CONFUSABLE_GROUPS = ("的得地", "在再", "做作", "象像", "即既", "己已", "带戴", "副付", "帐账",
+                     "历厉", "辨辩", "竟竞", "坐座", "须需", "型形", "部布", "份分", "练炼")
+CONFUSABLES = {char: group.replace(char, "") for group in CONFUSABLE_GROUPS for char in group}
+
+Issue = namedtuple("Issue", "start end kind message suggestions")
+
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+_REPEATED_WORD = re.compile(r"\b([A-Za-z]+)\s+\1\b", re.IGNORECASE)
+_REPEATED_CJK = re.compile(r"([的了是在和与])\1")
+_REPEATED_PUNCTUATION = re.compile(r"([，。、；：,;])\1+")
+_HALF_WIDTH_PUNCTUATION = re.compile(r"(?<=[一-鿿])([,;:?!])(?=[一-鿿])")
+_SENTENCE = re.compile(r"[^。！？.!?]+[。！？.!?]?")
+FULL_WIDTH = {",": "，", ";": "；", ":": "：", "?": "？", "!": "！"}
+
+
+# ===== 词典 =====
+
+
+class Trie:
+    """紧凑前缀树
+
+    节点按深度优先顺序编号；节点 n 的子边为 chars[first[n]:first[n + 1]]（按字符
+    排序），对应的子节点为 targets 中同一位置的元素。freq[n] > 0 表示从根到 n 是
+    一个词，值为词频（词表没有词频时为 1）。
+    """
+
+    def __init__(self, words):
+        """words 为 (词, 词频) 的可迭代对象"""
+        children = [[]]
+        freq = array("I", [0])
+        path = [0]
+        previous = ""
+        for word, count in sorted(words):
+            common = 0
+            limit = min(len(previous), len(word))
+            while common < limit and previous[common] == word[common]:
+                common += 1
+            del path[common + 1:]
+            node = path[common]
+            for char in word[common:]:
+                child = len(children)
+                children.append([])
+                freq.append(0)
+                children[node].append((char, child))
+                node = child
+                path.append(child)
+            freq[node] = max(freq[node], count or 1)
+            previous = word
+
+        first = array("I")
+        targets = array("I")
+        chars = []
+        for edges in children:
+            first.append(len(targets))
+            for char, child in edges:
+                chars.append(char)
+                targets.append(child)
+        first.append(len(targets))
+        self._set_arrays(first, targets, freq, "".join(chars))
+
+    def _set_arrays(self, first, targets, freq, chars):
+        self.first = first
+        self.targets = targets
+        self.freq = freq
+        self.chars = chars
+        self.words = len(freq) - freq.count(0)
+        self.total = sum(freq) or 1
+        self.has_frequencies = any(count > 1 for count in freq)
+
+    def save(self, path, signature):
+        """保存构建好的数组；signature 用于判断词表是否变化"""
+        chars = self.chars.encode("utf-8")
+        header = json.dumps({"signature": signature, "nodes": len(self.freq), "edges": len(self.targets),
+                             "chars": len(chars)}).encode("utf-8")
+        with atomic_open(path, "wb") as f:
+            f.write(TRIE_MAGIC + len(header).to_bytes(4, "big") + header)
+            for data in (self.first, self.targets, self.freq):
+                f.write(data.tobytes())
+            f.write(chars)
+
+    @classmethod
+    def load(cls, path, signature):
+        """读取 save 保存的前缀树，文件不存在、损坏或 signature 不同时返回 None"""
+        try:
+            with open(path, "rb") as f:
+                if f.read(4) != TRIE_MAGIC:
+                    return None
+                header = json.loads(f.read(int.from_bytes(f.read(4), "big")))
+                if header.get("signature") != signature:
+                    return None
+                arrays = []
+                for count in (header["nodes"] + 1, header["edges"], header["nodes"]):
+                    data = array("I")
+                    data.frombytes(f.read(count * data.itemsize))
+                    if len(data) != count:
+                        return None
+                    arrays.append(data)
+                chars = f.read(header["chars"]).decode("utf-8")
+        except (OSError, ValueError, KeyError):
+            return None
+        trie = cls.__new__(cls)
+        trie._set_arrays(*arrays, chars)
+        if len(trie.chars) != len(trie.targets):
+            return None
+        return trie
+
+    def child(self, node, char):
+        index = self.chars.find(char, self.first[node], self.first[node + 1])
+        return self.targets[index] if index >= 0 else None
+
+    def find(self, word):
+        """word 对应的节点，不存在时为 None"""
+        node = 0
+        for char in word:
+            node = self.child(node, char)
+            if node is None:
+                return None
+        return node
+
+    def frequency(self, word):
+        node = self.find(word)
+        return self.freq[node] if node is not None else 0
+
+    def __contains__(self, word):
+        return self.frequency(word) > 0
+
+    def __len__(self):
+        return self.words
+
+    def prefixes(self, text, start):
+        """text[start:] 开头的所有词，依次返回 (结束位置, 词频)"""
+        node = 0
+        for end in range(start, len(text)):
+            node = self.child(node, text[end])
+            if node is None:
+                return
+            if self.freq[node]:
+                yield end + 1, self.freq[node]
+
+    def suggest(self, word, max_distance=MAX_EDIT_DISTANCE, limit=MAX_SUGGESTIONS):
+        """编辑距离不超过 max_distance 的词，按距离、词频排序
+
+        在前缀树上深度优先搜索，每个节点计算一行编辑距离矩阵，整行都超过
+        max_distance 时不再进入该子树。
+        """
+        found = []
+        first, targets, chars, freq = self.first, self.targets, self.chars, self.freq
+        ascii_only = word.isascii()
+        stack = [(0, "", list(range(len(word) + 1)))]
+        while stack:
+            node, prefix, row = stack.pop()
+            for index in range(first[node], first[node + 1]):
+                char = chars[index]
+                if ascii_only and char > "\x7f":
+                    continue  # 英文单词不在中文词条中搜索
+                child = targets[index]
+                new_row = [row[0] + 1]
+                for column, letter in enumerate(word, 1):
+                    new_row.append(min(new_row[column - 1] + 1, row[column] + 1,
+                                       row[column - 1] + (letter != char)))
+                if freq[child] and new_row[-1] <= max_distance:
+                    found.append((new_row[-1], -freq[child], prefix + char))
+                if min(new_row) <= max_distance:
+                    stack.append((child, prefix + char, new_row))
+        found.sort()
+        return [candidate for distance, _, candidate in found if distance > 0][:limit]
+
+
+def read_word_list(path):
+    """读取词表，返回 (词, 词频) 列表；忽略空行和 # 开头的注释"""
+    words = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+            words.append((parts[0], count))
+    return words
+
+
+def word_list_paths(directory=DICTIONARY_DIR, user_dictionary=USER_DICTIONARY):
+    paths = sorted(path for path in glob.glob(os.path.join(directory, "*.txt"))
+                   if os.path.abspath(path) != os.path.abspath(user_dictionary))
+    paths += [path for path in SYSTEM_WORD_LISTS if os.path.exists(path)]
+    return paths
+
+
+# ===== 检查 =====
+
+
+class SpellChecker:
+    """按段落检查拼写和文风；词典加载后不再修改，可以在多个线程中读取"""
+
+    def __init__(self, trie, user_words=()):
+        self.trie = trie
+        self.user_words = set(user_words)
+        self.log_total = math.log(trie.total)
+
+    @classmethod
+    def load(cls, directory=DICTIONARY_DIR, user_dictionary=USER_DICTIONARY):
+        paths = word_list_paths(directory, user_dictionary)
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append([os.path.abspath(path), stat.st_size, stat.st_mtime])
+            except OSError:
+                pass
+        cache_path = os.path.join(directory, TRIE_CACHE)
+        trie = Trie.load(cache_path, signature)
+        if trie is None:
+            words = []
+            for path in paths:
+                try:
+                    words += read_word_list(path)
+                except OSError as e:
+                    print(f"读取词表失败: {path}: {e}")
+            trie = Trie(words)
+            if paths:
+                try:
+                    trie.save(cache_path, signature)
+                except OSError as e:
+                    print(f"保存词典缓存失败: {e}")
+        user_words = []
+        if os.path.exists(user_dictionary):
+            user_words = [word for word, _ in read_word_list(user_dictionary)]
+        return cls(trie, user_words)
+
+    @property
+    def has_dictionary(self):
+        return len(self.trie) > 0
+
+    def known(self, word):
+        if word in self.user_words or word in self.trie:
+            return True
+        lower = word.lower()
+        return lower != word and (lower in self.user_words or lower in self.trie)
+
+    def suggest(self, word):
+        """拼写建议（首字母大写的词保持大写）"""
+        if _CJK_RUN.fullmatch(word):
+            return [alternative for alternative in self.confusable_words(word) if alternative in self.trie]
+        suggestions = self.trie.suggest(word.lower())
+        if word[:1].isupper():
+            suggestions = [candidate[:1].upper() + candidate[1:] for candidate in suggestions]
+        return suggestions
+
+    def confusable_words(self, word):
+        for position, char in enumerate(word):
+            for alternative in CONFUSABLES.get(char, ""):
+                yield word[:position] + alternative + word[position + 1:]
+
+    def segment(self, run):
+        """中文分词，返回各词的 (起点, 终点)"""
+        length = len(run)
+        best = [0.0] * (length + 1)
+        choice = [0] * (length + 1)
+        unknown = -self.log_total - 10.0  # 词典中没有的单字
+        for start in range(length - 1, -1, -1):
+            score, end = unknown + best[start + 1], start + 1
+            for word_end, count in self.trie.prefixes(run, start):
+                candidate = math.log(count) - self.log_total + best[word_end]
+                if candidate > score:
+                    score, end = candidate, word_end
+            best[start], choice[start] = score, end
+        spans = []
+        start = 0
+        while start < length:
+            spans.append((start, choice[start]))
+            start = choice[start]
+        return spans
+
+    def check_cjk(self, run, offset):
+        """相邻两个单字换成易混字后是词典中的词时提示"""
+        issues = []
+        spans = self.segment(run)
+        for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+            if end - start != 1 or next_end - next_start != 1:
+                continue
+            pair = run[start:next_end]
+            if pair in self.user_words:
+                continue
+            suggestions = [word for word in self.confusable_words(pair) if word in self.trie]
+            if suggestions:
+                issues.append(Issue(offset + start, offset + next_end, SPELLING,
+                                    f"“{pair}” 可能是 “{suggestions[0]}”", tuple(suggestions)))
+        return issues
+
+    def check_style(self, text):
+        issues = []
+        for match in _REPEATED_WORD.finditer(text):
+            issues.append(Issue(match.start(), match.end(), STYLE, f"重复的词 “{match.group(1)}”",
+                                (match.group(1),)))
+        for match in _REPEATED_CJK.finditer(text):
+            issues.append(Issue(match.start(), match.end(), STYLE, f"重复的 “{match.group(1)}”",
+                                (match.group(1),)))
+        for match in _REPEATED_PUNCTUATION.finditer(text):
+            issues.append(Issue(match.start(), match.end(), STYLE, "重复的标点", (match.group(1),)))
+        for match in _HALF_WIDTH_PUNCTUATION.finditer(text):
+            issues.append(Issue(match.start(), match.end(), STYLE, "中文中使用了半角标点",
+                                (FULL_WIDTH[match.group(1)],)))
+        for match in _SENTENCE.finditer(text):
+            if len(match.group().strip()) > LONG_SENTENCE_CHARS:
+                issues.append(Issue(match.start(), match.end(), STYLE,
+                                    f"句子过长（{len(match.group().strip())} 字），建议拆分", ()))
+        return issues
+
+    def check_paragraph(self, text):
+        """检查一个段落，返回按位置排序的 Issue 列表（位置相对于段落开头）"""
+        issues = self.check_style(text)
+        if self.has_dictionary:
+            for match in _WORD.finditer(text):
+                word = match.group()
+                if len(word) > 1 and not word.isupper() and not self.known(word) \
+                        and not (word.endswith("'s") and self.known(word[:-2])):
+                    # 建议在需要时再计算（搜索编辑距离较慢）
+                    issues.append(Issue(match.start(), match.end(), SPELLING, f"“{word}” 不在词典中", None))
+            for match in _CJK_RUN.finditer(text):
+                if len(match.group()) > 1:
+                    issues += self.check_cjk(match.group(), match.start())
+        issues.sort(key=lambda issue: (issue.start, issue.end))
+        return issues
+
+
+class SpellCheckService:
+    """后台检查段落并按段落文字缓存结果
+
+    lookup/request 在 Tk 线程中调用；检查完成的段落放入 results 队列，由 Tk 线程
+    轮询后重新为可见区域添加标签。
+    """
+
+    def __init__(self, directory=DICTIONARY_DIR, user_dictionary=USER_DICTIONARY, cache_size=CACHE_PARAGRAPHS):
+        self.directory = directory
+        self.user_dictionary = user_dictionary
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # 段落文字 -> Issue 列表
+        self.pending = set()
+        self.generation = 0  # 词典变化后加一，丢弃之前提交的检查结果
+        self.lock = threading.Lock()
+        self.results = queue.Queue()
+        self.checker = None
+        self.load_error = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spell-check")
+        self.executor.submit(self._load)
+
+    def _load(self):
+        try:
+            self.checker = SpellChecker.load(self.directory, self.user_dictionary)
+        except (OSError, ValueError) as e:
+            self.load_error = str(e)
+            self.checker = SpellChecker(Trie([]))
+            print(f"加载拼写词典失败: {e}")
+
+    @property
+    def ready(self):
+        return self.checker is not None
+
+    def lookup(self, paragraph):
+        """已缓存的检查结果，尚未检查时为 None"""
+        with self.lock:
+            issues = self.cache.get(paragraph)
+            if issues is not None:
+                self.cache.move_to_end(paragraph)
+            return issues
+
+    def request(self, paragraphs):
+        """在后台检查尚未缓存的段落"""
+        with self.lock:
+            missing = [text for text in dict.fromkeys(paragraphs)
+                       if text not in self.cache and text not in self.pending]
+            self.pending.update(missing)
+            generation = self.generation
+        if missing:
+            self.executor.submit(self._check, missing, generation)
+        return len(missing)
+
+    def _check(self, paragraphs, generation):
+        for start in range(0, len(paragraphs), CHECK_BATCH):
+            batch = paragraphs[start:start + CHECK_BATCH]
+            checked = [(text, self.checker.check_paragraph(text)) for text in batch]
+            with self.lock:
+                self.pending.difference_update(batch)
+                if generation != self.generation:
+                    return
+                for text, issues in checked:
+                    self.cache[text] = issues
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            self.results.put(len(batch))
+
+    @property
+    def busy(self):
+        return bool(self.pending)
+
+    def check_text(self, text, suggestions=REPORT_SUGGESTIONS):
+        """在后台检查整段文字，返回 Future，结果为 [(行号, Issue)]
+
+        前 suggestions 个拼写问题附带建议，其余的 suggestions 字段为 None。
+        """
+        return self.executor.submit(self._check_text, text, suggestions)
+
+    def _check_text(self, text, suggestions):
+        found = []
+        for number, paragraph in enumerate(text.split("\n"), 1):
+            issues = self.lookup(paragraph)
+            if issues is None:
+                issues = self.checker.check_paragraph(paragraph)
+            for issue in issues:
+                if issue.suggestions is None and suggestions > 0:
+                    suggestions -= 1
+                    issue = issue._replace(suggestions=tuple(self.checker.suggest(paragraph[issue.start:issue.end])))
+                found.append((number, issue))
+        return found
+
+    def suggest(self, word):
+        """在后台计算拼写建议，返回 Future"""
+        return self.executor.submit(lambda: self.checker.suggest(word))
+
+    @property
+    def has_dictionary(self):
+        return self.checker is not None and self.checker.has_dictionary
+
+    def add_word(self, word):
+        """加入用户词典，之前的检查结果作废"""
+        if self.checker is None:
+            return
+        self.checker.user_words.add(word)
+        os.makedirs(os.path.dirname(self.user_dictionary) or ".", exist_ok=True)
+        try:
+            with open(self.user_dictionary, "a", encoding="utf-8") as f:
+                f.write(word + "\n")
+        except OSError as e:
+            print(f"保存用户词典失败: {e}")
+        with self.lock:
+            self.generation += 1
+            self.cache.clear()
+            self.pending.clear()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
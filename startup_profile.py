@@ -0,0 +1,124 @@
+"""
+OfficeMate 启动耗时统计
+
+记录模块导入、各启动阶段和各标签页的创建耗时，以及从进程启动到首次绘制的时间。
+命令行加 --profile-startup（或设置环境变量 OFFICEMATE_PROFILE_STARTUP=1）时
+输出到标准错误。本模块需要在其他模块之前导入，才能统计到所有导入耗时。
+"""
+import builtins
+import importlib.util
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# 尽早导入本模块，近似作为进程启动时间
+PROCESS_START = time.perf_counter()
+
+PROFILE_FLAG = "--profile-startup"
+PROFILE_ENABLED = PROFILE_FLAG in sys.argv[1:] or bool(os.environ.get("OFFICEMATE_PROFILE_STARTUP"))
+
+# 报告中列出的最慢导入数
+REPORT_IMPORTS = 15
+
+
+class ImportTimer:
+    """统计最外层 import 语句的耗时（包含它间接导入的模块）"""
+
+    def __init__(self):
+        self.timings = []  # [(模块名, 秒)]
+        self.depth = 0
+        self._original = None
+
+    def install(self):
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 已加载的模块、相对导入和嵌套导入直接放行
+        if self.depth or level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self.depth -= 1
+            self.timings.append((name, time.perf_counter() - start))
+
+
+import_timer = ImportTimer()
+if PROFILE_ENABLED:
+    import_timer.install()
+
+
+def lazy_import(name):
+    """返回延迟加载的模块：第一次访问其属性时才真正执行导入"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+class StartupProfiler:
+    """启动阶段计时"""
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = PROFILE_ENABLED
+        self.enabled = enabled
+        self.phases = []  # [(阶段名, 秒)]
+        self.marks = {}  # 事件名 -> 距进程启动的秒数
+        # 主程序在导入完成后立即创建计时器
+        self.mark("imports_done")
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+        if self.enabled and self.marks.get("first_paint") is not None:
+            # 首次绘制之后的阶段（例如延迟创建的标签页）单独输出
+            print(f"[startup] {name}: {seconds * 1000:.1f} ms", file=sys.stderr)
+
+    def mark(self, name):
+        self.marks[name] = time.perf_counter() - PROCESS_START
+        return self.marks[name]
+
+    def report(self):
+        lines = []
+        if import_timer.timings:
+            total = sum(seconds for _, seconds in import_timer.timings)
+            lines.append(f"imports: {total * 1000:.1f} ms（{len(import_timer.timings)} 条 import 语句）")
+            slowest = sorted(import_timer.timings, key=lambda item: item[1], reverse=True)
+            lines += [f"  import {name}: {seconds * 1000:.1f} ms" for name, seconds in slowest[:REPORT_IMPORTS]]
+        lines += [f"{name}: {seconds * 1000:.1f} ms" for name, seconds in self.phases]
+        lines += [f"{name}: {seconds * 1000:.1f} ms (自进程启动)" for name, seconds in self.marks.items()]
+        return "\n".join(lines)
+
+    def emit(self):
+        """输出启动报告；之后的导入不再计时"""
+        import_timer.uninstall()
+        if self.enabled:
+            print("[startup]\n" + self.report(), file=sys.stderr)
@@ -0,0 +1,88 @@
+"""在线状态：200 个客户端的采样限频和服务器按周期合并广播"""
+import random
+
+from collab_presence import PRESENCE_INTERVAL, PresenceHub, PresenceSampler
+from collab_protocol import FrameDecoder, MSG_PRESENCE, decode_presence, encode_frame, encode_presence
+
+CLIENTS = 200
+MOVES_PER_TICK = 6  # 60Hz 光标移动，每个周期 6 次
+
+
+def decode_frame(frame):
+    frames = FrameDecoder().feed(frame)
+    assert len(frames) == 1
+    msg_type, payload = frames[0]
+    assert msg_type == MSG_PRESENCE
+    return decode_presence(payload)
+
+
+def test_200_clients_coalesced_per_tick():
+    rng = random.Random(29)
+    user_ids = [f"user{i:04d}" for i in range(CLIENTS)]
+    samplers = [PresenceSampler() for _ in range(CLIENTS)]
+    cursors = [rng.randrange(10000) for _ in range(CLIENTS)]
+    hub = PresenceHub()
+    known = {}  # 客户端收到的所有用户状态
+    now = 0.0
+    for tick in range(20):
+        reported = {}
+        for i, sampler in enumerate(samplers):
+            # 一部分客户端本周期不动
+            if rng.random() < 0.25:
+                continue
+            for _ in range(MOVES_PER_TICK):
+                cursors[i] = max(cursors[i] + rng.choice((-1, 1)), 0)
+                if rng.random() < 0.2:
+                    sampler.update(cursors[i], cursors[i], cursors[i] + 5)
+                else:
+                    sampler.update(cursors[i])
+            state = sampler.take(now)
+            if state is not None:
+                assert state == sampler.state  # 只发送最新状态，中间的移动被合并
+                frame = encode_frame(MSG_PRESENCE, encode_presence([(user_ids[i], state)]))
+                for user_id, client_state in decode_frame(frame):
+                    hub.update(user_id, client_state)
+                reported[user_ids[i]] = state
+
+        entries, frame = hub.tick()
+        changed = {user_id: state for user_id, state in reported.items() if known.get(user_id) != state}
+        if not changed:
+            assert frame is None
+        else:
+            # 每个周期一帧，只包含状态变化了的用户，每人一条
+            decoded = decode_frame(frame)
+            assert len(decoded) == len(entries) == len(changed)
+            assert dict(decoded) == changed
+            known.update(decoded)
+        assert hub.tick() == (None, None)
+        now += PRESENCE_INTERVAL
+
+    # 客户端累积的状态与服务器一致，加入时的完整帧也一致
+    assert known == hub.states
+    assert dict(decode_frame(hub.full_frame())) == hub.states
+
+
+def test_sampler_rate_limited_within_interval():
+    sampler = PresenceSampler()
+    sampler.update(1)
+    assert sampler.take(0.0) == (1, 1, 1)
+    sampler.update(2)
+    assert sampler.take(PRESENCE_INTERVAL / 2) is None
+    sampler.update(3)
+    assert sampler.take(PRESENCE_INTERVAL) == (3, 3, 3)
+    # 状态没有变化时不再发送
+    assert sampler.take(PRESENCE_INTERVAL * 3) is None
+
+
+def test_departures_broadcast_as_none():
+    hub = PresenceHub()
+    for i in range(CLIENTS):
+        hub.update(f"user{i:04d}", (i, i, i))
+    hub.tick()
+    for i in range(0, CLIENTS, 10):
+        hub.remove(f"user{i:04d}")
+    entries, frame = hub.tick()
+    decoded = dict(decode_frame(frame))
+    assert len(decoded) == CLIENTS // 10
+    assert all(state is None for state in decoded.values())
+    assert len(hub.states) == CLIENTS - CLIENTS // 10
@@ -0,0 +1,128 @@
+"""collab_protocol 的分块文本和操作变换"""
+import random
+
+import pytest
+
+from collab_protocol import (
+    DeltaLog, ProtocolError, TextBuffer, apply_ops, delete_op, insert_op, transform_ops
+)
+
+
+def apply_one(text, op):
+    kind, pos, data = op
+    if kind == 0:
+        return text[:pos] + data + text[pos:]
+    return text[:pos] + text[pos + data:]
+
+
+def random_ops(rng, text, count, alphabet="xyz"):
+    """count 个依次作用于 text 的随机操作"""
+    ops = []
+    for _ in range(count):
+        if text and rng.random() < 0.5:
+            pos = rng.randrange(len(text))
+            length = rng.randint(1, min(12, len(text) - pos))
+            op = delete_op(pos, length)
+        else:
+            op = insert_op(rng.randint(0, len(text)), "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 3))))
+        ops.append(op)
+        text = apply_one(text, op)
+    return ops
+
+
+def check_buffer(buffer, expected):
+    assert buffer.text() == expected
+    assert len(buffer) == len(expected)
+    assert len(buffer.starts) == len(buffer.chunks)
+    start = 0
+    for chunk_start, chunk in zip(buffer.starts, buffer.chunks):
+        assert chunk_start == start
+        start += len(chunk)
+
+
+class TestTextBuffer:
+    def test_delete_whole_trailing_chunk(self):
+        log = DeltaLog("a" * 40000)
+        log.append([delete_op(32768, 7232)])
+        assert len(log.buffer) == 32768
+        log.append([insert_op(len(log.buffer), "x")])
+        check_buffer(log.buffer, "a" * 32768 + "x")
+
+    def test_delete_everything_then_insert(self):
+        buffer = TextBuffer("abcdefghij" * 5, chunk_size=8)
+        buffer.delete(0, 50)
+        check_buffer(buffer, "")
+        buffer.insert(0, "xy")
+        check_buffer(buffer, "xy")
+
+    @pytest.mark.parametrize("pos", [0, 7, 8, 9, 15, 16, 24, 32])
+    def test_insert_at_chunk_boundaries(self, pos):
+        text = "".join(chr(ord("a") + i % 26) for i in range(32))
+        buffer = TextBuffer(text, chunk_size=8)
+        buffer.insert(pos, "XYZ")
+        check_buffer(buffer, text[:pos] + "XYZ" + text[pos:])
+
+    @pytest.mark.parametrize("pos,length", [(0, 8), (8, 8), (24, 8), (16, 16), (7, 2), (8, 24), (0, 32), (31, 1)])
+    def test_delete_at_chunk_boundaries(self, pos, length):
+        text = "".join(chr(ord("a") + i % 26) for i in range(32))
+        buffer = TextBuffer(text, chunk_size=8)
+        buffer.delete(pos, length)
+        check_buffer(buffer, text[:pos] + text[pos + length:])
+        buffer.insert(len(buffer), "!")
+        check_buffer(buffer, text[:pos] + text[pos + length:] + "!")
+
+    def test_random_edits_match_string(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            text = "".join(rng.choice("ab") for _ in range(rng.randrange(200)))
+            buffer = TextBuffer(text, chunk_size=8)
+            for _ in range(40):
+                op = random_ops(rng, text, 1)[0]
+                buffer.apply([op])
+                text = apply_one(text, op)
+                check_buffer(buffer, text)
+
+    def test_out_of_range_op_rejected(self):
+        buffer = TextBuffer("abc")
+        with pytest.raises(ProtocolError):
+            buffer.insert(4, "x")
+        with pytest.raises(ProtocolError):
+            buffer.delete(2, 2)
+
+    def test_apply_ops_many_ops_matches_sequential(self):
+        rng = random.Random(2)
+        text = "0123456789" * 5000
+        ops = random_ops(rng, text, 200)
+        expected = text
+        for op in ops:
+            expected = apply_one(expected, op)
+        assert apply_ops(text, ops) == expected
+
+
+class TestTransform:
+    def test_concurrent_batches_converge(self):
+        rng = random.Random(3)
+        for _ in range(5000):
+            base = "".join(rng.choice("abcdefg") for _ in range(rng.randrange(30)))
+            ops = random_ops(rng, base, rng.randint(1, 4), "xyz")
+            against = random_ops(rng, base, rng.randint(1, 4), "XYZ")
+            ops_after, against_after = transform_ops(ops, against)
+            assert apply_ops(apply_ops(base, against), ops_after) == apply_ops(apply_ops(base, ops), against_after)
+
+    def test_committed_insert_wins_tie(self):
+        ops, against = transform_ops([insert_op(1, "c")], [insert_op(1, "s")])
+        assert apply_ops(apply_ops("ab", [insert_op(1, "s")]), ops) == "ascb"
+        assert apply_ops(apply_ops("ab", [insert_op(1, "c")]), against) == "ascb"
+
+    def test_insert_inside_concurrent_delete_survives(self):
+        ops, against = transform_ops([insert_op(3, "X")], [delete_op(1, 4)])
+        assert apply_ops(apply_ops("abcdef", [delete_op(1, 4)]), ops) == "aXf"
+        assert apply_ops(apply_ops("abcdef", [insert_op(3, "X")]), against) == "aXf"
+
+    def test_delta_log_commit_rebases_stale_batch(self):
+        log = DeltaLog("hello world")
+        log.append([insert_op(0, ">> ")], "a", 1)
+        seq_start, ops = log.commit([delete_op(6, 5)], 0, "b", 1)
+        assert seq_start == 2
+        assert log.text == ">> hello "
+        assert log.commit([insert_op(0, "x")], log.seq + 1, "b", 2) is None
@@ -0,0 +1,114 @@
+"""离线编辑的同步点：重启后从保存的序号续传，日志中的批次与补发的增量变换后提交"""
+import pytest
+
+from collab_offline import OfflineOpLog
+from collab_protocol import (
+    DeltaLog, FrameDecoder, MSG_OPS, apply_ops, decode_ops_message, delete_op, insert_op
+)
+from collab_sync import SyncState
+
+CLIENT = "client"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "oplog.db")
+
+
+def resync(sync, log, text):
+    """模拟握手：服务器补发 last_seq 之后的增量，然后确认"""
+    frames = log.resync_frames(sync.last_seq)
+    assert frames is not None
+    for msg_type, payload in FrameDecoder().feed(b"".join(frames)):
+        assert msg_type == MSG_OPS
+        text = apply_ops(text, sync.receive(*decode_ops_message(payload), CLIENT))
+    sync.acknowledge(log.seq, max((ref for _, author, ref, _ in log.retained if author == CLIENT), default=0))
+    return text
+
+
+def submit_all(sync, log):
+    """提交并确认所有未确认的批次"""
+    while True:
+        item = sync.take_submit()
+        if item is None:
+            return
+        ref, base_seq, ops = item
+        log.commit(ops, base_seq, CLIENT, ref)
+        sync.acknowledge(log.seq, ref)
+
+
+def connected_client(db_path, log):
+    sync = SyncState(OfflineOpLog(db_path, session_key="server:12345"))
+    sync.reset(log.seq, log.text)
+    return sync, log.text
+
+
+def restart(sync, db_path):
+    sync.store.close()
+    return SyncState(OfflineOpLog(db_path, session_key="server:12345"))
+
+
+def test_restart_rebases_pending_batches(db_path):
+    log = DeltaLog("hello world")
+    sync, text = connected_client(db_path, log)
+
+    # 提交一个批次后断线，离线时继续编辑
+    ops = [insert_op(5, ",")]
+    text = apply_ops(text, ops)
+    sync.add_local(ops)
+    submit_all(sync, log)
+    sync.disconnected()
+    sync.save()
+    for ops in ([insert_op(len(text), "!")], [delete_op(0, 1), insert_op(0, "H")]):
+        text = apply_ops(text, ops)
+        sync.add_local(ops)
+
+    # 离线期间其他人的编辑
+    log.commit([insert_op(0, ">> ")], log.seq, "other", 1)
+    log.commit([delete_op(8, 7)], log.seq, "other", 2)
+
+    sync = restart(sync, db_path)
+    assert sync.last_seq == 1
+    assert sync.local_text() == text == "Hello, world!"
+    text = resync(sync, log, sync.local_text())
+    submit_all(sync, log)
+    assert text == log.text == ">> Hello!"
+    assert not sync.pending
+    assert sync.store.pending_count() == 0
+
+
+def test_in_flight_batch_committed_before_restart(db_path):
+    log = DeltaLog("abc")
+    sync, text = connected_client(db_path, log)
+    ops = [insert_op(3, "d")]
+    text = apply_ops(text, ops)
+    sync.add_local(ops)
+    ref, base_seq, batch = sync.take_submit()
+    # 服务器已提交，但确认到达前连接断开
+    log.commit(batch, base_seq, CLIENT, ref)
+    log.commit([insert_op(0, "x")], log.seq, "other", 1)
+    sync.disconnected()
+    sync.save()
+
+    sync = restart(sync, db_path)
+    text = resync(sync, log, sync.local_text())
+    submit_all(sync, log)
+    assert text == log.text == "xabcd"
+
+
+def test_server_progress_invalidates_sync_point(db_path):
+    log = DeltaLog("abc")
+    sync, _ = connected_client(db_path, log)
+    sync.save()
+    assert sync.store.sync_point() == (0, "abc")
+
+    # 在线时收到远程操作：同步点失效，重启后按旧的方式等待快照
+    log.commit([insert_op(0, "x")], log.seq, "other", 1)
+    sync.receive(1, "other", 1, [insert_op(0, "x")], CLIENT)
+    assert sync.store.sync_point() is None
+    sync.add_local([insert_op(4, "y")])
+
+    sync = restart(sync, db_path)
+    assert sync.last_seq is None
+    assert sync.local_text() is None
+    assert len(sync.pending) == 1
@@ -0,0 +1,55 @@
+"""协作证书：有效的证书复用，即将过期或与私钥不匹配的证书重新生成"""
+import pytest
+
+main = pytest.importorskip("main")  # 需要 cryptography
+
+from collab_tls import ensure_certificate  # noqa: E402
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "collab_cert.pem"), str(tmp_path / "collab_key.pem")
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write_certificate(cert_file, key_file, days_valid, private_key=None):
+    """用 main.py 的辅助函数写一份 EC 自签名证书"""
+    signing_key = main._generate_private_key("ec", 256)
+    certificate = main._build_leaf_certificate(
+        "localhost", signing_key.public_key(), main._build_name("localhost"), signing_key, days_valid)
+    main._write_cert_and_key(certificate, private_key or signing_key, cert_file, key_file)
+
+
+def test_generates_missing_certificate(paths):
+    cert_file, key_file = paths
+    assert ensure_certificate(cert_file, key_file) == paths
+    assert main.is_certificate_reusable(cert_file, key_file, "localhost", key_type="ec", key_size=256)
+
+
+def test_reuses_valid_certificate(paths):
+    cert_file, key_file = paths
+    write_certificate(cert_file, key_file, days_valid=365)
+    before = read(cert_file)
+    assert ensure_certificate(cert_file, key_file) == paths
+    assert read(cert_file) == before
+
+
+def test_regenerates_expiring_certificate(paths):
+    cert_file, key_file = paths
+    write_certificate(cert_file, key_file, days_valid=1)
+    before = read(cert_file)
+    assert ensure_certificate(cert_file, key_file) == paths
+    assert read(cert_file) != before
+    assert main.is_certificate_reusable(cert_file, key_file, "localhost", key_type="ec", key_size=256)
+
+
+def test_regenerates_certificate_with_mismatched_key(paths):
+    cert_file, key_file = paths
+    write_certificate(cert_file, key_file, days_valid=365, private_key=main._generate_private_key("ec", 256))
+    assert not main.is_certificate_reusable(cert_file, key_file, "localhost", key_type="ec", key_size=256)
+    ensure_certificate(cert_file, key_file)
+    assert main.is_certificate_reusable(cert_file, key_file, "localhost", key_type="ec", key_size=256)
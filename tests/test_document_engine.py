@@ -0,0 +1,25 @@
+"""表格公式：单元格引用不区分大小写"""
+import pytest
+
+from document_engine import cell_key, evaluate_formula
+
+CELLS = {"1,0": "2", "2,0": "3", "1,1": "10"}
+
+
+def resolve(key):
+    return CELLS.get(key, "")
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("A1+1", 3),
+    ("a1+1", 3),
+    ("a1*b1", 20),
+    ("sum(a1:A2)", 5),
+    ("SUM(a1:a2)+b1", 15),
+])
+def test_cell_references_ignore_case(formula, expected):
+    assert evaluate_formula(formula, resolve) == expected
+
+
+def test_cell_key_upper_cases_reference():
+    assert cell_key("b12") == cell_key("B12") == "12,1"
@@ -0,0 +1,38 @@
+"""偏好设置：无效的 schema_version 按文件损坏处理"""
+import glob
+import json
+
+import pytest
+
+from preferences_store import DEFAULTS, SCHEMA_VERSION, PreferencesStore
+
+
+def open_store(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return PreferencesStore(str(path), save_interval=0)
+
+
+@pytest.mark.parametrize("version", ["2", 0, -1, None, True, 1.5, [1]])
+def test_invalid_schema_version_is_backed_up(tmp_path, version):
+    path = tmp_path / "preferences.json"
+    store = open_store(path, {"schema_version": version, "theme": "light"})
+    try:
+        assert store.load_error and "schema_version" in store.load_error
+        assert not store.read_only
+        assert store.get("theme") == DEFAULTS["theme"]
+        assert len(glob.glob(f"{path}.corrupt-*")) == 1
+    finally:
+        store.close()
+
+
+def test_old_schema_is_migrated(tmp_path):
+    path = tmp_path / "preferences.json"
+    store = open_store(path, {"theme": "light", "recent_files": ["a", "a", 3, "b"]})
+    try:
+        assert store.load_error is None
+        assert store.get("theme") == "light"
+        assert store.get("recent_files") == ["a", "b"]
+        assert store.get("schema_version") == SCHEMA_VERSION
+    finally:
+        store.close()